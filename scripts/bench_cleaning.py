@@ -0,0 +1,99 @@
+import sys
+import os
+import io
+import time
+import argparse
+import contextlib
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.cleaning import DataCleaningService
+
+
+class PerColumnCleaningService(DataCleaningService):
+    """
+    The previous column-at-a-time implementation, kept here as the baseline.
+    """
+
+    def _handle_missing_values(self, df, numeric_strat, cat_strat):
+        self.log(f"Handling Missing Values (Numeric: {numeric_strat}, Categorical: {cat_strat})...")
+        for col in df.select_dtypes(include=['number']).columns:
+            missing = df[col].isnull().sum()
+            if missing > 0:
+                if numeric_strat == 'median':
+                    val = df[col].median()
+                    df[col] = df[col].fillna(val)
+                    self.log(f"Filled {missing} missing in {col} with median: {val}")
+                elif numeric_strat == 'mean':
+                    val = df[col].mean()
+                    df[col] = df[col].fillna(val)
+                    self.log(f"Filled {missing} missing in {col} with mean: {val}")
+        for col in df.select_dtypes(include=['object', 'category']).columns:
+            missing = df[col].isnull().sum()
+            if missing > 0 and cat_strat == 'mode' and not df[col].mode().empty:
+                val = df[col].mode()[0]
+                df[col] = df[col].fillna(val)
+                self.log(f"Filled {missing} missing in {col} with mode: {val}")
+        return df
+
+    def _handle_outliers(self, df):
+        for col in df.select_dtypes(include=['number']).columns:
+            Q1 = df[col].quantile(0.25)
+            Q3 = df[col].quantile(0.75)
+            IQR = Q3 - Q1
+            lower_bound = Q1 - 1.5 * IQR
+            upper_bound = Q3 + 1.5 * IQR
+            outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)]
+            if not outliers.empty:
+                df[col] = np.where(df[col] < lower_bound, lower_bound, df[col])
+                df[col] = np.where(df[col] > upper_bound, upper_bound, df[col])
+                self.log(f"Capped {len(outliers)} outliers in {col}.")
+        return df
+
+
+def make_frame(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(cols):
+        if i % 10 == 9:
+            data[f"cat_{i}"] = rng.choice(np.array(["north", "south", "east", "west", None], dtype=object), rows)
+        else:
+            values = rng.lognormal(3, 1, rows)
+            values[rng.random(rows) < 0.02] = np.nan
+            data[f"num_{i}"] = values
+    return pd.DataFrame(data)
+
+
+def timed(service, df, steps):
+    service.report = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for step in steps:
+            df = step(service, df)
+    return time.perf_counter() - start, service.report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched vs per-column cleaning")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--cols", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"Building {args.rows:,} x {args.cols} frame...")
+    df = make_frame(args.rows, args.cols)
+
+    steps = [
+        lambda s, d: s._handle_missing_values(d, "median", "mode"),
+        lambda s, d: s._handle_outliers(d),
+    ]
+
+    old_time, old_report = timed(PerColumnCleaningService(), df.copy(), steps)
+    new_time, new_report = timed(DataCleaningService(), df.copy(), steps)
+
+    print(f"Per-column : {old_time:8.2f}s")
+    print(f"Batched    : {new_time:8.2f}s")
+    print(f"Speedup    : {old_time / new_time:8.2f}x")
+    print(f"Reports identical: {old_report == new_report}")
@@ -0,0 +1,89 @@
+import sys
+import os
+import io
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import Config
+from src.llm.cache import ResponseCache
+from src.llm.client import LLMClient
+from src.llm.providers import FakeProvider
+from src.llm.scheduler import RequestScheduler
+from src.main import KPIAgent
+
+
+def make_csv(rows: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "order_id": np.arange(rows),
+        "order_date": pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 730, rows), unit="D"),
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "category": rng.choice(["Electronics", "Clothing", "Home", "Toys", "Garden", "Sports"], rows),
+        "units": rng.integers(1, 20, rows),
+        "revenue": rng.lognormal(4, 1, rows).round(2),
+        "discount": rng.random(rows).round(3),
+    })
+    df.loc[rng.random(rows) < 0.02, "revenue"] = np.nan
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark KPIAgent.run offline against a fake LLM provider")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Median simulated LLM latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="Lognormal spread of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of LLM calls that fail (429/503)")
+    parser.add_argument("--replay", help="JSONL recordings (from RecordingProvider) to answer from")
+    parser.add_argument("--insights", action="store_true", help="Also generate per-chart insights")
+    parser.add_argument("--warm", action="store_true", help="Reuse one dataset so dataset and chart caches are hit")
+    args = parser.parse_args()
+
+    # Keep parsed datasets out of the real cache directory; no LLM response cache
+    cache_dir = tempfile.mkdtemp(prefix="kpi-bench-")
+    Config.CACHE_DIR = cache_dir
+    Config.RUN_INSIGHTS = args.insights
+
+    provider_args = dict(latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+                         error_rate=args.error_rate, seed=0)
+    provider = FakeProvider.from_file(args.replay, **provider_args) if args.replay else FakeProvider(**provider_args)
+    scheduler = RequestScheduler(requests_per_minute=0, tokens_per_minute=0, backoff_base=0.05, backoff_max=1.0)
+    llm = LLMClient(provider=provider, cache=ResponseCache(max_bytes=0), scheduler=scheduler)
+    agent = KPIAgent(llm=llm)
+
+    print(f"Building {args.runs} dataset(s) of {args.rows:,} rows...")
+    datasets = [make_csv(args.rows, seed=0 if args.warm else i) for i in range(args.runs)]
+
+    totals, stages = [], {}
+    try:
+        for i, data in enumerate(datasets):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                agent.run(file_obj=io.BytesIO(data))
+            totals.append(time.perf_counter() - start)
+            for name, seconds in agent.stage_timings.items():
+                stages.setdefault(name, []).append(seconds)
+            print(f"Run {i + 1}: {totals[-1]:.2f}s")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    elapsed = sum(totals)
+    print(f"\nThroughput : {len(totals) / elapsed:.2f} runs/s, {args.rows * len(totals) / elapsed:,.0f} rows/s")
+    print(f"End to end : p50 {percentile(totals, 50):.3f}s  p95 {percentile(totals, 95):.3f}s")
+    print("\nStage             p50 (s)   p95 (s)")
+    for name, values in stages.items():
+        print(f"{name:<16} {percentile(values, 50):8.3f}  {percentile(values, 95):8.3f}")
+    print(f"\nLLM calls: {provider.calls} ({provider.replayed} replayed, {provider.errors} simulated errors)")
+    print(f"Scheduler: {scheduler.metrics()}")
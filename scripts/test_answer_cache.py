@@ -0,0 +1,156 @@
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.analytics import DescriptiveAnalytics
+from src.services.answer_cache import AnswerCache, normalize_question
+from src.services.data_engine import DataPointEngine
+from src.services.query_engine import _fmt
+
+
+class SpecLLM:
+    """
+    Stands in for LLMClient: turns a chat question into a QuerySpec by keyword.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, json_mode=False, priority=None, **kwargs):
+        self.calls += 1
+        question = prompt.split("Question:")[-1].lower() if "Question:" in prompt else prompt.lower()
+        filters = []
+        if "excluding north" in question:
+            filters.append({"column": "region", "op": "!=", "value": "North"})
+        elif "north" in question:
+            filters.append({"column": "region", "op": "==", "value": "North"})
+        if "after 2023" in question:
+            filters.append({"column": "year", "op": ">", "value": 2023})
+        elif "before 2023" in question:
+            filters.append({"column": "year", "op": "<", "value": 2023})
+        if "c001" in question:
+            filters.append({"column": "customer", "op": "==", "value": "C001"})
+        elif "c002" in question:
+            filters.append({"column": "customer", "op": "==", "value": "C002"})
+        return json.dumps({
+            "filters": filters,
+            "group_by": ["region"] if "region" in question else [],
+            "aggregates": [{"func": "sum", "column": "revenue"}],
+        })
+
+
+def make_engine() -> DataPointEngine:
+    rng = np.random.default_rng(0)
+    n = 1000
+    df = pd.DataFrame({
+        "region": pd.Categorical(rng.choice(["North", "South", "East", "West"], n)),
+        "customer": pd.Categorical(rng.choice(["C001", "C002", "C003"], n)),
+        "year": rng.choice([2022, 2023, 2024], n),
+        "revenue": rng.integers(1, 100, n).astype(float),
+    })
+    return DataPointEngine(df, fingerprint="test-answers")
+
+
+def ask(analytics, engine, question):
+    return analytics._query_answer(question, engine.df, engine=engine)
+
+
+def test_normalized_keys_keep_meaningful_words():
+    # Rephrasings normalize to one key
+    assert normalize_question("Total sales by region") == normalize_question("sales per region?")
+    # Negation, comparison and unknown identifiers are never dropped
+    pairs = [
+        ("total revenue by region for North", "total revenue by region excluding North"),
+        ("total revenue by region after 2023", "total revenue by region before 2023"),
+        ("revenue above 100", "revenue below 100"),
+        ("revenue not from online", "revenue from online"),
+        ("revenue for customer C001", "revenue for customer C002"),
+        ("top 5 regions by revenue", "bottom 5 regions by revenue"),
+        # Word order and connectives matter
+        ("total sales where price above 100 and units below 5", "total sales where price below 100 and units above 5"),
+        ("discount and coupon", "discount or coupon"),
+        ("sales from 2023 to 2024", "sales to 2023 from 2024"),
+        ("max price and min units", "min price and max units"),
+    ]
+    for a, b in pairs:
+        assert normalize_question(a) != normalize_question(b), (a, b)
+
+
+def test_similar_questions_do_not_share_answers():
+    engine = make_engine()
+    df = engine.df
+    llm = SpecLLM()
+    analytics = DescriptiveAnalytics(llm, answer_cache=AnswerCache())
+
+    cases = [
+        ("total revenue by region for North", df[df.region == "North"]),
+        ("total revenue by region excluding North", df[df.region != "North"]),
+        ("total revenue by region after 2023", df[df.year > 2023]),
+        ("total revenue by region before 2023", df[df.year < 2023]),
+    ]
+    for question, expected in cases:
+        answer = ask(analytics, engine, question)
+        totals = expected.groupby("region", observed=True)["revenue"].sum()
+        for region, total in totals.items():
+            assert f"| {region} | {_fmt(total)} |" in answer, (question, region, answer)
+
+    before = llm.calls
+    ask(analytics, engine, "total revenue for customer C001")
+    ask(analytics, engine, "total revenue for customer C002")
+    assert llm.calls == before + 2
+
+
+def test_exact_repeat_skips_llm_and_same_plan_shares_answer():
+    engine = make_engine()
+    llm = SpecLLM()
+    cache = AnswerCache()
+    analytics = DescriptiveAnalytics(llm, answer_cache=cache)
+
+    first = ask(analytics, engine, "total revenue by region for North")
+    assert llm.calls == 1
+    # Same tokens in the same order, other wording: no LLM call
+    assert ask(analytics, engine, "Show me the total revenue per region in North?") == first
+    assert llm.calls == 1 and cache.hits == 1
+    # Different words, same resolved plan: the LLM is asked, the answer is shared
+    assert ask(analytics, engine, "revenue breakdown for each region in North") == first
+    assert llm.calls == 2
+
+
+def test_frame_without_engine_reuses_one_engine():
+    df = make_engine().df
+    llm = SpecLLM()
+    analytics = DescriptiveAnalytics(llm, answer_cache=AnswerCache())
+    first = analytics._query_answer("total revenue by region", df, fingerprint="test-frame")
+    engine = analytics._chat_engine
+    assert engine.fingerprint == "test-frame"
+    assert analytics._query_answer("total revenue by region", df, fingerprint="test-frame") == first
+    assert analytics._chat_engine is engine and llm.calls == 1
+
+
+def test_invalidate_and_lru_bounds():
+    cache = AnswerCache(max_entries=2, max_datasets=1)
+    key = lambda q: normalize_question(q)
+    cache.store("a", key("q1"), "p1", "answer 1")
+    cache.store("a", key("q2"), "p2", "answer 2")
+    cache.store("a", key("q3"), "p3", "answer 3")
+    assert cache.lookup("a", key("q1")) is None
+    assert cache.lookup_plan("a", "p1") is None
+    assert cache.lookup("a", key("q3")) == "answer 3"
+    cache.store("b", key("q1"), "p1", "answer 1")
+    assert cache.lookup("a", key("q3")) is None
+    cache.invalidate("b")
+    assert cache.lookup("b", key("q1")) is None
+
+
+if __name__ == "__main__":
+    test_normalized_keys_keep_meaningful_words()
+    test_similar_questions_do_not_share_answers()
+    test_exact_repeat_skips_llm_and_same_plan_shares_answer()
+    test_frame_without_engine_reuses_one_engine()
+    test_invalidate_and_lru_bounds()
+    print("answer cache tests passed")
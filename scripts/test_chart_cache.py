@@ -0,0 +1,74 @@
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.chart_cache import ChartCache, chart_key
+from src.services.data_engine import DataPointEngine
+
+
+def make_frame(n: int = 1000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "region": rng.choice(["North", "South", "East"], n).astype(object),
+        "revenue": rng.lognormal(4, 1, n),
+    })
+
+
+def test_engine_hits_cache_per_fingerprint():
+    df = make_frame()
+    cache = ChartCache()
+    first = DataPointEngine(df, fingerprint="v1", cache=cache).aggregate_chart("region", "revenue")
+    assert cache.misses == 1 and cache.hits == 0
+
+    # Same dataset version: served from the cache, even for another engine
+    engine = DataPointEngine(df, fingerprint="v1", cache=cache)
+    engine.df = None  # a hit must not touch the frame
+    assert engine.aggregate_chart("region", "revenue") == first
+    assert cache.hits == 1
+
+    # A new fingerprint (re-cleaned or refreshed data) misses
+    changed = df.assign(revenue=df.revenue * 2)
+    second = DataPointEngine(changed, fingerprint="v2", cache=cache).aggregate_chart("region", "revenue")
+    assert cache.misses == 2 and second != first
+    # Another spec on the same version misses too
+    DataPointEngine(df, fingerprint="v1", cache=cache).aggregate_chart("region", "revenue", agg="mean")
+    assert cache.misses == 3
+
+
+def test_hits_are_copies():
+    cache = ChartCache()
+    cache.put("k", {"columns": {"value": [1, 2]}})
+    cache.get("k")["columns"]["value"].append(3)
+    assert cache.get("k") == {"columns": {"value": [1, 2]}}
+
+
+def test_size_bound_evicts_least_recently_used_and_spills():
+    keys = [chart_key("v1", {"kind": "test", "i": i}) for i in range(3)]
+    cache = ChartCache(max_bytes=70, spill_max_bytes=0)
+    for key in keys:
+        cache.put(key, {"value": "x" * 10})  # 23 bytes as JSON
+    cache.get(keys[0])  # now more recent than keys[1]
+    cache.put(chart_key("v1", {"kind": "test", "i": 3}), {"value": "y" * 10})
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and len(cache) == 3
+
+    spill_dir = tempfile.mkdtemp()
+    spilling = ChartCache(max_bytes=30, spill_dir=spill_dir, spill_max_bytes=1024)
+    spilling.put(keys[0], {"value": "a" * 10})
+    spilling.put(keys[1], {"value": "b" * 10})
+    assert len(spilling) == 1 and os.listdir(spill_dir) == [f"{keys[0]}.json"]
+    # A spilled entry is promoted back to memory on its next hit
+    assert spilling.get(keys[0]) == {"value": "a" * 10}
+    assert os.listdir(spill_dir) == [f"{keys[1]}.json"]
+
+
+if __name__ == "__main__":
+    test_engine_hits_cache_per_fingerprint()
+    test_hits_are_copies()
+    test_size_bound_evicts_least_recently_used_and_spills()
+    print("chart cache tests passed")
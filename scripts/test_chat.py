@@ -0,0 +1,80 @@
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.llm.cache import ResponseCache
+from src.llm.client import LLMClient
+from src.llm.providers import FakeProvider
+from src.llm.scheduler import RequestScheduler
+from src.services.analytics import DescriptiveAnalytics
+from src.services.answer_cache import AnswerCache
+
+
+class EventLLM:
+    """
+    Stands in for LLMClient and records the order of completions and streamed pieces.
+    """
+
+    def __init__(self, answer="Sales dipped in March because of fewer orders."):
+        self.answer = answer
+        self.events = []
+
+    def generate(self, prompt, json_mode=False, priority=None, **kwargs):
+        self.events.append("generate")
+        if json_mode:
+            return json.dumps({"group_by": ["region"], "aggregates": [{"func": "sum", "column": "revenue"}]})
+        return self.answer
+
+    def generate_stream(self, prompt, priority=None, **kwargs):
+        for word in self.answer.split(" "):
+            self.events.append("piece")
+            yield word + " "
+
+
+def make_frame(n: int = 500) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "region": rng.choice(["North", "South"], n).astype(object),
+        "revenue": rng.integers(1, 100, n).astype(float),
+    })
+
+
+def test_first_streamed_piece_comes_before_any_completion():
+    df = make_frame()
+    llm = EventLLM()
+    analytics = DescriptiveAnalytics(llm, answer_cache=AnswerCache())
+    stream = analytics.chat_with_data_stream("Why did sales dip in March?", df, fingerprint="test-chat")
+    next(stream)
+    assert llm.events == ["piece"]
+    list(stream)
+    assert "generate" not in llm.events
+
+    # Aggregations still go through a query plan
+    llm.events.clear()
+    answer = "".join(analytics.chat_with_data_stream("total revenue by region", df, fingerprint="test-chat"))
+    assert llm.events == ["generate"] and "North" in answer
+
+
+def test_streamed_pieces_join_to_the_full_answer():
+    df = make_frame()
+    provider = FakeProvider()
+    # No response cache, so both answers come from the provider
+    llm = LLMClient(provider=provider, cache=ResponseCache(max_bytes=0),
+                    scheduler=RequestScheduler(requests_per_minute=0, tokens_per_minute=0))
+    analytics = DescriptiveAnalytics(llm)
+    question = "Why did sales dip in March?"
+    pieces = list(analytics.chat_with_data_stream(question, df))
+    assert len(pieces) > 1
+    assert "".join(pieces) == analytics.chat_with_data(question, df)
+    assert provider.calls == 2
+
+
+if __name__ == "__main__":
+    test_first_streamed_piece_comes_before_any_completion()
+    test_streamed_pieces_join_to_the_full_answer()
+    print("chat tests passed")
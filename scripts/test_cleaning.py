@@ -7,6 +7,7 @@ import numpy as np
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.services.cleaning import DataCleaningService
+from src.services.profiler import profile_dataset
 
 def test_cleaning():
     print("Initializing DataCleaningService...")
@@ -37,5 +38,61 @@ def test_cleaning():
     print("\ndtypes:")
     print(cleaned_df.dtypes)
 
+def test_fitted_plan_is_reused():
+    df = pd.DataFrame({
+        "Date": ["2023-01-01", "2023-01-02", "2023-01-01", None, "2023-01-05"],
+        "Price": ["$100", "200", "$100", "300.50", None],
+        "Qty": [10, 5, 10, np.nan, 1],
+        "Category": ["X", "Y", "X", None, "X"],
+    })
+    first = DataCleaningService()
+    expected = first.clean_fitted(df, "test-plan", "median", "mode")
+
+    second = DataCleaningService()
+    second.clean_dataset = None  # a cache hit must not refit
+    result = second.clean_fitted(df, "test-plan", "median", "mode")
+    pd.testing.assert_frame_equal(result, expected)
+    assert second.plan is first.plan and second.report == first.report
+
+    # Other strategies are fitted separately
+    third = DataCleaningService()
+    third.clean_fitted(df, "test-plan", "zero", "mode")
+    assert third.plan is not first.plan and third.plan.numeric_imputation == "zero"
+
+def test_batched_fill_values_and_bounds_match_pandas():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        "units": rng.integers(1, 20, n).astype(float),
+        "revenue": rng.lognormal(4, 1, n),
+        "discount": rng.random(n),
+        "region": pd.Categorical(rng.choice(["North", "South", "East"], n), categories=["South", "North", "East"]),
+        "channel": rng.choice(["Online", "Store", "Phone"], n).astype(object),
+    })
+    for col in ("units", "revenue", "region", "channel"):
+        df.loc[rng.random(n) < 0.05, col] = np.nan
+
+    fills = {col: df[col].median() for col in ("units", "revenue", "discount")}
+    fills.update({col: df[col].mode().iloc[0] for col in ("region", "channel")})
+    filled = df.fillna(fills).drop_duplicates()
+    bounds = {}
+    for col in ("units", "revenue", "discount"):
+        q1, q3 = filled[col].quantile(0.25), filled[col].quantile(0.75)
+        bounds[col] = [q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)]
+
+    # Same plan with and without a profile to read null counts and modes from
+    for profile in (None, profile_dataset(df)):
+        cleaner = DataCleaningService()
+        cleaner.clean_dataset(df, fit=True, profile=profile)
+        assert cleaner.plan.fill_values.keys() == fills.keys()
+        for col, value in fills.items():
+            got = cleaner.plan.fill_values[col]
+            assert (np.isclose(got, value) if isinstance(value, float) else got == value), col
+        assert cleaner.plan.clip_bounds.keys() == bounds.keys()
+        for col, value in bounds.items():
+            assert np.allclose(cleaner.plan.clip_bounds[col], value), col
+
 if __name__ == "__main__":
     test_cleaning()
+    test_fitted_plan_is_reused()
+    test_batched_fill_values_and_bounds_match_pandas()
@@ -0,0 +1,36 @@
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.data_engine import DataPointEngine
+
+
+def make_frame(n: int = 5000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "order_date": pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D"),
+        "region": rng.choice(["North", "South", "East", "West"], n).astype(object),
+        "channel": pd.Categorical(rng.choice(["Online", "Store", "Phone"], n)),
+        "units": rng.integers(1, 20, n),
+        "revenue": rng.lognormal(4, 1, n),
+        "cost": rng.lognormal(3, 1, n),
+    })
+
+
+def test_concurrent_charts_match_sequential():
+    df = make_frame()
+    sequential = DataPointEngine(df, workers=1).generate_important_charts()
+    assert sequential
+    for workers in (2, 4):
+        concurrent = DataPointEngine(df, workers=workers).generate_important_charts()
+        assert json.dumps(concurrent, default=str) == json.dumps(sequential, default=str), workers
+
+
+if __name__ == "__main__":
+    test_concurrent_charts_match_sequential()
+    print("data engine tests passed")
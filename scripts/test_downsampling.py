@@ -0,0 +1,38 @@
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.downsampling import lttb
+
+
+def test_keeps_endpoints_length_and_peaks():
+    rng = np.random.default_rng(0)
+    x = np.arange(10_000)
+    y = np.sin(x / 500) + rng.normal(0, 0.05, len(x))
+    y[3_333], y[7_777] = 10.0, -10.0
+    # From 4 points on the spike and the dip fall in different buckets
+    for n_out in (4, 50, 500):
+        keep = lttb(x, y, n_out)
+        assert len(keep) == n_out
+        assert keep[0] == 0 and keep[-1] == len(x) - 1
+        assert np.all(np.diff(keep) > 0)
+        # The spike and the dip survive
+        assert 3_333 in keep and 7_777 in keep
+
+
+def test_small_targets_still_cap_the_series():
+    x = np.arange(100)
+    assert lttb(x, x, 2).tolist() == [0, 99]
+    assert lttb(x, x, 1).tolist() == [0, 99]
+    assert lttb(x, x, 0).tolist() == [0, 99]
+    # Nothing to drop
+    assert lttb(x[:5], x[:5], 10).tolist() == [0, 1, 2, 3, 4]
+
+
+if __name__ == "__main__":
+    test_keeps_endpoints_length_and_peaks()
+    test_small_targets_still_cap_the_series()
+    print("downsampling tests passed")
@@ -0,0 +1,64 @@
+import sys
+import os
+import io
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.dataset_cache import DatasetCache
+from src.services.ingestion import DataIngestionService
+
+
+def make_service() -> DataIngestionService:
+    return DataIngestionService(cache=DatasetCache(cache_dir=tempfile.mkdtemp()))
+
+
+def test_chunks_keep_a_wide_stable_integer_dtype():
+    # Small values first, values beyond int16/int32 in later chunks
+    df = pd.DataFrame({
+        "Price": [3, 5, 7, 9, 300, 40_000, 50_000, 3_000_000_000],
+        "Qty": [1, 2, 3, 4, 200, 50_000, 60_000, 2],
+        "Discount": [0, 0, 0, 0, 0.5, 0, 0, 0],
+    })
+    # Written by hand so the first chunk's discounts read as integers
+    csv = io.BytesIO(("Price,Qty,Discount\n" + "".join(
+        f"{p},{q},{d:g}\n" for p, q, d in df.itertuples(index=False))).encode())
+    chunks = list(make_service().iter_chunks(file_obj=csv, chunksize=4))
+    assert [str(chunk["Price"].dtype) for chunk in chunks] == ["int64", "int64"]
+    assert [str(chunk["Qty"].dtype) for chunk in chunks] == ["int64", "int64"]
+    # A fractional value later on widens that chunk to float
+    assert [str(chunk["Discount"].dtype) for chunk in chunks] == ["int64", "float64"]
+
+    stitched = pd.concat(chunks, ignore_index=True)
+    assert (stitched["Price"] * stitched["Qty"]).tolist() == (df["Price"] * df["Qty"]).tolist()
+
+
+def test_cached_upload_is_not_parsed_again():
+    cache_dir = tempfile.mkdtemp()
+    data = pd.DataFrame({"Region": ["North", "South"] * 50, "Sales": range(100)}).to_csv(index=False).encode()
+    first = DataIngestionService(cache=DatasetCache(cache_dir=cache_dir))
+    expected = first.ingest_from_url(file_obj=io.BytesIO(data), chunksize=0)
+
+    def parse(*args, **kwargs):
+        raise AssertionError("a cached upload must not be parsed")
+
+    second = DataIngestionService(cache=DatasetCache(cache_dir=cache_dir))
+    second.optimize = second._read_chunked = parse
+    result = second.ingest_from_url(file_obj=io.BytesIO(data), chunksize=0)
+    pd.testing.assert_frame_equal(result, expected)
+    assert second.last_fingerprint == first.last_fingerprint
+    assert second.optimizer.report == first.optimizer.report
+
+    # Other optimizer settings give other dtypes: not served from this entry
+    third = DataIngestionService(cache=DatasetCache(cache_dir=cache_dir))
+    third.optimizer.category_max_ratio = 0.001
+    assert third._cache_key(first.last_fingerprint) != first._cache_key(first.last_fingerprint)
+
+
+if __name__ == "__main__":
+    test_chunks_keep_a_wide_stable_integer_dtype()
+    test_cached_upload_is_not_parsed_again()
+    print("ingestion tests passed")
@@ -0,0 +1,91 @@
+import sys
+import os
+import re
+import json
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.domain import DataPoint
+from src.services.analytics import DescriptiveAnalytics
+
+
+class BatchLLM:
+    """
+    Stands in for LLMClient: answers insight prompts, optionally failing or
+    leaving out charts from the first batch response.
+    """
+
+    def __init__(self, fail: bool = False, drop_first: int = 0):
+        self.fail = fail
+        self.drop_first = drop_first
+        self.calls = 0
+
+    def generate(self, prompt, json_mode=False, timeout=None, priority=None, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("provider unavailable")
+        keys = re.findall(r"^\[(c\d+)\]", prompt, flags=re.MULTILINE)
+        if not keys:
+            return json.dumps({"summary_text": "single", "insights": ["ok"]})
+        if self.calls == 1:
+            keys = keys[self.drop_first:]
+        return json.dumps({"results": [{"key": k, "summary_text": f"summary {k}", "insights": []} for k in keys]})
+
+
+class SlowLLM:
+    """
+    Answers single-chart prompts with the chart number; earlier charts take
+    longer, so concurrent requests finish out of order.
+    """
+
+    def generate(self, prompt, json_mode=False, timeout=None, priority=None, **kwargs):
+        i = int(re.search(r"Chart (\d+)", prompt).group(1))
+        time.sleep((8 - i) * 0.005)
+        return json.dumps({"summary_text": f"summary {i}", "insights": [f"insight {i}"]})
+
+
+def make_items(n: int):
+    return [
+        (None, DataPoint(kpi_id=f"k{i}", title=f"Chart {i}", columns={"label": ["a", "b"], "value": [1, i]}))
+        for i in range(n)
+    ]
+
+
+def test_failed_request_marks_batch_unavailable():
+    llm = BatchLLM(fail=True)
+    results = DescriptiveAnalytics(llm).analyze_batch(make_items(8))
+    assert llm.calls == 1
+    assert [r.kpi_id for r in results] == [f"k{i}" for i in range(8)]
+    assert all(r.summary_text == "Analysis unavailable." for r in results)
+
+
+def test_partial_response_retries_only_missing_charts():
+    llm = BatchLLM(drop_first=3)
+    results = DescriptiveAnalytics(llm).analyze_batch(make_items(8))
+    # One batch call, then the 3 missing charts split into halves of 2 and 1
+    assert llm.calls == 3
+    assert [r.kpi_id for r in results] == [f"k{i}" for i in range(8)]
+    assert all(r.summary_text != "Analysis unavailable." for r in results)
+
+
+def test_analyze_many_matches_sequential_analyze():
+    items = make_items(8)
+    analytics = DescriptiveAnalytics(SlowLLM())
+    data_points = [dp for _, dp in items]
+    expected = [analytics.analyze(None, dp) for dp in data_points]
+
+    arrived = []
+    results = analytics.analyze_many(data_points, max_concurrency=8, batch=False,
+                                     on_result=lambda i, analysis: arrived.append(i))
+    assert [r.model_dump() for r in results] == [r.model_dump() for r in expected]
+    # Results are in input order even though they arrived in another
+    assert sorted(arrived) == list(range(8)) and arrived != list(range(8))
+
+
+if __name__ == "__main__":
+    test_failed_request_marks_batch_unavailable()
+    test_partial_response_retries_only_missing_charts()
+    test_analyze_many_matches_sequential_analyze()
+    print("insight batch tests passed")
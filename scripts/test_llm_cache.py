@@ -0,0 +1,93 @@
+import sys
+import os
+import time
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.llm.cache import ResponseCache, response_key
+from src.llm.client import LLMClient
+from src.llm.providers import FakeProvider
+from src.llm.scheduler import RequestScheduler
+
+
+def make_client(cache: ResponseCache, recordings: dict = None):
+    provider = FakeProvider(recordings=recordings)
+    scheduler = RequestScheduler(requests_per_minute=0, tokens_per_minute=0)
+    return LLMClient(provider=provider, cache=cache, scheduler=scheduler), provider
+
+
+def temp_cache(**kwargs) -> ResponseCache:
+    return ResponseCache(path=os.path.join(tempfile.mkdtemp(), "responses.sqlite"), **kwargs)
+
+
+def test_identical_requests_are_served_from_cache():
+    client, provider = make_client(temp_cache())
+    first = client.generate("Summarize the data", model="m1")
+    assert client.generate("Summarize the data", model="m1") == first
+    assert provider.calls == 1
+
+    # Model, json_mode and prompt are all part of the key
+    client.generate("Summarize the data", model="m2")
+    client.generate("Summarize the data", model="m1", json_mode=True)
+    client.generate("Summarize the data!", model="m1")
+    assert provider.calls == 4
+    # use_cache=False always calls the model
+    client.generate("Summarize the data", model="m1", use_cache=False)
+    assert provider.calls == 5
+
+
+def test_providers_do_not_share_cached_responses():
+    cache = temp_cache()
+    fake_client, fake = make_client(cache)
+    synthetic = fake_client.generate("Summarize the data", model="m1")
+
+    class RealProvider(FakeProvider):
+        name = "groq"
+
+    real = RealProvider(recordings={response_key("m1", "Summarize the data", False): "real answer"})
+    real_client = LLMClient(provider=real, cache=cache, scheduler=RequestScheduler(requests_per_minute=0, tokens_per_minute=0))
+    assert real_client.generate("Summarize the data", model="m1") == "real answer" != synthetic
+    assert real.calls == 1
+    assert fake_client.generate("Summarize the data", model="m1") == synthetic and fake.calls == 1
+
+
+def test_entries_persist_and_expire():
+    cache = temp_cache()
+    cache.put(response_key("m", "p", False), "m", "answer")
+    reopened = ResponseCache(path=str(cache.path))
+    assert reopened.get(response_key("m", "p", False)) == "answer"
+
+    expiring = ResponseCache(path=str(cache.path), ttl=0.01)
+    time.sleep(0.02)
+    assert expiring.get(response_key("m", "p", False)) is None
+    assert expiring.stats()["entries"] == 0
+
+
+def test_size_bound_evicts_least_recently_used():
+    cache = temp_cache(max_bytes=30)
+    for name in ("a", "b", "c"):
+        cache.put(name, "m", name * 10)
+    cache.get("a")  # a is now more recent than b
+    cache.put("d", "m", "d" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" * 10 and cache.get("d") == "d" * 10
+
+
+def test_malformed_json_is_not_cached():
+    prompt = "Return JSON"
+    recordings = {response_key("m", prompt, True): "{not json"}
+    client, provider = make_client(temp_cache(), recordings)
+    client.generate(prompt, model="m", json_mode=True)
+    client.generate(prompt, model="m", json_mode=True)
+    assert provider.calls == 2
+
+
+if __name__ == "__main__":
+    test_identical_requests_are_served_from_cache()
+    test_providers_do_not_share_cached_responses()
+    test_entries_persist_and_expire()
+    test_size_bound_evicts_least_recently_used()
+    test_malformed_json_is_not_cached()
+    print("LLM cache tests passed")
@@ -0,0 +1,67 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.cleaning import DataCleaningService
+from src.services.optimizer import DataFrameOptimizer
+
+
+def make_chunks():
+    rng = np.random.default_rng(0)
+    chunks = []
+    for i in range(4):
+        n = 500
+        chunks.append(pd.DataFrame({
+            "units": rng.integers(1, 20, n),
+            "revenue": rng.random(n),
+            "region": rng.choice(["North", "South", "East", "West"], n),
+            # New categories keep appearing, past the unique cap in the third chunk
+            "customer": [f"C{j}" for j in rng.integers(i * 40, i * 40 + 60, n)],
+            # All-null in the first chunk (read_csv gives float64 there)
+            "note": np.nan if i == 0 else rng.choice(["a", "b", None], n),
+            # Strings, then numbers in the last chunk
+            "code": rng.integers(0, 5, n) if i == 3 else rng.choice(["x", "y"], n),
+        }))
+    return chunks
+
+
+def test_optimize_chunks_matches_optimize():
+    optimizer = DataFrameOptimizer(category_max_ratio=0.5, category_max_unique=120)
+    expected = optimizer.optimize(pd.concat(make_chunks(), ignore_index=True))
+    result = optimizer.optimize_chunks(iter(make_chunks()))
+    pd.testing.assert_frame_equal(result, expected)
+    assert isinstance(result["region"].dtype, pd.CategoricalDtype)
+    assert isinstance(result["note"].dtype, pd.CategoricalDtype)
+    assert result["customer"].dtype == object and result["code"].dtype == object
+
+
+def test_optimize_chunks_applies_ratio_over_all_rows():
+    chunks = [pd.DataFrame({"id": [f"row{i}" for i in range(k, k + 100)]}) for k in range(0, 300, 100)]
+    result = DataFrameOptimizer(category_max_ratio=0.5).optimize_chunks(iter(chunks))
+    assert result["id"].dtype == object
+    assert result["id"].tolist() == [f"row{i}" for i in range(300)]
+
+
+def test_products_of_compacted_integers_do_not_wrap():
+    df = DataFrameOptimizer().optimize(pd.DataFrame({"Price": [300, 250, 120], "Qty": [200, 180, 90]}))
+    # Never narrower than int32
+    assert df["Price"].dtype == np.int32 and df["Qty"].dtype == np.int32
+
+    cleaner = DataCleaningService()
+    cleaned = cleaner.clean_dataset(df, fit=True)
+    assert cleaned["Total_Sales_Calc"].tolist() == [60000, 45000, 10800]
+    # The refresh path applies the same plan
+    big = pd.DataFrame({"Price": np.array([50_000, 60_000], dtype=np.int32), "Qty": np.array([50_000, 60_000], dtype=np.int32)})
+    cleaner.plan.clip_bounds = {}
+    assert cleaner.apply_plan(big, cleaner.plan)["Total_Sales_Calc"].tolist() == [2_500_000_000, 3_600_000_000]
+
+
+if __name__ == "__main__":
+    test_optimize_chunks_matches_optimize()
+    test_optimize_chunks_applies_ratio_over_all_rows()
+    test_products_of_compacted_integers_do_not_wrap()
+    print("optimizer tests passed")
@@ -0,0 +1,105 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.profiler import DatasetProfiler, profile_chunks
+from src.services.sketches import DistinctSketch
+
+
+def make_frame(n: int = 5000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "units": rng.integers(1, 20, n),
+        "revenue": rng.lognormal(4, 1, n),
+        "region": pd.Categorical(rng.choice(["North", "South", "East", "West"], n),
+                                 categories=["West", "South", "North", "East", "Unused"]),
+        "channel": rng.choice(["Online", "Store", "Phone"], n).astype(object),
+        "customer": np.array([f"C{i:05d}" for i in rng.integers(0, 3000, n)], dtype=object),
+        "order_date": pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D"),
+    })
+    df.loc[rng.random(n) < 0.05, "revenue"] = np.nan
+    df.loc[rng.random(n) < 0.05, "region"] = np.nan
+    df.loc[rng.random(n) < 0.05, "channel"] = None
+    return df
+
+
+def chunked(df: pd.DataFrame, rows: int = 700):
+    return (df.iloc[i:i + rows] for i in range(0, len(df), rows))
+
+
+def test_profile_matches_pandas_across_chunks():
+    df = make_frame()
+    profile = profile_chunks(chunked(df))
+    assert profile.rows == len(df)
+    pd.testing.assert_series_equal(profile.null_counts(), df.isnull().sum())
+
+    expected = df.describe(include="number").transpose()
+    describe = profile.describe()
+    assert list(describe.index) == list(expected.index)
+    for stat in ("count", "mean", "std", "min", "max"):
+        assert np.allclose(describe[stat], expected[stat]), stat
+    # Quartiles are sketched: within a couple of percent of rank
+    for col in describe.index:
+        values = np.sort(df[col].dropna().to_numpy())
+        quartiles = describe.loc[col, ["25%", "50%", "75%"]].to_numpy(dtype=float)
+        # Tied values span a range of ranks (integer columns)
+        low = np.searchsorted(values, quartiles, side="left") / len(values)
+        high = np.searchsorted(values, quartiles, side="right") / len(values)
+        qs = np.array([0.25, 0.5, 0.75])
+        assert np.maximum(low - qs, qs - high).max() < 0.03, col
+
+    assert profile["order_date"].min == df.order_date.min() and profile["order_date"].max == df.order_date.max()
+
+
+def test_counts_distinct_and_mode_match_pandas():
+    df = make_frame()
+    profile = profile_chunks(chunked(df))
+    for col in ("region", "channel", "customer"):
+        p = profile[col]
+        counts = df[col].value_counts()
+        counts = counts[counts > 0]
+        assert p.distinct == df[col].nunique(), col
+        assert p.counts.to_dict() == counts.to_dict(), col
+        assert p.mode() == df[col].mode().iloc[0], col
+        top = p.top_values(5)
+        assert [c for _, c in top] == counts.head(5).tolist(), col
+        assert all(counts[v] == c for v, c in top), col
+    # Unused categories are not reported as values
+    assert "Unused" not in profile["region"].counts.index
+
+
+def test_trimmed_counts_fall_back_to_the_sketch():
+    df = make_frame()
+    profiler = DatasetProfiler(max_tracked=500)
+    for chunk in chunked(df[["customer"]]):
+        profiler.update(chunk)
+    p = profiler.result()["customer"]
+    assert not p.counts_exact and p.mode() is None
+    assert abs(p.distinct - df.customer.nunique()) / df.customer.nunique() < 0.1
+
+
+def test_distinct_sketch_error_is_bounded():
+    # Exact below k
+    assert DistinctSketch(k=1024).update(np.arange(1000)).estimate() == 1000
+    rng = np.random.default_rng(3)
+    strings = np.array([f"id{i}" for i in rng.integers(0, 200_000, 300_000)], dtype=object)
+    for values in (rng.integers(0, 200_000, 500_000), strings):
+        sketch = DistinctSketch(k=1024)
+        parts = [DistinctSketch(k=1024).update(part) for part in np.array_split(values, 5)]
+        for part in parts:
+            sketch.merge(part)
+        truth = len(pd.unique(values))
+        # About 3% standard error with k=1024: allow three of them
+        assert abs(sketch.estimate() - truth) / truth < 0.1
+
+
+if __name__ == "__main__":
+    test_profile_matches_pandas_across_chunks()
+    test_counts_distinct_and_mode_match_pandas()
+    test_trimmed_counts_fall_back_to_the_sketch()
+    test_distinct_sketch_error_is_bounded()
+    print("profiler tests passed")
@@ -0,0 +1,116 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.domain import QuerySpec
+from src.services.data_engine import DataPointEngine
+from src.services.query_engine import QueryEngine, _label
+
+
+def make_frame(n: int = 5000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "order_date": pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D"),
+        "region": pd.Categorical(rng.choice(["North", "South", "East", "West"], n)),
+        "channel": rng.choice(["Online", "Store", "Phone"], n).astype(object),
+        "customer": np.array([f"C{i:05d}" for i in rng.integers(0, 3000, n)], dtype=object),
+        "units": rng.integers(1, 20, n),
+        "revenue": rng.lognormal(4, 1, n),
+    })
+    df.loc[rng.random(n) < 0.05, "region"] = np.nan
+    df.loc[rng.random(n) < 0.05, "channel"] = None
+    df.loc[rng.random(n) < 0.05, "revenue"] = np.nan
+    return df
+
+
+def run(df: pd.DataFrame, **spec) -> dict:
+    engine = DataPointEngine(df)
+    result = QueryEngine(engine).execute(QuerySpec.model_validate(spec))
+    columns = result["columns"]
+    keys = list(zip(*[columns[c] for c in spec.get("group_by", [])]))
+    return {"result": result, "rows": {k: {a: columns[a][i] for a in columns if a not in spec.get("group_by", [])}
+                                       for i, k in enumerate(keys)}}
+
+
+def assert_matches(rows: dict, expected: pd.DataFrame):
+    assert len(rows) == len(expected), (len(rows), len(expected))
+    for key, values in expected.iterrows():
+        key = tuple(_label(k) for k in (key if isinstance(key, tuple) else (key,)))
+        for alias, value in values.items():
+            got = rows[key][alias]
+            assert np.isclose(got, value, equal_nan=True), (key, alias, got, value)
+
+
+def test_grouped_aggregates_match_pandas():
+    df = make_frame()
+    out = run(df, group_by=["region"], aggregates=[
+        {"func": "sum", "column": "revenue"}, {"func": "mean", "column": "revenue"},
+        {"func": "median", "column": "revenue"}, {"func": "count", "column": "revenue"},
+        {"func": "count"},
+    ])
+    grouped = df.groupby("region", observed=True)
+    expected = pd.DataFrame({
+        "sum_revenue": grouped["revenue"].sum(), "mean_revenue": grouped["revenue"].mean(),
+        "median_revenue": grouped["revenue"].median(), "count_revenue": grouped["revenue"].count(),
+        "count": grouped.size(),
+    })
+    assert_matches(out["rows"], expected)
+    # Sorted by the first aggregate, largest first
+    sums = out["result"]["columns"]["sum_revenue"]
+    assert sums == sorted(sums, reverse=True)
+
+
+def test_filters_and_two_keys_match_pandas():
+    df = make_frame()
+    out = run(df, group_by=["region", "channel"],
+              filters=[{"column": "units", "op": ">=", "value": 10}, {"column": "region", "op": "!=", "value": "North"}],
+              aggregates=[{"func": "sum", "column": "units"}, {"func": "max", "column": "revenue"}])
+    subset = df[(df.units >= 10) & df.region.notna() & (df.region != "North")]
+    grouped = subset.groupby(["region", "channel"], observed=True)
+    expected = pd.DataFrame({"sum_units": grouped["units"].sum(), "max_revenue": grouped["revenue"].max()})
+    assert_matches(out["rows"], expected)
+    assert out["result"]["matched"] == len(subset)
+
+
+def test_high_cardinality_and_time_keys_match_pandas():
+    df = make_frame()
+    # 3000 customers x 730 days: more key combinations than the dense bincount allows
+    out = run(df, group_by=["customer", "order_date"], time_granularity="day",
+              aggregates=[{"func": "sum", "column": "units"}])
+    expected = df.groupby(["customer", df.order_date.dt.to_period("D")])["units"].sum()
+    assert out["result"]["groups"] == len(expected)
+    # Only the first MAX_QUERY_ROWS groups are returned: each must match, and they must be the largest
+    for (customer, day), row in out["rows"].items():
+        assert row["sum_units"] == expected[(customer, pd.Period(day, "D"))]
+    top = sorted(expected, reverse=True)[:len(out["rows"])]
+    assert sorted((r["sum_units"] for r in out["rows"].values()), reverse=True) == top
+
+    out = run(df, group_by=["order_date"], time_granularity="quarter", aggregates=[{"func": "sum", "column": "revenue"}])
+    expected = df.groupby(df.order_date.dt.to_period("Q"))[["revenue"]].sum().rename(columns={"revenue": "sum_revenue"})
+    assert_matches(out["rows"], expected)
+    # Time keys come back in chronological order
+    assert list(out["rows"]) == [(_label(p),) for p in expected.index]
+
+
+def test_ungrouped_aggregates_and_nunique():
+    df = make_frame()
+    out = run(df, filters=[{"column": "channel", "op": "in", "value": ["Online", "Phone"]}],
+              aggregates=[{"func": "sum", "column": "revenue"}, {"func": "nunique", "column": "customer"},
+                          {"func": "min", "column": "order_date"}])
+    subset = df[df.channel.isin(["Online", "Phone"])]
+    columns = out["result"]["columns"]
+    assert np.isclose(columns["sum_revenue"][0], subset.revenue.sum())
+    assert columns["nunique_customer"][0] == subset.customer.nunique()
+    assert pd.Timestamp(columns["min_order_date"][0]) == subset.order_date.min()
+
+
+if __name__ == "__main__":
+    test_grouped_aggregates_match_pandas()
+    test_filters_and_two_keys_match_pandas()
+    test_high_cardinality_and_time_keys_match_pandas()
+    test_ungrouped_aggregates_and_nunique()
+    print("query engine tests passed")
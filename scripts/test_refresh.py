@@ -0,0 +1,84 @@
+import sys
+import os
+import io
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import Config
+from src.llm.cache import ResponseCache
+from src.llm.client import LLMClient
+from src.llm.providers import FakeProvider
+from src.llm.scheduler import RequestScheduler
+from src.main import KPIAgent
+from src.services.dataset_cache import DatasetCache
+from src.services.ingestion import DataIngestionService
+
+
+def make_agent() -> KPIAgent:
+    cache_dir = tempfile.mkdtemp()
+    llm = LLMClient(provider=FakeProvider(), cache=ResponseCache(path=os.path.join(cache_dir, "responses.sqlite")),
+                    scheduler=RequestScheduler(requests_per_minute=0, tokens_per_minute=0))
+    agent = KPIAgent(llm=llm)
+    agent.ingestion = DataIngestionService(cache=DatasetCache(cache_dir=cache_dir))
+    return agent
+
+
+def make_frame(n: int, start: str, seed: int) -> pd.DataFrame:
+    # No nulls, duplicates or outliers, so the stored cleaning plan and a refit agree
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Date": (pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, 180, n), unit="D")).strftime("%Y-%m-%d"),
+        "Region": rng.choice(["North", "South", "East", "West"], n),
+        "Product_Category": rng.choice(["Electronics", "Clothing", "Home"], n),
+        "Sales_Amount": rng.uniform(100, 1000, n).round(2),
+        "Units_Sold": rng.integers(1, 20, n),
+    })
+
+
+def run(agent: KPIAgent, df: pd.DataFrame) -> list:
+    _, result, _ = agent.run(file_obj=io.BytesIO(df.to_csv(index=False).encode()))
+    return result["data_points"]
+
+
+def test_refresh_matches_full_recompute():
+    history = make_frame(3000, "2023-01-01", 0)
+    # The delta brings a new region, so categoricals gain a category
+    delta = make_frame(500, "2023-07-01", 1)
+    delta.loc[:50, "Region"] = "Central"
+
+    previous = Config.INCREMENTAL_REFRESH
+    Config.INCREMENTAL_REFRESH = True
+    try:
+        agent = make_agent()
+        run(agent, history)
+        refreshed = agent.refresh(df=delta)
+        expected = run(make_agent(), pd.concat([history, delta], ignore_index=True))
+    finally:
+        Config.INCREMENTAL_REFRESH = previous
+
+    refreshed = [dp.model_dump(mode="json") for dp in refreshed]
+    assert len(refreshed) == len(expected)
+    for got, want in zip(refreshed, expected):
+        assert got["title"] == want["title"]
+        assert got["columns"].keys() == want["columns"].keys(), got["title"]
+        for key, values in want["columns"].items():
+            if all(isinstance(v, (int, float)) for v in values):
+                # Sums differ only by summation order
+                assert np.allclose(got["columns"][key], values), (got["title"], key)
+            else:
+                assert got["columns"][key] == values, (got["title"], key)
+
+    # The engine's frame is the full history + delta, with compact dtypes kept
+    df = agent.data_engine.df
+    assert len(df) == len(history) + len(delta)
+    assert isinstance(df["Region"].dtype, pd.CategoricalDtype)
+    assert df["Region"].value_counts()["Central"] == 51
+
+
+if __name__ == "__main__":
+    test_refresh_matches_full_recompute()
+    print("refresh tests passed")
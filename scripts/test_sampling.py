@@ -0,0 +1,68 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import Config
+from src.services.data_engine import DataPointEngine
+from src.services.sampling import iter_batches, reservoir_sample, stratified_sample
+
+
+def make_frame(n: int = 20_000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "order_date": (pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D")).strftime("%Y-%m-%d"),
+        "region": rng.choice(["North", "South", "East", "West"], n).astype(object),
+        "customer_id": np.array([f"C{i:05d}" for i in rng.integers(0, 5000, n)], dtype=object),
+        "status": "shipped",
+        "revenue": rng.lognormal(4, 1, n),
+    })
+    # Rare values that a small sample is likely to miss
+    df.loc[[n - 3], "status"] = "returned"
+    df.loc[[5, n - 2], "region"] = "Central"
+    return df
+
+
+def test_reservoir_sample_is_seeded_and_chunking_invariant():
+    df = make_frame()
+    whole = reservoir_sample(df, 500, seed=7)
+    chunked = reservoir_sample(iter_batches(df, 1_234), 500, seed=7)
+    pd.testing.assert_frame_equal(whole, chunked)
+    assert len(whole) == 500 and whole.index.is_monotonic_increasing
+    assert not reservoir_sample(df, 500, seed=8).index.equals(whole.index)
+
+
+def test_stratified_sample_covers_every_group():
+    df = make_frame()
+    sample = stratified_sample(df, "region", 100, seed=0)
+    assert len(sample) == 100
+    assert set(sample.region) == set(df.region)
+    # The rest follows group sizes
+    shares = sample.region.value_counts(normalize=True)
+    assert abs(shares["North"] - (df.region == "North").mean()) < 0.05
+
+
+def test_sampled_schema_matches_full_frame_schema():
+    df = make_frame()
+    previous = Config.SCHEMA_SAMPLE_ROWS
+    try:
+        Config.SCHEMA_SAMPLE_ROWS = 200
+        sampled = DataPointEngine(df)
+        Config.SCHEMA_SAMPLE_ROWS = len(df)
+        full = DataPointEngine(df)
+    finally:
+        Config.SCHEMA_SAMPLE_ROWS = previous
+    assert sampled.schema == full.schema
+    assert sampled.date_formats == full.date_formats
+    # A column that looks constant in the sample is still a dimension
+    assert "status" in sampled.schema["dimensions"] and sampled.schema["time"] == ["order_date"]
+
+
+if __name__ == "__main__":
+    test_reservoir_sample_is_seeded_and_chunking_invariant()
+    test_stratified_sample_covers_every_group()
+    test_sampled_schema_matches_full_frame_schema()
+    print("sampling tests passed")
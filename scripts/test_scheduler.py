@@ -0,0 +1,130 @@
+import sys
+import os
+import time
+import random
+import threading
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.llm.scheduler import BACKGROUND, INTERACTIVE, RequestScheduler
+
+
+class FakeClock:
+    """
+    Manual clock whose sleep() blocks until the gate opens, then jumps ahead.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeping = 0
+        self.slept = []
+        self.gate = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.sleeping += 1
+            self.slept.append(seconds)
+        self.gate.wait()
+        with self._lock:
+            self.sleeping -= 1
+            self.now += seconds
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+class RateLimited(Exception):
+    retry_after = 5.0
+
+
+def test_interactive_requests_jump_the_queue():
+    clock = FakeClock()
+    scheduler = RequestScheduler(requests_per_minute=1, tokens_per_minute=0, clock=clock, sleep=clock.sleep)
+    scheduler.requests.take(1)  # budget used up: every request has to wait
+    order = []
+
+    def submit(name, priority):
+        thread = threading.Thread(target=scheduler.run, args=(lambda: order.append(name),), kwargs={"priority": priority})
+        thread.start()
+        return thread
+
+    background = submit("background", BACKGROUND)
+    wait_until(lambda: clock.sleeping == 1)
+    interactive = submit("interactive", INTERACTIVE)
+    wait_until(lambda: clock.sleeping == 2)
+
+    clock.gate.set()
+    background.join(5)
+    interactive.join(5)
+    assert order == ["interactive", "background"]
+    assert scheduler.metrics()["max_queue_depth"] == 2
+
+
+def test_retryable_errors_back_off_and_honour_retry_after():
+    clock = FakeClock()
+    clock.gate.set()
+    scheduler = RequestScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=3, backoff_base=1.0,
+                                 backoff_max=30, clock=clock, sleep=clock.sleep, rng=random.Random(0))
+    calls = []
+
+    def flaky():
+        calls.append(clock())
+        if len(calls) < 3:
+            raise RateLimited()
+        return "ok"
+
+    result = scheduler.run(flaky, is_retryable=lambda e: isinstance(e, RateLimited),
+                           retry_after=lambda e: e.retry_after)
+    assert result == "ok" and len(calls) == 3
+    assert all(delay >= RateLimited.retry_after for delay in clock.slept)
+    metrics = scheduler.metrics()
+    assert metrics["retries"] == 2 and metrics["requests"] == 1 and metrics["failures"] == 0
+
+
+def test_non_retryable_and_exhausted_retries_raise():
+    clock = FakeClock()
+    clock.gate.set()
+    scheduler = RequestScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=2,
+                                 clock=clock, sleep=clock.sleep, rng=random.Random(0))
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    for retryable, attempts in ((False, 1), (True, 3)):
+        calls.clear()
+        try:
+            scheduler.run(failing, is_retryable=lambda e: retryable)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("expected the last error to be raised")
+        assert len(calls) == attempts
+    assert scheduler.metrics()["failures"] == 2
+
+
+def test_backoff_is_full_jitter_within_the_cap():
+    scheduler = RequestScheduler(backoff_base=1.0, backoff_max=8.0, rng=random.Random(0))
+    for attempt in range(6):
+        delays = [scheduler.backoff(attempt) for _ in range(200)]
+        cap = min(8.0, 2 ** attempt)
+        assert 0 <= min(delays) and max(delays) <= cap
+        assert max(delays) > cap / 2
+
+
+if __name__ == "__main__":
+    test_interactive_requests_jump_the_queue()
+    test_retryable_errors_back_off_and_honour_retry_after()
+    test_non_retryable_and_exhausted_retries_raise()
+    test_backoff_is_full_jitter_within_the_cap()
+    print("scheduler tests passed")
@@ -0,0 +1,80 @@
+import sys
+import os
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.services.sketches import BinnedHistogram, QuantileSketch
+
+QS = np.linspace(0.01, 0.99, 99)
+
+
+def rank_error(values: np.ndarray, sketch: QuantileSketch) -> float:
+    # Largest gap between requested and actual rank of the returned values, as a share of n
+    ranks = np.searchsorted(np.sort(values), sketch.quantiles(QS)) / len(values)
+    return float(np.abs(ranks - QS).max())
+
+
+def test_quantile_sketch_rank_error_is_bounded():
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(0, 2, 200_000)
+    sketch = QuantileSketch(k=200)
+    for batch in np.array_split(values, 37):
+        sketch.update(batch)
+    assert len(sketch) == len(values)
+    assert rank_error(values, sketch) < 0.02
+    assert sketch.quantile(0) == values.min() and sketch.quantile(1) == values.max()
+    # Memory stays O(k log(n / k)) instead of growing with n
+    assert sum(len(level) for level in sketch.levels) < 2_000
+
+
+def test_merged_sketches_keep_the_bound():
+    rng = np.random.default_rng(2)
+    values = rng.normal(0, 1, 100_000)
+    parts = [QuantileSketch(seed=i).update(chunk) for i, chunk in enumerate(np.array_split(values, 8))]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert len(merged) == len(values)
+    assert rank_error(values, merged) < 0.02
+
+
+def test_repeated_values_are_weighted_exactly():
+    sketch = QuantileSketch(k=50).update(np.arange(1000, dtype=float))
+    sketch.update_repeated(-1.0, 1000)
+    assert len(sketch) == 2000
+    # Half of the weight sits on the repeated value
+    assert sketch.quantile(0.25) == -1.0
+    assert sketch.quantile(0.75) > 0
+
+
+def test_histogram_counts_stay_exact_when_bins_double():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(50, 5, 10_000), rng.normal(5_000, 500, 10_000)])
+    histogram = BinnedHistogram(bins=30)
+    for batch in np.array_split(values, 20):
+        histogram.update(batch)
+    counts, edges = histogram.histogram()
+    assert counts.sum() == len(values) and len(counts) <= 60
+    expected, _ = np.histogram(values, bins=edges)
+    # np.histogram closes the last bin on the right; the grid bins are half-open
+    assert np.abs(counts - expected).sum() <= 2
+
+
+def test_histogram_of_constant_values_has_one_centred_bin():
+    histogram = BinnedHistogram().update(np.full(100, 7.0))
+    counts, edges = histogram.histogram()
+    assert counts.tolist() == [100] and edges.tolist() == [6.5, 7.5]
+    histogram.update(np.array([9.0]))
+    counts, edges = histogram.histogram()
+    assert counts.sum() == 101 and len(edges) > 2
+
+
+if __name__ == "__main__":
+    test_quantile_sketch_rank_error_is_bounded()
+    test_merged_sketches_keep_the_bound()
+    test_repeated_values_are_weighted_exactly()
+    test_histogram_counts_stay_exact_when_bins_double()
+    test_histogram_of_constant_values_has_one_centred_bin()
+    print("sketch tests passed")
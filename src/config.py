@@ -16,6 +16,88 @@ class Config:
     
     # LLM Selection (default to Groq/Llama3 for speed)
     DEFAULT_MODEL = "llama-3.3-70b-versatile"
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))  # seconds per request
+    # Backend: "groq", or "fake" for an offline stand-in with synthetic answers
+    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+    # One pooled keep-alive HTTP client per process (HTTP/2 when the h2 package is installed)
+    LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+    FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", 0))
+    FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", 0))
+
+    # Request scheduling: provider rate limits (0 = unlimited) and retry/backoff
+    LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 30))
+    LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 12000))
+    LLM_COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", 300))  # reserved per request until usage is known
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))
+    LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 1.0))  # seconds, doubled per retry
+    LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 30))
+
+    # Local LLM response cache (SQLite under CACHE_DIR)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", 168))
+    LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", 64))
+
+    # Chat with Data: answer aggregate questions by running an LLM-written query spec locally
+    CHAT_QUERY_ENGINE = os.getenv("CHAT_QUERY_ENGINE", "true").lower() == "true"
+    MAX_QUERY_ROWS = int(os.getenv("MAX_QUERY_ROWS", 50))  # groups shown per answer
+    # Answers reused for repeated questions on the same dataset version (0 entries disables)
+    ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 256))  # questions per dataset
+    ANSWER_CACHE_DATASETS = int(os.getenv("ANSWER_CACHE_DATASETS", 16))
+
+    # Insight generation: parallel LLM requests, and whether run() analyzes every chart
+    INSIGHT_CONCURRENCY = int(os.getenv("INSIGHT_CONCURRENCY", 8))
+    RUN_INSIGHTS = os.getenv("RUN_INSIGHTS", "false").lower() == "true"
+    # Pack several charts into one insight request, up to a prompt token budget
+    BATCH_INSIGHTS = os.getenv("BATCH_INSIGHTS", "true").lower() == "true"
+    INSIGHT_BATCH_TOKENS = int(os.getenv("INSIGHT_BATCH_TOKENS", 4000))
+    INSIGHT_BATCH_MAX_CHARTS = int(os.getenv("INSIGHT_BATCH_MAX_CHARTS", 8))
+
+    # Ingestion: rows per chunk for streaming CSV reads (0 = read in one go)
+    INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", 0))
+
+    # Local caches (parsed datasets are stored as Parquet under CACHE_DIR/datasets)
+    CACHE_DIR = os.getenv("KPI_CACHE_DIR", str(Path(__file__).resolve().parent.parent / ".cache"))
+    DATASET_CACHE_MAX_MB = int(os.getenv("DATASET_CACHE_MAX_MB", 2048))
+
+    # Dtype optimization after ingestion
+    OPTIMIZE_DTYPES = os.getenv("OPTIMIZE_DTYPES", "true").lower() == "true"
+    # String columns become categoricals only when unique/rows is at most the ratio and the
+    # number of unique values at most the cap, so ID-like columns stay plain strings
+    CATEGORY_MAX_RATIO = float(os.getenv("CATEGORY_MAX_RATIO", 0.05))
+    CATEGORY_MAX_UNIQUE = int(os.getenv("CATEGORY_MAX_UNIQUE", 50_000))
+    ALLOW_FLOAT32 = os.getenv("ALLOW_FLOAT32", "false").lower() == "true"  # lossy float64 -> float32
+
+    # Dataset profile (dtypes, nulls, distinct counts, quartiles, top values) shared by
+    # the preview, cleaning, classification and schema inference; computed once per dataset version
+    PROFILE_CHUNK_ROWS = int(os.getenv("PROFILE_CHUNK_ROWS", 1_000_000))
+    PROFILE_TOP_VALUES = int(os.getenv("PROFILE_TOP_VALUES", 5))
+    PROFILE_MAX_TRACKED_VALUES = int(os.getenv("PROFILE_MAX_TRACKED_VALUES", 10_000))  # exact value counts up to this many distinct
+
+    # Schema inference in DataPointEngine
+    SCHEMA_SAMPLE_ROWS = int(os.getenv("SCHEMA_SAMPLE_ROWS", 5000))
+    SCHEMA_DATE_CONFIDENCE = float(os.getenv("SCHEMA_DATE_CONFIDENCE", 0.95))
+
+    # Chart computation threads (0 = one per CPU core)
+    CHART_WORKERS = int(os.getenv("CHART_WORKERS", 0))
+
+    # Time-series charts: bucket size (hour/day/week/month/quarter/year, or auto from
+    # the date range) and the point cap above which series are LTTB-downsampled
+    TIME_GRANULARITY = os.getenv("TIME_GRANULARITY", "month").lower()
+    MAX_SERIES_POINTS = int(os.getenv("MAX_SERIES_POINTS", 500))
+
+    # Target number of bins for distribution charts
+    HISTOGRAM_BINS = int(os.getenv("HISTOGRAM_BINS", 30))
+
+    # Seed for chart and prompt sampling (same data + seed -> same sample)
+    SAMPLE_SEED = int(os.getenv("SAMPLE_SEED", 0))
+
+    # Chart result cache (in memory; evicted entries spill to CACHE_DIR/charts if SPILL_MB > 0)
+    CHART_CACHE_MAX_MB = int(os.getenv("CHART_CACHE_MAX_MB", 64))
+    CHART_CACHE_SPILL_MB = int(os.getenv("CHART_CACHE_SPILL_MB", 0))
+
+    # Keep mergeable chart aggregates so KPIAgent.refresh() can fold in appended rows
+    INCREMENTAL_REFRESH = os.getenv("INCREMENTAL_REFRESH", "false").lower() == "true"
 
     @classmethod
     def validate(cls):
@@ -1,21 +1,102 @@
-from groq import Groq
+import json
+from typing import Iterator
 from src.config import Config
+from src.llm.cache import ResponseCache, response_key
+from src.llm.providers import LLMProvider, build_provider
+from src.llm.scheduler import NORMAL, RequestScheduler, estimate_tokens
 
 class LLMClient:
-    def __init__(self, provider="groq"):
-        self.provider = provider
-        # Force Groq client initialization
-        self.client = Groq(api_key=Config.GROQ_API_KEY)
-    
-    def generate(self, prompt: str, model: str = None, json_mode: bool = False) -> str:
+    def __init__(self, provider="groq", cache: ResponseCache = None, scheduler: RequestScheduler = None):
+        # A provider name (see build_provider) or an LLMProvider instance, e.g. a FakeProvider offline
+        self.provider = provider if isinstance(provider, LLMProvider) else build_provider(provider)
+        # Identical prompts are answered from the local response cache
+        if cache is None and Config.LLM_CACHE_ENABLED:
+            cache = ResponseCache()
+        self.cache = cache
+        # Rate limits, priorities and retry/backoff for every request of this client
+        self.scheduler = scheduler or RequestScheduler()
+
+    def generate(self, prompt: str, model: str = None, json_mode: bool = False, timeout: float = None,
+                 use_cache: bool = True, priority: int = NORMAL) -> str:
         """
         Generic generation method.
+        timeout: seconds for this request (defaults to Config.LLM_TIMEOUT).
+        use_cache: set False to always call the model.
+        priority: scheduler priority (INTERACTIVE, NORMAL or BACKGROUND).
+        """
+        model = model or Config.DEFAULT_MODEL
+
+        key = None
+        if use_cache and self.cache is not None:
+            key = response_key(model, prompt, json_mode, self.provider.name)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        reserved = estimate_tokens(prompt) + Config.LLM_COMPLETION_TOKENS
+        completion = self.scheduler.run(
+            lambda: self.provider.complete(prompt, model, json_mode, timeout or Config.LLM_TIMEOUT),
+            tokens=reserved,
+            priority=priority,
+            is_retryable=self.provider.is_retryable,
+            retry_after=self.provider.retry_after
+        )
+        if completion.total_tokens:
+            self.scheduler.record_usage(reserved, completion.total_tokens)
+        content = completion.content
+        if key is not None and _cacheable(content, json_mode):
+            self.cache.put(key, model, content)
+        return content
+
+    def generate_stream(self, prompt: str, model: str = None, timeout: float = None,
+                        use_cache: bool = True, priority: int = NORMAL) -> Iterator[str]:
+        """
+        Text generation that yields the answer in pieces as they arrive.
+        Cached answers are yielded whole; failures before the first piece are
+        retried by the scheduler like generate().
         """
         model = model or Config.DEFAULT_MODEL
-        
-        response = self.client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model=model,
-            response_format={"type": "json_object"} if json_mode else None
+
+        key = None
+        if use_cache and self.cache is not None:
+            key = response_key(model, prompt, False, self.provider.name)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        def start():
+            pieces = self.provider.stream(prompt, model, timeout or Config.LLM_TIMEOUT)
+            return next(pieces, ""), pieces
+
+        reserved = estimate_tokens(prompt) + Config.LLM_COMPLETION_TOKENS
+        first, pieces = self.scheduler.run(
+            start,
+            tokens=reserved,
+            priority=priority,
+            is_retryable=self.provider.is_retryable,
+            retry_after=self.provider.retry_after
         )
-        return response.choices[0].message.content
+        parts = [first]
+        yield first
+        for piece in pieces:
+            parts.append(piece)
+            yield piece
+
+        content = "".join(parts)
+        self.scheduler.record_usage(reserved, estimate_tokens(prompt) + estimate_tokens(content))
+        if key is not None and _cacheable(content, False):
+            self.cache.put(key, model, content)
+
+
+def _cacheable(content: str, json_mode: bool) -> bool:
+    # Never pin a malformed JSON answer in the cache
+    if not content:
+        return False
+    if not json_mode:
+        return True
+    try:
+        json.loads(content)
+        return True
+    except ValueError:
+        return False
@@ -6,7 +6,8 @@ You are a data analyst.
 Analyze the dataset and identify its business or data domain.
 
 Columns: {columns}
-Sample rows: {sample}
+Column profile:
+{profile}
 
 Rules:
 - Do not guess a specific business if unsure.
@@ -74,6 +75,32 @@ Return STRICT JSON only:
 """
 
 
+    CARD_SELECTION = """
+You are a BI dashboard designer.
+
+Choose the 3 KPIs that make the best headline dashboard cards.
+
+KPIs: {kpis}
+
+Rules:
+- Prefer KPIs that summarize overall performance or key trends.
+- Avoid picking near-duplicate KPIs.
+- Use the KPI ids exactly as given.
+
+Return STRICT JSON only:
+{{
+  "cards": [
+    {{
+      "title": "...",
+      "kpi_id": "...",
+      "relevance_score": 0.0,
+      "visual_type": "bar/line/pie/scatter/metric"
+    }}
+  ]
+}}
+"""
+
+
     CHART_GENERATION = """
 You are a universal BI chart generator.
 
@@ -158,13 +185,66 @@ Return STRICT JSON only:
   "summary_text": "...",
   "insights": ["...", "..."]
 }}
+"""
+
+    BATCH_INSIGHT_GENERATION = """
+You are an analytical reporting system.
+
+Charts (each starts with its key in brackets; data points are given as parallel arrays):
+
+{charts}
+
+Task:
+Summarize patterns and insights for every chart.
+
+Rules:
+- Mention trends, highest/lowest values, or anomalies
+- Do not repeat raw numbers
+- Keep language business-friendly
+- Return exactly one result per chart, with the chart's key (e.g. "c0")
+
+Return STRICT JSON only:
+{{
+  "results": [
+    {{"key": "c0", "summary_text": "...", "insights": ["...", "..."]}}
+  ]
+}}
+"""
+
+    CHAT_QUERY_SPEC = """
+You translate questions about a dataset into an aggregation query that will be run on the full data.
+
+Columns (name: kind, example values):
+{schema}
+
+User Question: {question}
+
+Rules:
+- Use only the columns listed, spelled exactly.
+- filters: op is one of ==, !=, >, >=, <, <=, in, not in, between, contains ("in"/"not in" take a list, "between" takes [low, high]).
+- aggregates: func is one of sum, mean, median, min, max, count, nunique; use {{"func": "count"}} without a column to count rows.
+- group_by: at most 2 columns; when grouping by a date column set time_granularity (hour, day, week, month, quarter or year).
+- sort: "desc" or "asc" by the first aggregate, or "auto" (chronological for dates, otherwise largest first).
+- limit: number of groups to return (e.g. 5 for "top 5").
+- If the question cannot be answered by filtering, grouping and aggregating, return {{"answerable": false}}.
+
+Return STRICT JSON only:
+{{
+  "answerable": true,
+  "filters": [{{"column": "...", "op": "==", "value": "..."}}],
+  "group_by": ["..."],
+  "time_granularity": null,
+  "aggregates": [{{"func": "sum", "column": "..."}}],
+  "sort": "auto",
+  "limit": 10
+}}
 """
 
     CHAT_WITH_DATA = """
 You are a helpful data assistant.
 
 Dataset Columns: {columns}
-Sample Data (first 10 rows):
+Sample Data (10 representative rows):
 {sample_data}
 
 User Question: {question}
@@ -0,0 +1,355 @@
+import ast
+import json
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, NamedTuple, Optional
+from src.config import Config
+from src.llm.cache import response_key
+from src.llm.scheduler import estimate_tokens
+
+try:
+    import h2  # noqa: F401  (HTTP/2 support for httpx)
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
+_http_client = None
+_http_lock = threading.Lock()
+
+
+def shared_http_client():
+    """
+    One pooled keep-alive httpx client per process, shared by every provider
+    (and so by every agent and Streamlit session) instead of a new connection
+    pool per LLMClient. Uses HTTP/2 when the h2 package is installed.
+    """
+    global _http_client
+    if _http_client is None:
+        with _http_lock:
+            if _http_client is None:
+                import httpx
+                _http_client = httpx.Client(
+                    http2=HAS_HTTP2 and Config.LLM_HTTP2,
+                    limits=httpx.Limits(
+                        max_connections=Config.LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=Config.LLM_MAX_CONNECTIONS,
+                        keepalive_expiry=60
+                    ),
+                    timeout=Config.LLM_TIMEOUT
+                )
+    return _http_client
+
+
+class Completion(NamedTuple):
+    content: str
+    total_tokens: Optional[int] = None
+
+
+class LLMProvider:
+    """
+    Backend interface used by LLMClient. Providers make one completion call
+    and say which of their errors are worth retrying; rate limiting, retries
+    and caching are handled by the client.
+    """
+
+    name = "base"
+
+    def complete(self, prompt: str, model: str, json_mode: bool, timeout: float) -> Completion:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, model: str, timeout: float) -> Iterator[str]:
+        """
+        Yield the (text) completion in pieces as they arrive. Providers without
+        streaming yield the whole answer at once.
+        """
+        yield self.complete(prompt, model, False, timeout).content
+
+    def is_retryable(self, error: Exception) -> bool:
+        return False
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        return None
+
+
+class GroqProvider(LLMProvider):
+    """
+    Groq chat completions. The SDK client is created on first use, so building
+    an LLMClient needs neither an API key nor the network.
+    """
+
+    name = "groq"
+
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from groq import Groq
+                    # Retries are left to the client's scheduler; connections come from the shared pool
+                    self._client = Groq(
+                        api_key=self.api_key or Config.GROQ_API_KEY,
+                        max_retries=0,
+                        http_client=shared_http_client()
+                    )
+        return self._client
+
+    def complete(self, prompt: str, model: str, json_mode: bool, timeout: float) -> Completion:
+        response = self.client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=model,
+            response_format={"type": "json_object"} if json_mode else None,
+            timeout=timeout
+        )
+        usage = getattr(response, "usage", None)
+        return Completion(response.choices[0].message.content, getattr(usage, "total_tokens", None))
+
+    def stream(self, prompt: str, model: str, timeout: float) -> Iterator[str]:
+        response = self.client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=model,
+            stream=True,
+            timeout=timeout
+        )
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            response.close()
+
+    def is_retryable(self, error: Exception) -> bool:
+        import groq
+        # Rate limits, timeouts, dropped connections and 5xx responses are transient
+        return isinstance(error, (groq.RateLimitError, groq.APIConnectionError, groq.InternalServerError))
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        value = response.headers.get("retry-after") if response is not None else None
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+
+class FakeProviderError(Exception):
+    """
+    Simulated provider failure; status_code mirrors the HTTP status it stands for.
+    """
+
+    def __init__(self, status_code: int, retry_after: float = None):
+        super().__init__(f"simulated provider error {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class FakeProvider(LLMProvider):
+    """
+    In-process stand-in for a hosted model, for offline benchmarks and tests.
+
+    Responses are replayed from `recordings` (response_key -> content, see
+    RecordingProvider) and otherwise synthesized from the prompt template, so
+    every pipeline stage gets well-formed output. Each call sleeps for a
+    lognormal latency (median latency_ms, spread latency_sigma) and fails
+    with probability error_rate: half of those as rate limits (429, with
+    Retry-After), half as server errors (503). Streamed answers arrive word by
+    word, the first after ttft_fraction of the latency. Seeded for repeatable runs.
+    """
+
+    name = "fake"
+
+    def __init__(self, recordings: Dict[str, str] = None, latency_ms: float = 0.0, latency_sigma: float = 0.0,
+                 error_rate: float = 0.0, retry_after: float = 0.0, ttft_fraction: float = 0.2, seed: int = 0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.recordings = dict(recordings or {})
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.retry_after_seconds = retry_after
+        self.ttft_fraction = ttft_fraction
+        self.sleep = sleep
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.replayed = 0
+        self.errors = 0
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "FakeProvider":
+        """
+        Load recordings written by RecordingProvider (one JSON object per line).
+        """
+        recordings = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    recordings[record["key"]] = record["response"]
+        return cls(recordings=recordings, **kwargs)
+
+    def complete(self, prompt: str, model: str, json_mode: bool, timeout: float) -> Completion:
+        latency, error = self._draw()
+        if latency > 0:
+            self.sleep(latency)
+        if error is not None:
+            raise error
+        content = self._answer(prompt, model, json_mode)
+        return Completion(content, estimate_tokens(prompt) + estimate_tokens(content))
+
+    def stream(self, prompt: str, model: str, timeout: float) -> Iterator[str]:
+        latency, error = self._draw()
+        if latency > 0:
+            self.sleep(latency * self.ttft_fraction)
+        if error is not None:
+            raise error
+        words = re.findall(r"\S+\s*", self._answer(prompt, model, False)) or [""]
+        per_word = latency * (1 - self.ttft_fraction) / max(len(words) - 1, 1)
+        for i, word in enumerate(words):
+            if i and per_word > 0:
+                self.sleep(per_word)
+            yield word
+
+    def _draw(self):
+        # Latency and (possibly) failure for one call
+        with self._lock:
+            self.calls += 1
+            latency = self.latency_ms / 1000.0
+            if latency > 0 and self.latency_sigma > 0:
+                latency *= self.rng.lognormvariate(0.0, self.latency_sigma)
+            failed = self.rng.random() < self.error_rate
+            status = 429 if self.rng.random() < 0.5 else 503
+            if failed:
+                self.errors += 1
+        error = FakeProviderError(status, self.retry_after_seconds if status == 429 else None) if failed else None
+        return latency, error
+
+    def _answer(self, prompt: str, model: str, json_mode: bool) -> str:
+        content = self.recordings.get(response_key(model, prompt, json_mode))
+        if content is None:
+            return synthetic_response(prompt, json_mode)
+        with self._lock:
+            self.replayed += 1
+        return content
+
+    def is_retryable(self, error: Exception) -> bool:
+        return isinstance(error, FakeProviderError)
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        return getattr(error, "retry_after", None)
+
+
+class RecordingProvider(LLMProvider):
+    """
+    Passes calls through to another provider and appends each response to a
+    JSONL file that FakeProvider.from_file can replay.
+    """
+
+    name = "recording"
+
+    def __init__(self, inner: LLMProvider, path: str):
+        self.inner = inner
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def complete(self, prompt: str, model: str, json_mode: bool, timeout: float) -> Completion:
+        completion = self.inner.complete(prompt, model, json_mode, timeout)
+        record = {"key": response_key(model, prompt, json_mode), "model": model, "response": completion.content}
+        self._record(record)
+        return completion
+
+    def stream(self, prompt: str, model: str, timeout: float) -> Iterator[str]:
+        pieces = []
+        for piece in self.inner.stream(prompt, model, timeout):
+            pieces.append(piece)
+            yield piece
+        self._record({"key": response_key(model, prompt, False), "model": model, "response": "".join(pieces)})
+
+    def _record(self, record: dict):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def is_retryable(self, error: Exception) -> bool:
+        return self.inner.is_retryable(error)
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        return self.inner.retry_after(error)
+
+
+def build_provider(name: str = None) -> LLMProvider:
+    name = (name or Config.LLM_PROVIDER).lower()
+    if name == "groq":
+        return GroqProvider()
+    if name == "fake":
+        return FakeProvider(latency_ms=Config.FAKE_LLM_LATENCY_MS, error_rate=Config.FAKE_LLM_ERROR_RATE)
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+def synthetic_response(prompt: str, json_mode: bool) -> str:
+    """
+    Plausible, well-formed answer for each prompt in Prompts, derived from
+    what the prompt itself contains (columns, KPI ids, chart keys).
+    """
+    if "identify its business or data domain" in prompt:
+        return json.dumps({
+            "domain": "Operational Data",
+            "dataset_type": "Transactional",
+            "summary": "Synthetic classification.",
+            "confidence": 0.5
+        })
+
+    if "meaningful KPIs" in prompt:
+        columns = _literal_after(prompt, "Columns:") or []
+        kpis = [
+            {
+                "name": f"Total {col}",
+                "description": f"Sum of {col}",
+                "calculation_logic": f"SUM({col})",
+                "unit": None,
+                "visualization_type": "bar",
+                "dimension_hint": col
+            }
+            for col in columns[:8]
+        ]
+        return json.dumps({"kpis": kpis})
+
+    if "dashboard cards" in prompt:
+        kpis = _literal_after(prompt, "KPIs:") or []
+        cards = [
+            {"title": k.get("name", ""), "kpi_id": k.get("id", ""), "relevance_score": round(1 - i / 10, 2), "visual_type": "bar"}
+            for i, k in enumerate(kpis[:3]) if isinstance(k, dict)
+        ]
+        return json.dumps({"cards": cards})
+
+    if "into an aggregation query" in prompt:
+        # No language understanding here: let chat fall back to the sample path
+        return json.dumps({"answerable": False})
+
+    keys = re.findall(r"^\[(c\d+)\]", prompt, flags=re.MULTILINE)
+    if keys:
+        return json.dumps({"results": [
+            {"key": key, "summary_text": "Synthetic summary.", "insights": ["Synthetic insight."]}
+            for key in keys
+        ]})
+
+    if json_mode:
+        return json.dumps({"summary_text": "Synthetic summary.", "insights": ["Synthetic insight."]})
+    return "Synthetic answer."
+
+
+def _literal_after(prompt: str, marker: str):
+    # Prompts embed Python reprs of lists (e.g. "Columns: ['a', 'b']")
+    for line in prompt.splitlines():
+        if line.startswith(marker):
+            try:
+                return ast.literal_eval(line[len(marker):].strip())
+            except (ValueError, SyntaxError):
+                return None
+    return None
@@ -0,0 +1,173 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable
+import numpy as np
+from src.config import Config
+
+# Request priorities (lower runs first)
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count for budgeting (about 4 characters per token).
+    """
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """
+    Refills continuously at rate_per_minute, holding at most one minute's worth.
+    A rate of 0 means unlimited. The balance may go negative when actual usage
+    turns out higher than what was reserved.
+    """
+
+    def __init__(self, rate_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.clock = clock
+        self.level = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """
+        Seconds until `amount` can be taken (0 if it can be taken now).
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float):
+        if self.rate <= 0:
+            return
+        self._refill()
+        self.level -= min(amount, self.capacity) if amount > 0 else amount
+
+
+class RequestScheduler:
+    """
+    Shared admission control for LLM requests.
+
+    Callers block in a priority queue (interactive before normal before
+    background, FIFO within a priority) until the request and token buckets
+    admit them; failed calls that are retryable are retried with full-jitter
+    exponential backoff, honouring a Retry-After hint, and go through
+    admission again. Clock, sleep and random source are injectable so the
+    scheduler can be driven deterministically in tests.
+    """
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 max_retries: int = None, backoff_base: float = None, backoff_max: float = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep,
+                 rng: random.Random = None):
+        rpm = Config.LLM_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute
+        tpm = Config.LLM_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute
+        self.requests = TokenBucket(rpm, clock)
+        self.tokens = TokenBucket(tpm, clock)
+        self.max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = Config.LLM_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = Config.LLM_BACKOFF_MAX if backoff_max is None else backoff_max
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._latencies = deque(maxlen=1000)
+        self._waits = deque(maxlen=1000)
+        self.counters = {"requests": 0, "retries": 0, "failures": 0, "max_queue_depth": 0}
+
+    def run(self, fn: Callable[[], object], tokens: int = 0, priority: int = NORMAL,
+            is_retryable: Callable[[Exception], bool] = None,
+            retry_after: Callable[[Exception], float] = None):
+        """
+        Call fn() once admitted, retrying retryable failures. Returns fn's result
+        or raises its last exception.
+        """
+        attempt = 0
+        while True:
+            self._admit(tokens, priority)
+            start = self.clock()
+            try:
+                result = fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not (is_retryable and is_retryable(e)):
+                    with self._cond:
+                        self.counters["failures"] += 1
+                    raise
+                hint = retry_after(e) if retry_after else None
+                delay = self.backoff(attempt, hint)
+                with self._cond:
+                    self.counters["retries"] += 1
+                print(f"LLM request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                self.sleep(delay)
+                attempt += 1
+                continue
+            with self._cond:
+                self.counters["requests"] += 1
+                self._latencies.append(self.clock() - start)
+            return result
+
+    def record_usage(self, reserved: int, actual: int):
+        """
+        Charge (or refund) the token bucket once the real usage is known.
+        """
+        with self._cond:
+            self.tokens.take(actual - reserved)
+
+    def backoff(self, attempt: int, retry_after: float = None) -> float:
+        delay = self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _admit(self, tokens: int, priority: int):
+        ticket = (priority, next(self._seq))
+        queued_at = self.clock()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], len(self._queue))
+            while True:
+                if self._queue[0] == ticket:
+                    wait = max(self.requests.delay(1), self.tokens.delay(tokens))
+                    if wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        heapq.heappop(self._queue)
+                        self._waits.append(self.clock() - queued_at)
+                        self._cond.notify_all()
+                        return
+                    # The head waits for budget without holding the lock; newcomers
+                    # with higher priority can still take its place meanwhile
+                    self._cond.release()
+                    try:
+                        self.sleep(wait)
+                    finally:
+                        self._cond.acquire()
+                else:
+                    self._cond.wait()
+
+    def metrics(self) -> dict:
+        with self._cond:
+            latencies = np.array(self._latencies, dtype="float64")
+            waits = np.array(self._waits, dtype="float64")
+            metrics = dict(self.counters, queue_depth=len(self._queue))
+        for name, values in (("latency", latencies), ("queue_wait", waits)):
+            if len(values):
+                metrics[f"{name}_p50"] = round(float(np.percentile(values, 50)), 3)
+                metrics[f"{name}_p95"] = round(float(np.percentile(values, 95)), 3)
+        return metrics
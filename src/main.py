@@ -1,26 +1,56 @@
+import time
 import uuid
+from contextlib import contextmanager
 from src.services.ingestion import DataIngestionService
 from src.services.classifier import DomainClassifier
 from src.services.composer import KPIComposer
 from src.services.card_selector import CardSelector
 from src.services.data_engine import DataPointEngine
 from src.services.analytics import DescriptiveAnalytics
-from src.services.persistence import PersistenceLayer
 from src.llm.client import LLMClient
 
 from src.services.cleaning import DataCleaningService
+from src.services.dataset_cache import derive_fingerprint, fingerprint_bytes, fingerprint_frame
+from src.services.chart_cache import ChartCache
+from src.services.answer_cache import AnswerCache
+from src.services.incremental import IncrementalChartState
+from src.services.profiler import profile_dataset
+from src.config import Config
 
 class KPIAgent:
-    def __init__(self):
-        self.llm = LLMClient()
+    def __init__(self, llm: LLMClient = None, persistence=None, answer_cache: AnswerCache = None):
+        # Inject an LLMClient (e.g. with a FakeProvider) to run the pipeline offline
+        self.llm = llm or LLMClient(provider=Config.LLM_PROVIDER)
         self.ingestion = DataIngestionService()
         self.cleaner = DataCleaningService()
         self.classifier = DomainClassifier(self.llm)
         self.composer = KPIComposer(self.llm)
         self.card_selector = CardSelector(self.llm)
         self.data_engine = None
-        self.analytics = DescriptiveAnalytics(self.llm)
-        self.persistence = PersistenceLayer()
+        self.chart_cache = ChartCache()
+        self.chart_state = None
+        self.kpis = []
+        self.profile = None
+        self.answer_cache = answer_cache or AnswerCache()
+        self.analytics = DescriptiveAnalytics(self.llm, answer_cache=self.answer_cache)
+        self._persistence = persistence
+        self.stage_timings = {}
+
+    @property
+    def persistence(self):
+        # Connect to MySQL only when results are actually stored
+        if self._persistence is None:
+            from src.services.persistence import PersistenceLayer
+            self._persistence = PersistenceLayer()
+        return self._persistence
+
+    @contextmanager
+    def _stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_timings[name] = time.perf_counter() - start
 
     def run(self, csv_url: str = None, file_obj = None, cleaning_params: dict = None):
         if cleaning_params is None:
@@ -28,37 +58,63 @@ class KPIAgent:
             
         session_id = str(uuid.uuid4())
         print(f"Starting Session: {session_id}")
+        # Wall-clock seconds per stage of this run
+        self.stage_timings = {}
 
         # 1. Ingestion
-        df = self.ingestion.ingest_from_url(csv_url, file_obj)
-        df = self.ingestion.normalize_columns(df)
+        with self._stage("ingestion"):
+            df = self.ingestion.ingest_from_url(csv_url, file_obj)
+            df = self.ingestion.normalize_columns(df)
+        self.dataset_fingerprint = self.ingestion.last_fingerprint
         
         # 1.5 Cleaning (Robust)
         numeric_strat = cleaning_params.get("numeric_imputation", "median")
         cat_strat = cleaning_params.get("categorical_imputation", "mode")
         
-        df = self.cleaner.clean_dataset(df, numeric_imputation=numeric_strat, categorical_imputation=cat_strat)
+        with self._stage("cleaning"):
+            # Re-running on the same upload re-applies its fitted plan instead of refitting
+            df = self.cleaner.clean_fitted(df, self.dataset_fingerprint, numeric_imputation=numeric_strat,
+                                           categorical_imputation=cat_strat)
         
-        # Capture Cleaning Report
+        # Capture Cleaning Report and the reusable plan for future batches
         self.cleaning_report = self.cleaner.report
+        self.cleaning_plan = self.cleaner.plan
+        # The cleaned frame is identified by the raw upload plus the cleaning rules
+        cleaned_fingerprint = derive_fingerprint(self.dataset_fingerprint, self.cleaning_plan.plan_hash())
 
         # 2. Classification
-        domain_info = self.classifier.classify(df)
+        with self._stage("classification"):
+            # One profile of the cleaned frame serves the classifier and the chart schema
+            self.profile = profile_dataset(df, cleaned_fingerprint)
+            domain_info = self.classifier.classify(df, profile=self.profile)
         print(f"Detected Domain: {domain_info.domain}")
 
         # 3. KPI Generation
-        kpis = self.composer.generate_kpis(domain_info.domain, list(df.columns))
+        with self._stage("kpi_generation"):
+            kpis = self.composer.generate_kpis(domain_info.domain, list(df.columns))
+        self.kpis = kpis
         print(f"Generated {len(kpis)} KPIs")
 
         # 4. Card Selection
-        selected_cards = self.card_selector.select_top_cards(kpis)
+        with self._stage("card_selection"):
+            selected_cards = self.card_selector.select_top_cards(kpis)
 
         # 5. Data Extraction & Analytics
-        data_points = self.data_engine.generate_data_points(df, kpis)
+        with self._stage("charts"):
+            self.data_engine = DataPointEngine(
+                df, fingerprint=cleaned_fingerprint, cache=self.chart_cache, profile=self.profile
+            )
+            charts = None
+            if Config.INCREMENTAL_REFRESH:
+                # Keep mergeable chart aggregates so appended rows can be folded in by refresh()
+                self.chart_state = IncrementalChartState(self.data_engine)
+                charts = self.chart_state.charts()
+            data_points = self.data_engine.generate_data_points(df, kpis, charts=charts)
         analyses = []
-        # Optimization: Disabled per-graph AI analysis for speed
-        # for kpi, dp in zip(kpis, data_points):
-        #     analyses.append(self.analytics.analyze(kpi, dp))
+        if Config.RUN_INSIGHTS:
+            # Opt-in: charts are analyzed concurrently, so this costs about the slowest few calls
+            with self._stage("insights"):
+                analyses = self.analytics.analyze_many(data_points, kpis)
 
         # 6. Persistence
         result = {
@@ -67,6 +123,52 @@ class KPIAgent:
             "cards": [c.model_dump(mode='json') for c in selected_cards],
             "data_points": [dp.model_dump(mode='json') for dp in data_points],
             "analyses": [a.model_dump(mode='json') for a in analyses],
-            "cleaning_report": getattr(self, 'cleaning_report', [])
+            "cleaning_report": getattr(self, 'cleaning_report', []),
+            "cleaning_plan": self.cleaning_plan.model_dump(mode='json')
         }
         return session_id, result, df
+
+    def refresh(self, csv_url: str = None, file_obj = None, df = None):
+        """
+        Incremental refresh for append-only feeds: only the new rows are
+        ingested (in chunks), cleaned with the stored cleaning plan and folded
+        into the chart state, so the cost scales with the delta rather than
+        the full history. Requires a prior run() with INCREMENTAL_REFRESH on.
+        Duplicates are only dropped within the delta. The data engine's frame
+        and fingerprint move to the new version and its cached chat answers
+        are dropped. Returns the refreshed data points.
+        """
+        if self.chart_state is None:
+            raise ValueError("No incremental state: call run() with INCREMENTAL_REFRESH enabled first")
+
+        if df is not None:
+            batches = [df]
+            delta_fingerprint = fingerprint_frame(df)
+        elif file_obj is not None:
+            delta_fingerprint = fingerprint_bytes(file_obj)
+            batches = self.ingestion.iter_chunks(file_obj=file_obj)
+        else:
+            batches = [self.ingestion.ingest_from_url(csv_url)]
+            delta_fingerprint = self.ingestion.last_fingerprint
+
+        new_rows = 0
+        cleaned = []
+        for batch in batches:
+            batch = self.ingestion.normalize_columns(batch)
+            batch = self.cleaner.apply_plan(batch, self.cleaning_plan)
+            self.chart_state.update(batch)
+            # Held in the engine's compact dtypes, not as the raw batch
+            cleaned.append(self.data_engine.conform(batch))
+            new_rows += len(batch)
+        print(f"Refreshed with {new_rows} new rows ({self.chart_state.rows} total)")
+
+        # The dashboard now reflects history + delta
+        self.dataset_fingerprint = derive_fingerprint(self.dataset_fingerprint, delta_fingerprint)
+        # Drill-downs and chat queries run on the engine's frame: give it the new rows and version
+        stale_fingerprint = self.data_engine.fingerprint
+        self.data_engine.append(
+            cleaned, fingerprint=derive_fingerprint(self.dataset_fingerprint, self.cleaning_plan.plan_hash())
+        )
+        self.answer_cache.invalidate(stale_fingerprint)
+        self.profile = None
+        return self.data_engine.generate_data_points(None, self.kpis, charts=self.chart_state.charts())
@@ -1,6 +1,8 @@
-from typing import List, Optional, Any, Dict
-from pydantic import BaseModel, Field
+from typing import List, Optional, Any, Dict, Literal
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
+import hashlib
+import pandas as pd
 
 class KPI(BaseModel):
     id: str = Field(..., description="Unique identifier for the KPI")
@@ -18,13 +20,51 @@ class Card(BaseModel):
 
 class DataPoint(BaseModel):
     kpi_id: str
-    data: List[Dict[str, Any]] = Field(..., description="List of rows/points for the chart")
+    columns: Dict[str, List[Any]] = Field(default_factory=dict, description="Columnar chart payload: parallel arrays such as label/value or x/y")
     extracted_at: datetime = Field(default_factory=datetime.now)
     title: Optional[str] = None
     chart_type: Optional[str] = None
     x_label: Optional[str] = None
     y_label: Optional[str] = None
 
+    @model_validator(mode="before")
+    @classmethod
+    def _from_rows(cls, values):
+        # Accept the legacy row format (data=[{"label": ..., "value": ...}, ...])
+        if isinstance(values, dict) and "data" in values:
+            values = dict(values)
+            rows = values.pop("data") or []
+            if "columns" not in values:
+                keys = list(dict.fromkeys(k for row in rows for k in row))
+                values["columns"] = {k: [row.get(k) for row in rows] for k in keys}
+        return values
+
+    @model_validator(mode="after")
+    def _check_lengths(self):
+        lengths = {len(v) for v in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"DataPoint columns must have equal lengths, got {sorted(lengths)}")
+        return self
+
+    @property
+    def n_points(self) -> int:
+        return len(next(iter(self.columns.values()), []))
+
+    def rows(self, limit: int = None) -> List[Dict[str, Any]]:
+        """
+        Row-oriented view of the payload ([{"label": ..., "value": ...}, ...]).
+        """
+        n = self.n_points if limit is None else min(limit, self.n_points)
+        return [{k: v[i] for k, v in self.columns.items()} for i in range(n)]
+
+    @property
+    def data(self) -> List[Dict[str, Any]]:
+        # Compatibility accessor for code written against the row format
+        return self.rows()
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns)
+
 class DescriptiveAnalysis(BaseModel):
     kpi_id: str
     summary_text: str = Field(..., description="Short textual entry describing the trend")
@@ -35,3 +75,54 @@ class DomainClassification(BaseModel):
     dataset_type: str = Field(..., description="Transactional, Time-series, etc.")
     summary: str
     confidence: float
+
+class CleaningPlan(BaseModel):
+    """
+    Everything DataCleaningService inferred from one dataset, so the same
+    cleaning can be re-applied to later batches without re-inference.
+    """
+    numeric_imputation: str = "median"
+    categorical_imputation: str = "mode"
+    fill_values: Dict[str, Any] = Field(default_factory=dict, description="Column -> imputation value")
+    drop_na_columns: List[str] = Field(default_factory=list, description="Rows with nulls in these columns are dropped")
+    drop_duplicates: bool = True
+    numeric_columns: List[str] = Field(default_factory=list, description="Currency/percent strings coerced to numbers")
+    datetime_columns: List[str] = Field(default_factory=list)
+    clip_bounds: Dict[str, List[float]] = Field(default_factory=dict, description="Column -> [lower, upper] IQR bounds")
+    capped_columns: List[str] = Field(default_factory=list, description="Columns that were capped (stored as float)")
+    total_sales_from: Optional[List[str]] = Field(None, description="[price_col, qty_col] for Total_Sales_Calc")
+    date_parts_from: Optional[str] = None
+    fitted_at: datetime = Field(default_factory=datetime.now)
+
+    def plan_hash(self) -> str:
+        """
+        Stable hash of the cleaning rules (ignores when the plan was fitted).
+        """
+        payload = self.model_dump_json(exclude={"fitted_at"})
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QueryFilter(BaseModel):
+    column: str
+    op: Literal["==", "!=", ">", ">=", "<", "<=", "in", "not in", "between", "contains"] = "=="
+    value: Any = None
+
+class QueryAggregate(BaseModel):
+    func: Literal["sum", "mean", "median", "min", "max", "count", "nunique"] = "sum"
+    column: Optional[str] = Field(None, description="Measure column; None with count means number of rows")
+
+    @property
+    def alias(self) -> str:
+        return self.func if self.column is None else f"{self.func}_{self.column}"
+
+class QuerySpec(BaseModel):
+    """
+    Constrained aggregation query for chat_with_data: the LLM only fills in
+    this spec, and QueryEngine runs it on the full frame.
+    """
+    filters: List[QueryFilter] = Field(default_factory=list)
+    group_by: List[str] = Field(default_factory=list)
+    time_granularity: Optional[Literal["hour", "day", "week", "month", "quarter", "year"]] = Field(None, description="Bucket for time columns in group_by")
+    aggregates: List[QueryAggregate] = Field(default_factory=lambda: [QueryAggregate(func="count")])
+    sort: Literal["auto", "desc", "asc"] = Field("auto", description="Order by the first aggregate (auto: time ascending, otherwise descending)")
+    limit: Optional[int] = 20
@@ -1,29 +1,28 @@
-from typing import List, Optional
+from typing import Callable, Iterator, List, Optional, Tuple
 import json
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from src.config import Config
 from src.llm.client import LLMClient
 from src.llm.prompts import Prompts
-from src.models.domain import DescriptiveAnalysis, DataPoint, KPI
+from src.llm.scheduler import BACKGROUND, INTERACTIVE, estimate_tokens
+from src.models.domain import DescriptiveAnalysis, DataPoint, KPI, QuerySpec
+from src.services.answer_cache import AnswerCache, is_query_question, normalize_question, plan_key
+from src.services.data_engine import DataPointEngine
+from src.services.query_engine import QueryEngine, format_answer
+from src.services.sampling import prompt_sample
 
 class DescriptiveAnalytics:
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, answer_cache: AnswerCache = None):
         self.llm = llm_client
+        # Repeat chat questions on the same dataset version are answered without the LLM
+        self.answer_cache = answer_cache
+        self._chat_engine = None
 
-    def analyze(self, kpi: Optional[KPI], data_point: DataPoint) -> DescriptiveAnalysis:
+    def analyze(self, kpi: Optional[KPI], data_point: DataPoint, timeout: float = None) -> DescriptiveAnalysis:
         """
         Generate text insights based on the data trends.
         """
-        # Fallback metadata if KPI is None (e.g. auto-generated charts)
-        kpi_name = kpi.name if kpi else (data_point.title or "Unknown Metric")
-        kpi_desc = kpi.description if kpi else f"Analysis of {kpi_name}"
-        kpi_id = kpi.id if kpi else data_point.kpi_id
-
-        # Convert data points to string representation for LLM
-        # Limit data size to avoid context limit issues
-        data_sample = data_point.data[:25] # Top 25 points
-        data_str = json.dumps(data_sample)
-        
-        if len(data_point.data) > 25:
-            data_str += f" ... (and {len(data_point.data)-25} more points)"
+        kpi_id, kpi_name, kpi_desc, data_str = self._describe(kpi, data_point)
 
         prompt = Prompts.INSIGHT_GENERATION.format(
             kpi_name=kpi_name,
@@ -32,7 +31,7 @@ class DescriptiveAnalytics:
         )
         
         try:
-            response_str = self.llm.generate(prompt, json_mode=True)
+            response_str = self.llm.generate(prompt, json_mode=True, timeout=timeout, priority=BACKGROUND)
             data = json.loads(response_str)
             
             return DescriptiveAnalysis(
@@ -42,30 +41,284 @@ class DescriptiveAnalytics:
             )
         except Exception as e:
             print(f"Error generating insights for {kpi_name}: {e}")
-            return DescriptiveAnalysis(
+            return self._unavailable(kpi_id, "Could not generate insights due to an error.")
+
+    def analyze_batch(self, items: List[Tuple[Optional[KPI], DataPoint]], timeout: float = None) -> List[DescriptiveAnalysis]:
+        """
+        Analyze several charts with one request (BATCH_INSIGHT_GENERATION),
+        so the instructions are sent once per batch instead of once per chart.
+        Charts missing from a malformed or partial response are retried in
+        two halves; a single chart that still fails falls back to analyze().
+        If the request itself fails, every chart in the batch is reported as
+        unavailable.
+        """
+        if len(items) == 1:
+            return [self.analyze(items[0][0], items[0][1], timeout)]
+
+        described = [self._describe(kpi, dp, compact=True) for kpi, dp in items]
+        blocks = [
+            f"[c{i}] KPI name: {name}\nData points: {data_str}"
+            for i, (_, name, _, data_str) in enumerate(described)
+        ]
+        prompt = Prompts.BATCH_INSIGHT_GENERATION.format(charts="\n\n".join(blocks))
+
+        try:
+            response_str = self.llm.generate(prompt, json_mode=True, timeout=timeout, priority=BACKGROUND)
+        except Exception as e:
+            # The client has already retried; splitting the batch would only repeat a failing request
+            print(f"Error generating insights for a batch of {len(items)} charts: {e}")
+            return [self._unavailable(kpi_id, "Could not generate insights due to an error.")
+                    for kpi_id, _, _, _ in described]
+
+        parsed = {}
+        try:
+            parsed = _parse_batch(response_str)
+        except Exception as e:
+            print(f"Malformed insight response for a batch of {len(items)} charts: {e}")
+
+        results = [None] * len(items)
+        missing = []
+        for i, (kpi_id, _, _, _) in enumerate(described):
+            entry = parsed.get(f"c{i}")
+            if entry is None:
+                missing.append(i)
+                continue
+            results[i] = DescriptiveAnalysis(
                 kpi_id=kpi_id,
-                summary_text="Analysis unavailable.",
-                insights=["Could not generate insights due to an error."]
+                summary_text=entry.get("summary_text", "No summary available."),
+                insights=entry.get("insights", [])
             )
 
-    def chat_with_data(self, question: str, df: "pd.DataFrame") -> str:
+        if missing:
+            print(f"Retrying {len(missing)} of {len(items)} charts from a malformed batch response")
+            half = (len(missing) + 1) // 2
+            for part in (missing[:half], missing[half:]):
+                if part:
+                    for i, analysis in zip(part, self.analyze_batch([items[i] for i in part], timeout)):
+                        results[i] = analysis
+        return results
+
+    def analyze_many(self, data_points: List[DataPoint], kpis: List[KPI] = None, max_concurrency: int = None,
+                     timeout: float = None, deadline: float = None,
+                     on_result: Callable[[int, DescriptiveAnalysis], None] = None,
+                     batch: bool = None) -> List[DescriptiveAnalysis]:
+        """
+        Analyze many data points concurrently; results come back in input order.
+        on_result(index, analysis) is called as each one finishes, so callers
+        can show partial results. See iter_analyses for the parameters.
+        """
+        results = [None] * len(data_points)
+        for i, analysis in self.iter_analyses(data_points, kpis, max_concurrency, timeout, deadline, batch):
+            results[i] = analysis
+            if on_result:
+                on_result(i, analysis)
+        return results
+
+    def iter_analyses(self, data_points: List[DataPoint], kpis: List[KPI] = None, max_concurrency: int = None,
+                      timeout: float = None, deadline: float = None,
+                      batch: bool = None) -> Iterator[Tuple[int, DescriptiveAnalysis]]:
+        """
+        Yield (index, analysis) pairs in completion order.
+        kpis[i] (if given) describes data_points[i]. With batching
+        (Config.BATCH_INSIGHTS) charts are packed into shared requests up to
+        Config.INSIGHT_BATCH_TOKENS. At most max_concurrency requests
+        (Config.INSIGHT_CONCURRENCY) are in flight at once, each limited to
+        timeout seconds (Config.LLM_TIMEOUT). If deadline seconds pass before
+        everything is done, the rest is reported as unavailable.
+        """
+        kpis = kpis or []
+        max_concurrency = max_concurrency or Config.INSIGHT_CONCURRENCY
+        batch = Config.BATCH_INSIGHTS if batch is None else batch
+        if not data_points:
+            return
+
+        items = [(kpis[i] if i < len(kpis) else None, dp) for i, dp in enumerate(data_points)]
+        groups = self._pack(items) if batch else [[i] for i in range(len(items))]
+
+        pool = ThreadPoolExecutor(max_workers=min(max_concurrency, len(groups)))
+        futures = {
+            pool.submit(self.analyze_batch, [items[i] for i in group], timeout): group
+            for group in groups
+        }
+        pending = set(range(len(items)))
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                for i, analysis in zip(futures[future], future.result()):
+                    pending.discard(i)
+                    yield i, analysis
+        except TimeoutError:
+            print(f"Insight generation deadline reached, {len(pending)} of {len(data_points)} charts not analyzed")
+            for i in sorted(pending):
+                kpi, dp = items[i]
+                yield i, self._unavailable(kpi.id if kpi else dp.kpi_id, "Insight generation timed out.")
+        finally:
+            # Requests that have not started are dropped; running ones finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _pack(self, items) -> List[List[int]]:
+        """
+        Group chart indices into batches whose chart blocks fit the token
+        budget (and at most Config.INSIGHT_BATCH_MAX_CHARTS charts each).
+        """
+        budget = Config.INSIGHT_BATCH_TOKENS - estimate_tokens(Prompts.BATCH_INSIGHT_GENERATION)
+        groups, current, used = [], [], 0
+        for i, (kpi, dp) in enumerate(items):
+            _, name, _, data_str = self._describe(kpi, dp, compact=True)
+            cost = estimate_tokens(name) + estimate_tokens(data_str) + 10
+            if current and (used + cost > budget or len(current) >= Config.INSIGHT_BATCH_MAX_CHARTS):
+                groups.append(current)
+                current, used = [], 0
+            current.append(i)
+            used += cost
+        if current:
+            groups.append(current)
+        return groups
+
+    @staticmethod
+    def _describe(kpi: Optional[KPI], data_point: DataPoint, compact: bool = False):
+        # Fallback metadata if KPI is None (e.g. auto-generated charts)
+        kpi_name = kpi.name if kpi else (data_point.title or "Unknown Metric")
+        kpi_desc = kpi.description if kpi else f"Analysis of {kpi_name}"
+        kpi_id = kpi.id if kpi else data_point.kpi_id
+
+        # Convert data points to string representation for LLM
+        # Limit data size to avoid context limit issues
+        if compact:
+            # Columnar arrays: field names are sent once instead of once per point
+            data_str = json.dumps({k: v[:25] for k, v in data_point.columns.items()}, separators=(",", ":"))
+        else:
+            data_sample = data_point.rows(limit=25) # Top 25 points
+            data_str = json.dumps(data_sample)
+        
+        if data_point.n_points > 25:
+            data_str += f" ... (and {data_point.n_points-25} more points)"
+        return kpi_id, kpi_name, kpi_desc, data_str
+
+    @staticmethod
+    def _unavailable(kpi_id: str, reason: str) -> DescriptiveAnalysis:
+        return DescriptiveAnalysis(
+            kpi_id=kpi_id,
+            summary_text="Analysis unavailable.",
+            insights=[reason]
+        )
+
+    def chat_with_data(self, question: str, df: "pd.DataFrame", engine: DataPointEngine = None,
+                       fingerprint: str = None) -> str:
         """
         Answer questions about the specific dataset using pandas AI or context-based checking.
+        Aggregate questions are answered exactly by the local query engine;
+        anything else falls back to the sample-based prompt.
+        """
+        answer = self._query_answer(question, df, engine, fingerprint)
+        if answer is not None:
+            return answer
+        try:
+            return self.llm.generate(self._chat_prompt(question, df), priority=INTERACTIVE)
+        except Exception as e:
+            return f"I couldn't analyze the data directly. Error: {e}"
+
+    def chat_with_data_stream(self, question: str, df: "pd.DataFrame", engine: DataPointEngine = None,
+                              fingerprint: str = None) -> Iterator[str]:
+        """
+        Same answer as chat_with_data, yielded piece by piece as the model writes it.
+        """
+        answer = self._query_answer(question, df, engine, fingerprint)
+        if answer is not None:
+            yield answer
+            return
+        try:
+            yield from self.llm.generate_stream(self._chat_prompt(question, df), priority=INTERACTIVE)
+        except Exception as e:
+            yield f"I couldn't analyze the data directly. Error: {e}"
+
+    def _query_answer(self, question: str, df: "pd.DataFrame", engine: DataPointEngine = None,
+                      fingerprint: str = None) -> Optional[str]:
         """
+        Have the LLM turn the question into a QuerySpec and run it on the full
+        frame. Returns None when the question is not an aggregation (cached
+        answers aside, only questions passing is_query_question cost an LLM
+        call here) or the spec does not validate, so the caller can answer
+        from a sample instead.
+        Pass the dataset's engine, or its fingerprint, so schema and answers
+        are cached per dataset version.
+        """
+        if not Config.CHAT_QUERY_ENGINE:
+            return None
+        if engine is None or engine.df is not df:
+            engine = self._engine_for(df, fingerprint)
+        query_engine = QueryEngine(engine)
+
+        # Answers are only reused for an identified dataset version
+        fingerprint = engine.fingerprint if self.answer_cache is not None else None
+        if fingerprint:
+            key = normalize_question(question)
+            cached = self.answer_cache.lookup(fingerprint, key)
+            if cached is not None:
+                return cached
+        if not is_query_question(question):
+            # Not an aggregation: don't hold up the answer for a query-plan call
+            return None
+
+        try:
+            prompt = Prompts.CHAT_QUERY_SPEC.format(question=question, schema=query_engine.describe_columns())
+            data = json.loads(self.llm.generate(prompt, json_mode=True, priority=INTERACTIVE))
+            if not isinstance(data, dict) or data.get("answerable") is False:
+                return None
+            spec = query_engine.validate(QuerySpec.model_validate(data))
+            plan = plan_key(spec)
+            answer = self.answer_cache.lookup_plan(fingerprint, plan) if fingerprint else None
+            if answer is None:
+                answer = format_answer(spec, query_engine.execute(spec), len(df))
+        except Exception as e:
+            print(f"Could not answer with a query, using a sample instead: {e}")
+            return None
+        if fingerprint:
+            self.answer_cache.store(fingerprint, key, plan, answer)
+        return answer
+
+    def _engine_for(self, df: "pd.DataFrame", fingerprint: str = None) -> DataPointEngine:
+        # Callers without an engine get one per frame, reused across questions
+        engine = self._chat_engine
+        if engine is None or engine.df is not df or engine.fingerprint != fingerprint:
+            engine = self._chat_engine = DataPointEngine(df, fingerprint=fingerprint)
+        return engine
+
+    @staticmethod
+    def _chat_prompt(question: str, df: "pd.DataFrame") -> str:
         # 1. Simple fallback: get basic stats to add to context
         # In a real agent, this would use pandas-ai or a SQL generator.
-        # Here we did a simple approximation by feeding a sample.
+        # Here we did a simple approximation by feeding a sample (seeded, stratified when possible).
         
-        sample = df.head(10).to_string()
+        sample = prompt_sample(df, 10).to_string()
         cols = list(df.columns)
         
-        prompt = Prompts.CHAT_WITH_DATA.format(
+        return Prompts.CHAT_WITH_DATA.format(
             question=question,
             columns=cols,
             sample_data=sample
         )
-        
-        try:
-            return self.llm.generate(prompt)
-        except Exception as e:
-            return f"I couldn't analyze the data directly. Error: {e}"
+
+
+def _parse_batch(response_str: str) -> dict:
+    """
+    Map chart key -> {"summary_text", "insights"} from a batch response.
+    Accepts {"results": [{"key": ...}, ...]}, a bare list, or an object keyed
+    by chart key; entries without a usable summary are left out.
+    """
+    data = json.loads(response_str)
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        data = data["results"]
+    if isinstance(data, dict):
+        data = [dict(v, key=k) for k, v in data.items() if isinstance(v, dict)]
+    if not isinstance(data, list):
+        raise ValueError("batch response is not a list of results")
+
+    parsed = {}
+    for entry in data:
+        if not isinstance(entry, dict) or not isinstance(entry.get("summary_text"), str):
+            continue
+        insights = entry.get("insights", [])
+        if not isinstance(insights, list):
+            continue
+        parsed[str(entry.get("key", "")).strip("[]")] = entry
+    return parsed
@@ -0,0 +1,161 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+from src.config import Config
+from src.models.domain import QuerySpec
+
+# Negation, comparison, range and connective words (not, excluding, without,
+# before, after, above, from, to, and, or, ...) are deliberately not stop words:
+# they change the answer
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "is", "are", "was", "were", "be",
+    "what", "whats", "which", "who", "how", "show", "me", "give", "list", "tell", "find", "get",
+    "please", "can", "you", "i", "we", "do", "does", "did", "there", "all", "at",
+    "value", "values", "data", "dataset", "it", "its", "this", "that", "about", "much",
+}
+# Words that pick the aggregate; a question without one means a total
+FUNCTION_WORDS = {
+    "total": "sum", "sum": "sum", "overall": "sum",
+    "average": "mean", "avg": "mean", "mean": "mean", "median": "median",
+    "min": "min", "minimum": "min", "max": "max", "maximum": "max",
+    "count": "count", "number": "count", "many": "count",
+    "unique": "nunique", "distinct": "nunique",
+}
+ORDER_WORDS = {
+    "top": "desc", "highest": "desc", "most": "desc", "largest": "desc", "biggest": "desc", "best": "desc",
+    "bottom": "asc", "lowest": "asc", "least": "asc", "smallest": "asc", "worst": "asc",
+}
+GROUP_WORDS = {"by", "per", "each", "every", "across"}
+# Other words that only make sense for an aggregation ("how much", "breakdown")
+QUERY_WORDS = {"much", "breakdown", "split", "rank", "ranking", "ranked"}
+
+
+def tokenize(text: str) -> list:
+    return re.findall(r"[a-z0-9]+(?:\.[0-9]+)?", str(text).lower())
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def normalize_question(question: str) -> tuple:
+    """
+    Canonical form of a chat question: lowercased, stop words dropped, plurals
+    folded, "per"/"each" read as "by" and aggregate words mapped to functions
+    ("total sales by region" and "sales per region?" give the same key).
+    Every other word, number and identifier is kept as is, and in order, so
+    "price above 100 and units below 5" and "price below 100 and units
+    above 5" stay apart.
+    """
+    tokens = []
+    for raw in tokenize(question):
+        if raw in FUNCTION_WORDS:
+            tokens.append(f"fn:{FUNCTION_WORDS[raw]}")
+        elif raw in GROUP_WORDS:
+            tokens.append("by")
+        elif raw in ORDER_WORDS:
+            tokens.append(ORDER_WORDS[raw])
+        elif raw not in STOPWORDS:
+            tokens.append(_stem(raw))
+    if not any(t.startswith("fn:") for t in tokens):
+        # No aggregate word means a total
+        tokens.insert(0, "fn:sum")
+    return tuple(tokens)
+
+
+def is_query_question(question: str) -> bool:
+    """
+    Cheap intent check: does the question ask for an aggregate, grouping or
+    ranking? Only those are worth a query-plan completion before answering;
+    anything else goes straight to the (streamed) sample-based answer.
+    """
+    return any(
+        raw in FUNCTION_WORDS or raw in ORDER_WORDS or raw in GROUP_WORDS or raw in QUERY_WORDS
+        for raw in tokenize(question)
+    )
+
+
+def plan_key(spec: QuerySpec) -> str:
+    """
+    Canonical JSON of a validated spec; filter order does not matter.
+    """
+    data = spec.model_dump(mode="json")
+    data["filters"] = sorted(data["filters"], key=lambda f: json.dumps(f, sort_keys=True))
+    return json.dumps(data, sort_keys=True)
+
+
+class AnswerCache:
+    """
+    Chat answers per dataset fingerprint. A question is answered straight
+    from the cache (no LLM call) only when an earlier one normalizes to
+    exactly the same tokens in the same order. Questions that merely look alike are still
+    resolved to a query plan by the LLM, and share an answer only when the
+    plans are equal (lookup_plan). Each dataset keeps its
+    max_entries most recent questions, and the least recently used datasets
+    are dropped beyond max_datasets. A re-cleaned frame gets a new
+    fingerprint; invalidate() drops the entries of the old one.
+    """
+
+    def __init__(self, max_entries: int = None, max_datasets: int = None):
+        self.max_entries = max_entries if max_entries is not None else Config.ANSWER_CACHE_SIZE
+        self.max_datasets = max_datasets if max_datasets is not None else Config.ANSWER_CACHE_DATASETS
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _dataset(self, fingerprint: str) -> dict:
+        entry = self._datasets.get(fingerprint)
+        if entry is None:
+            entry = self._datasets[fingerprint] = {"questions": OrderedDict(), "plans": {}}
+            while len(self._datasets) > self.max_datasets:
+                self._datasets.popitem(last=False)
+        self._datasets.move_to_end(fingerprint)
+        return entry
+
+    def lookup(self, fingerprint: str, key: tuple) -> Optional[str]:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            dataset = self._datasets.get(fingerprint)
+            if dataset is None or key not in dataset["questions"]:
+                self.misses += 1
+                return None
+            questions = dataset["questions"]
+            questions.move_to_end(key)
+            self._datasets.move_to_end(fingerprint)
+            self.hits += 1
+            return dataset["plans"][questions[key]]
+
+    def lookup_plan(self, fingerprint: str, plan: str) -> Optional[str]:
+        with self._lock:
+            dataset = self._datasets.get(fingerprint)
+            return dataset["plans"].get(plan) if dataset is not None else None
+
+    def store(self, fingerprint: str, key: tuple, plan: str, answer: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            dataset = self._dataset(fingerprint)
+            questions, plans = dataset["questions"], dataset["plans"]
+            questions[key] = plan
+            questions.move_to_end(key)
+            plans[plan] = answer
+            while len(questions) > self.max_entries:
+                _, old_plan = questions.popitem(last=False)
+                if all(p != old_plan for p in questions.values()):
+                    plans.pop(old_plan, None)
+
+    def invalidate(self, fingerprint: str):
+        with self._lock:
+            self._datasets.pop(fingerprint, None)
+
+    def clear(self):
+        with self._lock:
+            self._datasets.clear()
@@ -0,0 +1,143 @@
+import os
+import json
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from src.config import Config
+
+
+def chart_key(fingerprint: str, spec: dict) -> str:
+    """
+    Cache key of one chart (or chart set): the dataset version fingerprint
+    (raw upload + cleaning plan) plus the chart spec, e.g.
+    {"kind": "dimension", "dim": "region", "measure": "sales", "agg": "sum", "top_n": 12}.
+    """
+    payload = json.dumps(spec, sort_keys=True, default=str)
+    return hashlib.sha256(f"{fingerprint}|{payload}".encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """
+    Content-addressed cache of computed chart payloads. Entries are held as
+    JSON in memory, bounded by total size with least-recently-used eviction.
+    With spilling enabled, evicted entries are written to CACHE_DIR/charts
+    (itself size-bounded) and promoted back to memory on their next hit.
+    """
+
+    def __init__(self, max_bytes: int = None, spill_dir: str = None, spill_max_bytes: int = None):
+        self.max_bytes = max_bytes if max_bytes is not None else Config.CHART_CACHE_MAX_MB * 1024 * 1024
+        self.spill_max_bytes = (
+            spill_max_bytes if spill_max_bytes is not None else Config.CHART_CACHE_SPILL_MB * 1024 * 1024
+        )
+        self.spill_dir = Path(spill_dir or Path(Config.CACHE_DIR) / "charts") if self.spill_max_bytes > 0 else None
+        self.enabled = self.max_bytes > 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key: str) -> Path:
+        return self.spill_dir / f"{key}.json"
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            raw = self._entries.get(key)
+            if raw is not None:
+                self._entries.move_to_end(key)
+        if raw is None:
+            raw = self._read_spilled(key)
+            if raw is not None:
+                self._store(key, raw)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Every hit gets its own copy, so callers may mutate the result
+        return json.loads(raw)
+
+    def put(self, key: str, value):
+        if not self.enabled:
+            return
+        try:
+            raw = json.dumps(value)
+        except (TypeError, ValueError) as e:
+            print(f"Could not cache chart {key[:12]}: {e}")
+            return
+        self._store(key, raw)
+
+    def _store(self, key: str, raw: str):
+        spilled = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = raw
+            self._size += len(raw)
+            while self._size > self.max_bytes and self._entries:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                spilled.append((evicted_key, evicted))
+        for evicted_key, evicted in spilled:
+            self._spill(evicted_key, evicted)
+        if spilled:
+            self._evict_spilled()
+
+    def _spill(self, key: str, raw: str):
+        if self.spill_dir is None:
+            return
+        path = self._path(key)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        try:
+            tmp.write_text(raw, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Could not spill chart {key[:12]}: {e}")
+            tmp.unlink(missing_ok=True)
+
+    def _read_spilled(self, key: str) -> Optional[str]:
+        if self.spill_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            raw = path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        path.unlink(missing_ok=True)
+        return raw
+
+    def _evict_spilled(self):
+        if self.spill_dir is None:
+            return
+        entries = []
+        for p in self.spill_dir.glob("*.json"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.spill_max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.spill_dir is not None:
+            for p in self.spill_dir.glob("*.json"):
+                p.unlink(missing_ok=True)
@@ -2,19 +2,22 @@ import pandas as pd
 from src.llm.client import LLMClient
 from src.llm.prompts import Prompts
 from src.models.domain import DomainClassification
+from src.services.profiler import DatasetProfile, profile_dataset
 import json
 
 class DomainClassifier:
     def __init__(self, llm_client: LLMClient):
         self.llm = llm_client
 
-    def classify(self, df: pd.DataFrame) -> DomainClassification:
+    def classify(self, df: pd.DataFrame, profile: DatasetProfile = None) -> DomainClassification:
         """
-        Sample data and ask LLM for domain.
+        Describe every column from the dataset profile (type, missing share,
+        range or most frequent values) and ask LLM for domain.
         """
+        profile = profile or profile_dataset(df)
         prompt = Prompts.DOMAIN_CLASSIFICATION.format(
             columns=list(df.columns),
-            sample=df.head(3).to_markdown()
+            profile=profile.to_markdown()
         )
         response_str = self.llm.generate(prompt, json_mode=True)
         data = json.loads(response_str)
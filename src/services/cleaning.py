@@ -1,24 +1,47 @@
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
 import pandas.api.types as ptypes
+from src.models.domain import CleaningPlan
+from src.services.profiler import DatasetProfile
+from src.services.sketches import QuantileSketch
+from src.services.optimizer import map_categories, to_datetime, widen
+
+# Fitted plans and their reports per dataset fingerprint and strategies (most recent last)
+_PLAN_CACHE = OrderedDict()
+PLAN_CACHE_SIZE = 32
 
 class DataCleaningService:
     def __init__(self):
         self.report = []
+        self.plan = None
+        self._fit = False
+        self._profile = None
 
     def log(self, message):
         self.report.append(message)
         print(f"[Cleaner] {message}")
 
-    def clean_dataset(self, df: pd.DataFrame, numeric_imputation: str = 'median', categorical_imputation: str = 'mode') -> pd.DataFrame:
+    def clean_dataset(self, df: pd.DataFrame, numeric_imputation: str = 'median', categorical_imputation: str = 'mode',
+                      fit: bool = False, profile: DatasetProfile = None) -> pd.DataFrame:
         """
         Execute the 6-step robust cleaning pipeline.
+        Every decision taken is recorded in self.plan (a CleaningPlan).
         Args:
             df: Input DataFrame
             numeric_imputation: 'median', 'mean', or 'zero'
             categorical_imputation: 'mode' or 'drop'
+            fit: Also record fill values for columns that have no missing data
+                 here, so self.plan can be applied to future batches.
+            profile: DatasetProfile of df; null counts and modes are then read
+                 from it instead of being recomputed.
         """
         self.report = []
+        self.plan = CleaningPlan(numeric_imputation=numeric_imputation, categorical_imputation=categorical_imputation)
+        self._fit = fit
+        if profile is not None and (profile.rows != len(df) or not all(c in profile for c in df.columns)):
+            profile = None
+        self._profile = profile
         df = df.copy()
         
         # Step 1: Handling Missing Values
@@ -38,46 +61,299 @@ class DataCleaningService:
         
         return df
 
+    def clean_fitted(self, df: pd.DataFrame, fingerprint: str = None, numeric_imputation: str = 'median',
+                     categorical_imputation: str = 'mode') -> pd.DataFrame:
+        """
+        clean_dataset(fit=True), except that a plan already fitted for this
+        dataset fingerprint and these strategies is re-applied with
+        apply_plan() instead of being refitted.
+        """
+        key = (fingerprint, numeric_imputation, categorical_imputation)
+        if fingerprint and key in _PLAN_CACHE:
+            _PLAN_CACHE.move_to_end(key)
+            plan, report = _PLAN_CACHE[key]
+            df = self.apply_plan(df, plan)
+            # Same data and plan: report the decisions taken when it was fitted
+            self.plan, self.report = plan, list(report)
+            return df
+
+        df = self.clean_dataset(df, numeric_imputation, categorical_imputation, fit=True)
+        if fingerprint:
+            _PLAN_CACHE[key] = (self.plan, list(self.report))
+            while len(_PLAN_CACHE) > PLAN_CACHE_SIZE:
+                _PLAN_CACHE.popitem(last=False)
+        return df
+
+    def fit_plan(self, df: pd.DataFrame, numeric_imputation: str = 'median', categorical_imputation: str = 'mode') -> CleaningPlan:
+        """
+        Infer a reusable CleaningPlan from a representative dataset.
+        """
+        self.clean_dataset(df, numeric_imputation, categorical_imputation, fit=True)
+        return self.plan
+
+    def fit_plan_from_chunks(self, chunks, numeric_imputation: str = 'median', categorical_imputation: str = 'mode', k: int = 200) -> CleaningPlan:
+        """
+        Fit a CleaningPlan in a single pass over an iterable of DataFrame chunks,
+        without ever holding the whole dataset in memory.
+        Medians and IQR bounds come from mergeable QuantileSketch objects (see
+        src/services/sketches.py for the error bound), means from running sums
+        and modes from merged value counts. Duplicate rows cannot be detected
+        across chunks, so they are included in the statistics.
+        """
+        self.report = []
+        self.log(f"Fitting cleaning plan from chunks (Numeric: {numeric_imputation}, Categorical: {categorical_imputation})...")
+        plan = CleaningPlan(numeric_imputation=numeric_imputation, categorical_imputation=categorical_imputation)
+
+        columns = None
+        nums, cats, currency, dates = [], [], [], []
+        sketches, sums, nulls, counts = {}, {}, {}, {}
+        rows = 0
+
+        for chunk in chunks:
+            if columns is None:
+                columns = list(chunk.columns)
+                nums = list(chunk.select_dtypes(include=['number']).columns)
+                cats = list(chunk.select_dtypes(include=['object', 'category']).columns)
+                for col in cats:
+                    first = chunk[col].first_valid_index()
+                    if first is not None and self._is_numeric_string(chunk[col].loc[first]):
+                        currency.append(col)
+                dates = [c for c in columns if ptypes.is_datetime64_any_dtype(chunk[c]) or 'date' in c.lower() or 'time' in c.lower()]
+                for col in nums + currency:
+                    sketches[col] = QuantileSketch(k=k)
+                    sums[col] = 0.0
+
+            # Row drops only depend on the row itself, so they can be done per chunk
+            drop = (nums if numeric_imputation == 'drop' else []) + (cats if categorical_imputation == 'drop' else [])
+            if drop:
+                chunk = chunk.dropna(subset=drop)
+            rows += len(chunk)
+
+            for col in nums + cats:
+                nulls[col] = nulls.get(col, 0) + int(chunk[col].isnull().sum())
+            for col in cats:
+                vc = chunk[col].value_counts()
+                counts[col] = vc if col not in counts else counts[col].add(vc, fill_value=0)
+            for col in nums + currency:
+                series = self._to_numeric(chunk[col]) if col in currency else chunk[col]
+                values = series.to_numpy(dtype='float64', na_value=np.nan)
+                sketches[col].update(values)
+                sums[col] += float(np.nansum(values))
+
+        if columns is None:
+            self.log("No data to fit.")
+            self.plan = plan
+            return plan
+
+        # Missing values
+        if numeric_imputation == 'drop':
+            plan.drop_na_columns.extend(nums)
+        if categorical_imputation == 'drop':
+            plan.drop_na_columns.extend(cats)
+
+        for col in nums:
+            sketch = sketches[col]
+            if numeric_imputation == 'median':
+                val = sketch.quantile(0.5) if sketch.n else np.nan
+            elif numeric_imputation == 'mean':
+                val = sums[col] / sketch.n if sketch.n else np.nan
+            elif numeric_imputation == 'zero':
+                val = 0
+            else:
+                continue
+            if pd.notna(val):
+                plan.fill_values[col] = _to_builtin(val)
+                # Imputed values take part in the outlier bounds, as in clean_dataset
+                sketch.update_repeated(val, nulls[col])
+
+        if categorical_imputation == 'mode':
+            for col in cats:
+                vc = counts[col]
+                if vc.empty:
+                    continue
+                val = vc[vc == vc.max()].sort_index().index[0]
+                plan.fill_values[col] = _to_builtin(val)
+                if col in currency:
+                    filled = self._to_numeric(pd.Series([val])).iloc[0]
+                    sketches[col].update_repeated(filled, nulls[col])
+
+        # Types
+        plan.numeric_columns = currency
+        plan.datetime_columns = dates
+
+        # Outlier bounds
+        for col, sketch in sketches.items():
+            if sketch.n == 0:
+                continue
+            Q1, Q3 = sketch.quantiles([0.25, 0.75])
+            IQR = Q3 - Q1
+            lower, upper = float(Q1 - 1.5 * IQR), float(Q3 + 1.5 * IQR)
+            plan.clip_bounds[col] = [lower, upper]
+            if sketch.min < lower or sketch.max > upper:
+                plan.capped_columns.append(col)
+
+        # Features
+        numeric = set(nums + currency)
+        if 'total' not in ','.join(c.lower() for c in columns):
+            price_col = next((c for c in columns if 'price' in c.lower() or 'cost' in c.lower()), None)
+            qty_col = next((c for c in columns if 'qty' in c.lower() or 'quantity' in c.lower() or 'units' in c.lower()), None)
+            if price_col in numeric and qty_col in numeric:
+                plan.total_sales_from = [price_col, qty_col]
+        plan.date_parts_from = dates[0] if dates else None
+
+        self.log(
+            f"Fitted plan over {rows} rows: {len(plan.fill_values)} fill values, "
+            f"{len(plan.clip_bounds)} clip bounds, {len(plan.capped_columns)} capped columns."
+        )
+        self.plan = plan
+        return plan
+
+    def apply_plan(self, df: pd.DataFrame, plan: CleaningPlan) -> pd.DataFrame:
+        """
+        Apply a previously fitted CleaningPlan without any re-inference.
+        Every step is a vectorized whole-column transform, so this can be run
+        chunk by chunk (duplicates are then only removed within a chunk).
+        """
+        self.report = []
+        self.log(f"Applying cleaning plan {plan.plan_hash()[:12]}...")
+
+        fills = {c: v for c, v in plan.fill_values.items() if c in df.columns}
+        # A new batch's categoricals may not contain the fitted fill value yet
+        add = {
+            c: v for c, v in fills.items()
+            if isinstance(df[c].dtype, pd.CategoricalDtype) and v not in df[c].cat.categories
+        }
+        if add:
+            df = df.copy(deep=False)
+            for col, value in add.items():
+                df[col] = df[col].cat.add_categories([value])
+        df = df.fillna(fills) if fills else df.copy()
+
+        drop = [c for c in plan.drop_na_columns if c in df.columns]
+        if drop:
+            before = len(df)
+            df = df.dropna(subset=drop)
+            if before > len(df):
+                self.log(f"Dropped {before - len(df)} rows with missing values.")
+
+        if plan.drop_duplicates:
+            df = self._remove_duplicates(df)
+
+        for col in plan.numeric_columns:
+            if col in df.columns:
+                df[col] = self._to_numeric(df[col])
+        for col in plan.datetime_columns:
+            if col in df.columns:
+                df[col] = to_datetime(df[col], errors='coerce')
+
+        bounds = {c: b for c, b in plan.clip_bounds.items() if c in df.columns and ptypes.is_numeric_dtype(df[c])}
+        for col, (lower, upper) in bounds.items():
+            if col in plan.capped_columns:
+                df[col] = np.clip(df[col].to_numpy(dtype='float64'), lower, upper)
+            elif ptypes.is_integer_dtype(df[col]):
+                # Integer values are only ever capped to whole numbers within bounds
+                df[col] = df[col].clip(int(np.ceil(lower)), int(np.floor(upper)))
+            else:
+                df[col] = df[col].clip(lower, upper)
+
+        if plan.total_sales_from and set(plan.total_sales_from) <= set(df.columns):
+            self._add_total_sales(df, *plan.total_sales_from)
+        if plan.date_parts_from in df.columns:
+            self._add_date_parts(df, plan.date_parts_from)
+
+        return df
+
     def _handle_missing_values(self, df: pd.DataFrame, numeric_strat: str, cat_strat: str) -> pd.DataFrame:
         self.log(f"Handling Missing Values (Numeric: {numeric_strat}, Categorical: {cat_strat})...")
-        
+
         # Numeric Imputation
         nums = df.select_dtypes(include=['number']).columns
-        for col in nums:
-            missing = df[col].isnull().sum()
-            if missing > 0:
-                if numeric_strat == 'median':
-                    val = df[col].median()
-                    df[col] = df[col].fillna(val)
-                    self.log(f"Filled {missing} missing in {col} with median: {val}")
-                elif numeric_strat == 'mean':
-                    val = df[col].mean()
-                    df[col] = df[col].fillna(val)
-                    self.log(f"Filled {missing} missing in {col} with mean: {val}")
-                elif numeric_strat == 'zero':
-                    df[col] = df[col].fillna(0)
-                    self.log(f"Filled {missing} missing in {col} with 0")
-                elif numeric_strat == 'drop':
-                     df = df.dropna(subset=[col])
-                     self.log(f"Dropped rows with missing {col}")
+        df = self._impute(df, nums, numeric_strat)
+        if self._profile is not None and len(df) != self._profile.rows:
+            # Rows were dropped: the profile no longer describes the frame
+            self._profile = None
 
         # Categorical Imputation
         cats = df.select_dtypes(include=['object', 'category']).columns
-        for col in cats:
-            missing = df[col].isnull().sum()
-            if missing > 0:
-                if cat_strat == 'mode':
-                    if not df[col].mode().empty:
-                        val = df[col].mode()[0]
-                        df[col] = df[col].fillna(val)
-                        self.log(f"Filled {missing} missing in {col} with mode: {val}")
-                elif cat_strat == 'drop':
-                     df = df.dropna(subset=[col])
-                     self.log(f"Dropped rows with missing {col}")
-                # Else leave as is or fill 'Unknown'
-                
+        df = self._impute(df, cats, cat_strat)
+        # Else leave as is or fill 'Unknown'
+
         return df
 
+    def _impute(self, df: pd.DataFrame, cols, strategy: str) -> pd.DataFrame:
+        """
+        Impute a group of columns at once: null counts and fill values are
+        computed in one batched pass, then applied as a single fillna/filter.
+        """
+        if len(cols) == 0:
+            return df
+
+        if strategy == 'drop':
+            self.plan.drop_na_columns.extend(cols)
+
+        if self._profile is not None:
+            missing = self._profile.null_counts(cols)
+        else:
+            missing = df[cols].isnull().sum()
+        missing = missing[missing > 0]
+        if missing.empty and not (self._fit and strategy != 'drop'):
+            return df
+        # When fitting, fill values are computed for every column of the group
+        fill_cols = cols if self._fit else missing.index
+        cols = missing.index
+
+        if strategy == 'drop':
+            # Rows are dropped column by column in the report, so a column is only
+            # reported if it still has nulls after the previous columns' drops.
+            nulls = df[cols].isnull().to_numpy()
+            dropped = np.zeros(len(df), dtype=bool)
+            for i, col in enumerate(cols):
+                if (nulls[:, i] & ~dropped).any():
+                    dropped |= nulls[:, i]
+                    self.log(f"Dropped rows with missing {col}")
+            return df[~dropped]
+
+        if strategy == 'median':
+            fill = df[fill_cols].median()
+        elif strategy == 'mean':
+            fill = df[fill_cols].mean()
+        elif strategy == 'zero':
+            fill = pd.Series(0, index=fill_cols)
+        elif strategy == 'mode':
+            fill = self._modes(df, fill_cols)
+        else:
+            return df
+
+        self.plan.fill_values.update(
+            {col: _to_builtin(val) for col, val in fill.items() if pd.notna(val)}
+        )
+        fill = fill[fill.index.isin(cols)]
+        if fill.empty:
+            return df
+
+        df = df.fillna(fill.to_dict())
+        for col, val in fill.items():
+            if strategy == 'zero':
+                self.log(f"Filled {missing[col]} missing in {col} with 0")
+            else:
+                self.log(f"Filled {missing[col]} missing in {col} with {strategy}: {val}")
+        return df
+
+    def _modes(self, df: pd.DataFrame, cols) -> pd.Series:
+        """
+        First mode of each column (all-null columns left out). Taken from the
+        profile where its value counts are exact, computed here otherwise.
+        """
+        modes = {}
+        if self._profile is not None:
+            modes = {col: self._profile[col].mode() for col in cols if self._profile[col].counts_exact}
+        rest = [col for col in cols if col not in modes]
+        if rest:
+            computed = df[rest].mode()
+            if not computed.empty:
+                modes.update(computed.iloc[0].to_dict())
+        return pd.Series([modes.get(col) for col in cols], index=cols, dtype=object).dropna()
+
     def _remove_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
         before = len(df)
         df = df.drop_duplicates()
@@ -88,46 +364,68 @@ class DataCleaningService:
 
     def _fix_data_types(self, df: pd.DataFrame) -> pd.DataFrame:
         self.log("Fixing Data Types...")
-        
+
         # 1. Clean likely numeric columns (currency, percent)
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                # Check sample
-                sample = df[col].dropna().iloc[0] if not df[col].dropna().empty else ""
-                if isinstance(sample, str) and any(c.isdigit() for c in sample) and any(s in sample for s in ['$', ',', '%']):
+        objs = df.select_dtypes(include=['object', 'category']).columns
+        if len(objs) > 0 and len(df) > 0:
+            # First non-null value of every string column, found in one pass
+            valid = df[objs].notna().to_numpy()
+            first = valid.argmax(axis=0)
+            has_value = valid.any(axis=0)
+
+            for i, col in enumerate(objs):
+                sample = df[col].iat[first[i]] if has_value[i] else ""
+                if self._is_numeric_string(sample):
                     try:
-                        df[col] = df[col].astype(str).str.replace(r'[$,%]', '', regex=True)
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
+                        df[col] = self._to_numeric(df[col])
+                        self.plan.numeric_columns.append(col)
                         self.log(f"Converted {col} to numeric.")
-                    except:
+                    except Exception:
                         pass
-        
+
         # 2. Convert Dates
         for col in df.columns:
             if 'date' in col.lower() or 'time' in col.lower():
                 try:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
+                    df[col] = to_datetime(df[col], errors='coerce')
+                    self.plan.datetime_columns.append(col)
                     self.log(f"Converted {col} to datetime.")
-                except:
+                except Exception:
                     pass
         return df
 
     def _handle_outliers(self, df: pd.DataFrame) -> pd.DataFrame:
-        # Capping sensitive outliers using IQR
+        # Capping sensitive outliers using IQR, with quartiles for all numeric
+        # columns computed in a single batched quantile call
         nums = df.select_dtypes(include=['number']).columns
-        for col in nums:
-            Q1 = df[col].quantile(0.25)
-            Q3 = df[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            
-            outliers = df[(df[col] < lower_bound) | (df[col] > upper_bound)]
-            if not outliers.empty:
-                # Cap values instead of dropping
-                df[col] = np.where(df[col] < lower_bound, lower_bound, df[col])
-                df[col] = np.where(df[col] > upper_bound, upper_bound, df[col])
-                self.log(f"Capped {len(outliers)} outliers in {col}.")
+        if len(nums) == 0:
+            return df
+
+        quartiles = df[nums].quantile([0.25, 0.75])
+        Q1 = quartiles.loc[0.25]
+        Q3 = quartiles.loc[0.75]
+        IQR = Q3 - Q1
+        lower_bound = Q1 - 1.5 * IQR
+        upper_bound = Q3 + 1.5 * IQR
+        self.plan.clip_bounds.update({
+            col: [float(lower_bound[col]), float(upper_bound[col])]
+            for col in nums
+            if pd.notna(lower_bound[col]) and pd.notna(upper_bound[col])
+        })
+
+        values = df[nums].to_numpy(dtype='float64')
+        lower = lower_bound.to_numpy()
+        upper = upper_bound.to_numpy()
+        counts = ((values < lower) | (values > upper)).sum(axis=0)
+        capped = np.flatnonzero(counts)
+        if len(capped) == 0:
+            return df
+
+        # Cap values instead of dropping
+        df[nums[capped]] = np.clip(values[:, capped], lower[capped], upper[capped])
+        self.plan.capped_columns.extend(nums[capped])
+        for i in capped:
+            self.log(f"Capped {counts[i]} outliers in {nums[i]}.")
         return df
 
     def _feature_engineering(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -141,19 +439,47 @@ class DataCleaningService:
             qty_col = next((c for c in df.columns if 'qty' in c.lower() or 'quantity' in c.lower() or 'units' in c.lower()), None)
             
             if price_col and qty_col and ptypes.is_numeric_dtype(df[price_col]) and ptypes.is_numeric_dtype(df[qty_col]):
-                df['Total_Sales_Calc'] = df[price_col] * df[qty_col]
+                self._add_total_sales(df, price_col, qty_col)
+                self.plan.total_sales_from = [price_col, qty_col]
                 self.log(f"Created 'Total_Sales_Calc' from {price_col} * {qty_col}")
 
         # Date extract
         date_col = next((c for c in df.columns if ptypes.is_datetime64_any_dtype(df[c])), None)
         if date_col:
-            df['Month'] = df[date_col].dt.month_name()
-            df['Year'] = df[date_col].dt.year
-            df['DayOfWeek'] = df[date_col].dt.day_name()
+            self._add_date_parts(df, date_col)
+            self.plan.date_parts_from = date_col
             self.log(f"Extracted Month, Year, Day from {date_col}")
             
         return df
 
+    def _add_total_sales(self, df: pd.DataFrame, price_col: str, qty_col: str):
+        # Compacted dtypes (int32, float32) are widened first so the product cannot wrap
+        df['Total_Sales_Calc'] = widen(df[price_col]) * widen(df[qty_col])
+
+    def _add_date_parts(self, df: pd.DataFrame, date_col: str):
+        df['Month'] = df[date_col].dt.month_name()
+        df['Year'] = df[date_col].dt.year
+        df['DayOfWeek'] = df[date_col].dt.day_name()
+
+    @staticmethod
+    def _is_numeric_string(sample) -> bool:
+        # Currency / percent / thousands-separated numbers such as "$1,200" or "15%"
+        return isinstance(sample, str) and any(c.isdigit() for c in sample) and any(s in sample for s in ['$', ',', '%'])
+
+    @staticmethod
+    def _to_numeric(series: pd.Series) -> pd.Series:
+        return map_categories(
+            series,
+            lambda s: pd.to_numeric(s.astype(str).str.replace(r'[$,%]', '', regex=True), errors='coerce')
+        )
+
+
+def _to_builtin(value):
+    """
+    Unwrap numpy scalars so plan values serialize cleanly to JSON.
+    """
+    return value.item() if isinstance(value, np.generic) else value
+
 if __name__ == "__main__":
     # Test execution
     print("Initializing DataCleaningService...")
@@ -1,42 +1,291 @@
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 import pandas as pd
 import numpy as np
+import pandas.api.types as ptypes
+from pandas.api.types import union_categoricals
+from src.config import Config
 from src.models.domain import DataPoint
+from src.services.optimizer import conform_dtypes, to_datetime
+from src.services.chart_cache import ChartCache, chart_key
+from src.services.sketches import BinnedHistogram
+from src.services.sampling import ReservoirSampler, iter_batches
+from src.services.downsampling import lttb
+from src.services.profiler import DatasetProfile, profile_dataset
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
 
 IMPORTANT_KEYWORDS_MEASURE = ["revenue", "amount", "price", "sales", "profit", "qty", "quantity", "count", "total"]
 IMPORTANT_KEYWORDS_DIM = ["product", "item", "name", "category", "type", "size", "region", "store", "city"]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# pandas 2.2 renamed the hourly and yearly period aliases ("H" -> "h", "A" -> "Y")
+_NEW_PERIOD_ALIASES = tuple(int(p) for p in pd.__version__.split(".")[:2]) >= (2, 2)
+
+# Time bucket -> (period frequency, title prefix, axis label)
+TIME_GRANULARITIES = {
+    "hour": ("h" if _NEW_PERIOD_ALIASES else "H", "Hourly", "Hour"),
+    "day": ("D", "Daily", "Day"),
+    "week": ("W", "Weekly", "Week"),
+    "month": ("M", "Monthly", "Month"),
+    "quarter": ("Q", "Quarterly", "Quarter"),
+    "year": ("Y" if _NEW_PERIOD_ALIASES else "A", "Yearly", "Year"),
+}
+
+# Dashboard chart plan limits
+MAX_MEASURES = 5
+MAX_DIMENSIONS = 8
+MAX_DIMENSION_GROUPS = 40
+MAX_CORRELATIONS = 3
+MAX_CHARTS = 40
+SAMPLE_POINTS = 300
+
+
+# Schemas inferred per dataset fingerprint (most recent last)
+_SCHEMA_CACHE = OrderedDict()
+SCHEMA_CACHE_SIZE = 32
 
 
 class DataPointEngine:
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, fingerprint: str = None, workers: int = None, cache: ChartCache = None,
+                 profile: DatasetProfile = None):
         if not isinstance(df, pd.DataFrame):
             raise TypeError("DataPointEngine requires a pandas DataFrame")
 
-        self.df = df.copy()
+        # The frame is shared with the caller and never modified here; derived
+        # columns (parsed dates, month keys, weekday codes) live in self._derived
+        self.df = df
+        self.fingerprint = fingerprint
+        if workers is None:
+            workers = Config.CHART_WORKERS or os.cpu_count() or 1
+        self.workers = workers
+        # Chart results are only cached for an identified dataset version
+        self.cache = cache if fingerprint else None
+        self._derived = {}
+        self._derived_lock = threading.RLock()
+        self._profile = profile
+        self.date_formats = {}
         self.schema = self._analyze_schema()
 
+    @property
+    def profile(self) -> DatasetProfile:
+        # Built on first use (e.g. by the preview) unless one was passed in
+        if self._profile is None:
+            self._profile = profile_dataset(self.df, self.fingerprint)
+        return self._profile
+
+    @property
+    def df(self) -> pd.DataFrame:
+        # Appended rows are held as separate parts and stitched on first use
+        if len(self._frames) > 1:
+            with self._derived_lock:
+                if len(self._frames) > 1:
+                    self._frames = [_concat_frames(self._frames)]
+        return self._frames[0]
+
+    @df.setter
+    def df(self, df: pd.DataFrame):
+        self._frames = [df]
+
+    def conform(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        New rows cast to the dtypes of the engine's frame (see conform_dtypes),
+        e.g. categoricals instead of the object columns a CSV batch arrives with.
+        """
+        return conform_dtypes(rows, self._frames[0].dtypes)
+
+    def append(self, frames: List[pd.DataFrame], fingerprint: str = None):
+        """
+        Move the engine to its frame plus appended (already cleaned) rows, e.g.
+        after an incremental refresh, so chart drill-downs and chat queries see
+        the new rows. The rows are conformed to the frame's dtypes and kept as
+        parts: the cost here grows with the new rows only, and the full frame is
+        stitched once, when something first reads self.df. Derived columns and
+        the profile are rebuilt on demand; the schema and the time granularity
+        chosen for the base frame are kept.
+        """
+        frames = [self.conform(f) for f in frames if not f.empty]
+        with self._derived_lock:
+            self._frames = self._frames + frames
+            self._derived = {k: v for k, v in self._derived.items() if k[0] == "granularity"}
+        self._profile = None
+        self.fingerprint = fingerprint
+        if fingerprint is None:
+            self.cache = None
+
     def _analyze_schema(self):
+        """
+        Classify columns into measures, dimensions and time columns.
+        Decisions for non-numeric columns are taken on a bounded sample, so the
+        cost does not grow with row count; distinct counts come from the
+        dataset profile when one was passed in. Results are cached per fingerprint.
+        """
+        if self.fingerprint and self.fingerprint in _SCHEMA_CACHE:
+            _SCHEMA_CACHE.move_to_end(self.fingerprint)
+            schema, self.date_formats = _SCHEMA_CACHE[self.fingerprint]
+            return {k: list(v) for k, v in schema.items()}
+
         schema = {"measures": [], "dimensions": [], "time": []}
+        sample = self._schema_sample()
 
         for col in self.df.columns:
-            if np.issubdtype(self.df[col].dtype, np.number):
+            series = self.df[col]
+            if ptypes.is_numeric_dtype(series) and not ptypes.is_bool_dtype(series):
                 schema["measures"].append(col)
+            elif ptypes.is_datetime64_any_dtype(series):
+                schema["time"].append(col)
             else:
-                try:
-                    pd.to_datetime(self.df[col])
+                fmt = _infer_date_format(sample[col])
+                if fmt:
+                    self.date_formats[col] = fmt
                     schema["time"].append(col)
-                except:
+                else:
                     schema["dimensions"].append(col)
 
         schema["dimensions"] = [
             c for c in schema["dimensions"]
-            if "id" not in c.lower() and self.df[c].nunique() > 1
+            if "id" not in c.lower() and self._has_variety(c, sample[c])
         ]
 
+        if self.fingerprint:
+            _SCHEMA_CACHE[self.fingerprint] = ({k: list(v) for k, v in schema.items()}, dict(self.date_formats))
+            while len(_SCHEMA_CACHE) > SCHEMA_CACHE_SIZE:
+                _SCHEMA_CACHE.popitem(last=False)
         return schema
 
+    def _schema_sample(self) -> pd.DataFrame:
+        # Evenly spaced rows, so every region of the file is represented
+        n = len(self.df)
+        if n <= Config.SCHEMA_SAMPLE_ROWS:
+            return self.df
+        positions = np.unique(np.linspace(0, n - 1, Config.SCHEMA_SAMPLE_ROWS).astype(np.int64))
+        return self.df.iloc[positions]
+
+    def _has_variety(self, col, sample: pd.Series) -> bool:
+        if self._profile is not None:
+            return self._profile[col].distinct > 1
+        if sample.nunique() > 1:
+            return True
+        # Constant in the sample: confirm on the full column
+        return len(sample) < len(self.df) and self.df[col].nunique() > 1
+
+    # ---------------- DERIVED COLUMNS ----------------
+    def _datetime(self, col) -> pd.Series:
+        key = ("datetime", col)
+        with self._derived_lock:
+            if key not in self._derived:
+                series = self.df[col]
+                if ptypes.is_datetime64_any_dtype(series):
+                    self._derived[key] = series
+                else:
+                    # Use the format found during schema inference (None = let pandas infer)
+                    self._derived[key] = _parse_dates(series, format=self.date_formats.get(col))
+            return self._derived[key]
+
+    def _period_keys(self, col, granularity: str = None) -> pd.Series:
+        # Periods at the dashboard's granularity unless another one is asked for
+        granularity = granularity or self.time_granularity(col)
+        key = ("period", col, granularity)
+        with self._derived_lock:
+            if key not in self._derived:
+                freq = TIME_GRANULARITIES[granularity][0]
+                self._derived[key] = self._datetime(col).dt.to_period(freq)
+            return self._derived[key]
+
+    def _group_codes(self, col, granularity: str = None):
+        """
+        Integer group codes for col (-1 = missing) and the label of each code,
+        computed once per column: category codes, period ordinals offset to
+        start at 0 (so codes sort chronologically), or factorized values.
+        """
+        is_time = col in self.schema["time"]
+        if is_time:
+            granularity = granularity or self.time_granularity(col)
+        key = ("codes", col, granularity if is_time else None)
+        with self._derived_lock:
+            if key not in self._derived:
+                series = self.df[col]
+                if is_time:
+                    ordinals, valid = self._period_ordinals(col, granularity)
+                    dtype = pd.PeriodDtype(TIME_GRANULARITIES[granularity][0])
+                    if valid.any():
+                        lo, hi = ordinals[valid].min(), ordinals[valid].max()
+                        codes = np.where(valid, ordinals - lo, -1)
+                        labels = pd.PeriodIndex(pd.arrays.PeriodArray(np.arange(lo, hi + 1), dtype=dtype))
+                    else:
+                        codes, labels = np.full(len(ordinals), -1), pd.PeriodIndex([], dtype=dtype)
+                elif isinstance(series.dtype, pd.CategoricalDtype):
+                    codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+                else:
+                    codes, labels = pd.factorize(series)
+                self._derived[key] = (codes.astype(np.int64, copy=False), pd.Index(labels))
+            return self._derived[key]
+
+    def _period_ordinals(self, col, granularity: str):
+        """
+        Period ordinals (as pandas numbers them) and a validity mask, computed
+        from the datetime64 integers rather than by building Period objects:
+        hours and days by integer division, months, quarters and years through
+        a lookup table over the days spanned. Weeks go through to_period.
+        """
+        dates = self._datetime(col)
+        if granularity == "week" or getattr(dates.dt, "tz", None) is not None:
+            periods = self._period_keys(col, granularity)
+            return periods.array.asi8, periods.notna().to_numpy()
+        values = dates.to_numpy(dtype="datetime64[ns]")
+        valid = ~np.isnat(values)
+        ns = values.view(np.int64)
+        if granularity == "hour":
+            return ns // 3_600_000_000_000, valid
+        days = ns // 86_400_000_000_000
+        if granularity == "day" or not valid.any():
+            return days, valid
+        lo, hi = days[valid].min(), days[valid].max()
+        unit = "Y" if granularity == "year" else "M"
+        lookup = np.arange(lo, hi + 1).astype("datetime64[D]").astype(f"datetime64[{unit}]").astype(np.int64)
+        if granularity == "quarter":
+            lookup //= 3
+        return lookup[np.clip(days - lo, 0, hi - lo)], valid
+
+    def time_granularity(self, col) -> str:
+        """
+        Bucket size for time-series charts: Config.TIME_GRANULARITY, or with
+        "auto" the finest bucket that keeps the column's date range within
+        Config.MAX_SERIES_POINTS points.
+        """
+        if Config.TIME_GRANULARITY in TIME_GRANULARITIES:
+            return Config.TIME_GRANULARITY
+        if Config.TIME_GRANULARITY != "auto":
+            raise ValueError(
+                f"Unknown TIME_GRANULARITY {Config.TIME_GRANULARITY!r}: use auto or one of {', '.join(TIME_GRANULARITIES)}"
+            )
+        key = ("granularity", col)
+        with self._derived_lock:
+            if key not in self._derived:
+                self._derived[key] = _auto_granularity(self._datetime(col))
+            return self._derived[key]
+
+    def _weekday_codes(self, col) -> np.ndarray:
+        # Monday=0 ... Sunday=6, -1 for missing dates
+        key = ("weekday", col)
+        with self._derived_lock:
+            if key not in self._derived:
+                dates = self._datetime(col)
+                codes = dates.dt.dayofweek.to_numpy(dtype="float64", na_value=np.nan)
+                self._derived[key] = np.where(np.isnan(codes), -1, codes).astype(np.int8)
+            return self._derived[key]
+
     # ---------------- PUBLIC API ----------------
-    def generate_data_points(self, df: pd.DataFrame, kpis: list):
-        charts = self.generate_important_charts()
+    def generate_data_points(self, df: pd.DataFrame, kpis: list, charts: list = None):
+        if charts is None:
+            charts = self.generate_important_charts()
         data_points = []
 
         for i, chart in enumerate(charts):
@@ -44,7 +293,7 @@ class DataPointEngine:
 
             dp = DataPoint(
                 kpi_id=kpi_id,
-                data=chart["data"],  # MUST be list
+                columns=chart["columns"],
                 title=chart["title"],
                 chart_type=chart["chart_type"],
                 x_label=chart["x_label"],
@@ -55,43 +304,104 @@ class DataPointEngine:
 
         return data_points
 
+    def aggregate_chart(self, dim, measure, agg: str = "sum", top_n: int = 12, chart_type: str = "bar"):
+        """
+        Chart of measure aggregated per value of dim (first top_n groups),
+        served from the chart cache when this spec was computed before.
+        """
+        spec = {"kind": "aggregate", "dim": dim, "measure": measure, "agg": agg, "top_n": top_n}
+
+        def compute():
+            grp = self.df.groupby(dim, observed=True)[measure].agg(agg).head(top_n)
+            return {
+                "title": f"{measure.replace('_',' ').title()} by {dim.replace('_',' ').title()}",
+                "chart_type": chart_type,
+                "x_label": dim.replace("_", " ").title(),
+                "y_label": measure.replace("_", " ").title(),
+                "columns": _label_value(grp)
+            }
+
+        chart = self._cached(spec, compute)
+        chart["chart_type"] = chart_type
+        return chart
+
+    def _cached(self, spec: dict, compute):
+        if self.cache is None:
+            return compute()
+        key = chart_key(self.fingerprint, spec)
+        result = self.cache.get(key)
+        if result is None:
+            result = compute()
+            self.cache.put(key, result)
+        return result
+
     # ---------------- CORE LOGIC ----------------
     def generate_important_charts(self):
-        measures = self.schema["measures"]
-        dims = self.schema["dimensions"]
-        time_cols = self.schema["time"]
-
-        measures = sorted(measures, key=self._score_measure, reverse=True)[:5]
-        dims = sorted(dims, key=self._score_dimension, reverse=True)[:8]
-
-        charts = []
-
-        # 1. Time trends
-        for t in time_cols[:1]:
-            for m in measures:
-                charts.append(self._time_vs_measure(t, m))
-            charts.append(self._weekday_chart(t))
-
-        # 2. Dimension vs measure
-        for dim in dims:
-            if self.df[dim].nunique() > 40:
-                continue
-            for m in measures:
-                charts.append(self._dimension_vs_measure(dim, m))
+        spec = {
+            "kind": "important", "max_measures": MAX_MEASURES, "max_dimensions": MAX_DIMENSIONS,
+            "max_charts": MAX_CHARTS, "time_granularity": Config.TIME_GRANULARITY,
+            "max_series_points": Config.MAX_SERIES_POINTS, "histogram_bins": Config.HISTOGRAM_BINS,
+            "seed": Config.SAMPLE_SEED
+        }
+        return self._cached(spec, self._compute_important_charts)
+
+    def chart_plan(self) -> dict:
+        """
+        Columns the dashboard charts are built from: the top-scored measures
+        and dimensions, the leading time column and the measure pairs used
+        for scatter plots.
+        """
+        measures = sorted(self.schema["measures"], key=self._score_measure, reverse=True)[:MAX_MEASURES]
+        dims = sorted(self.schema["dimensions"], key=self._score_dimension, reverse=True)[:MAX_DIMENSIONS]
+        pairs = [(measures[i], measures[i + 1]) for i in range(min(MAX_CORRELATIONS, len(measures) - 1))]
+        return {"measures": measures, "dimensions": dims, "time": self.schema["time"][:1], "pairs": pairs}
+
+    def _compute_important_charts(self):
+        plan = self.chart_plan()
+        measures = plan["measures"]
+
+        # Each task returns a list of charts; tasks are independent of each other
+        tasks = []
+
+        # 1. Time trends (one grouping per time column for all measures)
+        for t in plan["time"]:
+            tasks.append(lambda t=t: self._time_charts(t, measures))
+            tasks.append(lambda t=t: [self._weekday_chart(t)])
+
+        # 2. Dimension vs measure (one grouping per dimension for all measures)
+        for dim in plan["dimensions"]:
+            tasks.append(lambda dim=dim: self._dimension_charts(dim, measures))
 
         # 3. Distribution
         for m in measures:
-            charts.append(self._distribution_chart(m))
+            tasks.append(lambda m=m: [self._distribution_chart(m)])
 
         # 4. Correlation
-        if len(measures) >= 2:
-            for i in range(min(3, len(measures) - 1)):
-                charts.append(self._correlation_chart(measures[i], measures[i + 1]))
-
-        # filter useless
-        final_charts = [c for c in charts if len(c["data"]) >= 2]
-
-        return final_charts[:40]
+        for m1, m2 in plan["pairs"]:
+            tasks.append(lambda m1=m1, m2=m2: [self._correlation_chart(m1, m2)])
+
+        charts = [chart for result in self._run_tasks(tasks) for chart in result]
+        return select_charts(charts)
+
+    def _run_tasks(self, tasks):
+        """
+        Run chart tasks on a thread pool (pandas/NumPy kernels release the GIL),
+        returning results in task order so output is deterministic.
+        """
+        if self.workers <= 1 or len(tasks) <= 1:
+            return [task() for task in tasks]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(tasks))) as pool:
+            return list(pool.map(lambda task: task(), tasks))
+
+    def _time_charts(self, time_col, measures):
+        totals = self._period_totals(time_col, measures)
+        return [self._time_vs_measure(time_col, m, totals) for m in measures]
+
+    def _dimension_charts(self, dim, measures):
+        totals = self._grouped_totals(dim, measures, max_groups=MAX_DIMENSION_GROUPS)
+        if totals is None:
+            return []
+        return [self._dimension_vs_measure(dim, m, totals) for m in measures]
 
     # ---------------- SCORING ----------------
     def _score_measure(self, col):
@@ -100,91 +410,239 @@ class DataPointEngine:
     def _score_dimension(self, col):
         return sum(2 for kw in IMPORTANT_KEYWORDS_DIM if kw in col.lower())
 
+    # ---------------- AGGREGATION PLAN ----------------
+    def _grouped_totals(self, dim, measures, max_groups=None):
+        """
+        Sum all measures per value of dim in one groupby, so the key column is
+        hashed once per dimension rather than once per (dimension, measure).
+        Returns None if dim has more than max_groups distinct values.
+        """
+        gb = self.df.groupby(dim, observed=True)
+        if max_groups is not None and gb.ngroups > max_groups:
+            return None
+        return gb[list(measures)].sum()
+
+    def _period_totals(self, time_col, measures):
+        """
+        Per-period sums and non-null counts of all measures in one groupby.
+        """
+        periods = self._period_keys(time_col)
+        valid = periods.notna()
+        gb = self.df.loc[valid, list(measures)].groupby(periods[valid])
+        return gb.sum(), gb.count()
+
     # ---------------- CHART BUILDERS ----------------
-    def _dimension_vs_measure(self, dim, measure):
-        grp = (
-            self.df.groupby(dim)[measure]
-            .sum()
-            .sort_values(ascending=False)
-            .head(12)
-            .reset_index()
-        )
+    def _dimension_vs_measure(self, dim, measure, totals=None):
+        if totals is None:
+            totals = self._grouped_totals(dim, [measure])
+        grp = totals[measure].sort_values(ascending=False).head(12)
 
         return {
             "title": f"{measure.replace('_',' ').title()} by {dim.replace('_',' ').title()}",
             "chart_type": "bar",
             "x_label": dim.replace("_", " ").title(),
             "y_label": f"Total {measure.replace('_',' ').title()}",
-            "data": [
-                {"label": str(r[dim]), "value": float(r[measure])}
-                for _, r in grp.iterrows()
-                if pd.notna(r[measure])
-            ]
+            "columns": _label_value(grp)
         }
 
-    def _time_vs_measure(self, time_col, measure):
-        temp = self.df[[time_col, measure]].dropna()
-        temp[time_col] = pd.to_datetime(temp[time_col])
-
-        grp = temp.groupby(pd.Grouper(key=time_col, freq="M"))[measure].sum().reset_index()
+    def _time_vs_measure(self, time_col, measure, totals=None):
+        granularity = self.time_granularity(time_col)
+        freq, prefix, axis = TIME_GRANULARITIES[granularity]
+        if totals is None:
+            totals = self._period_totals(time_col, [measure])
+        sums, counts = totals
+        # Only periods where the measure has data bound the range
+        grp = sums[measure][counts[measure] > 0]
+        if not grp.empty:
+            # Keep empty periods in the range, as a resample would
+            grp = grp.reindex(pd.period_range(grp.index.min(), grp.index.max(), freq=freq), fill_value=0)
+        if len(grp) > Config.MAX_SERIES_POINTS:
+            # Cap the payload while keeping the series' shape
+            grp = grp.iloc[lttb(np.arange(len(grp)), grp.to_numpy(dtype="float64"), Config.MAX_SERIES_POINTS)]
+        # Points are labelled with the period-end date (hour start for hourly buckets)
+        if granularity == "hour":
+            grp.index = grp.index.to_timestamp(how="start").strftime("%Y-%m-%d %H:00")
+        else:
+            grp.index = grp.index.to_timestamp(how="end").strftime("%Y-%m-%d")
 
         return {
-            "title": f"Monthly {measure.replace('_',' ').title()}",
+            "title": f"{prefix} {measure.replace('_',' ').title()}",
             "chart_type": "line",
-            "x_label": "Month",
+            "x_label": axis,
             "y_label": f"Total {measure.replace('_',' ').title()}",
-            "data": [
-                {"label": str(r[time_col].date()), "value": float(r[measure])}
-                for _, r in grp.iterrows()
-                if pd.notna(r[measure])
-            ]
+            "columns": _label_value(grp)
         }
 
-    def _distribution_chart(self, measure):
-        vals = self.df[measure].dropna()
-        sample = vals.sample(min(300, len(vals)))
+    def _distribution_chart(self, measure, histogram: BinnedHistogram = None):
+        # Exact counts over the whole column, binned in slices to bound temporaries
+        if histogram is None:
+            histogram = BinnedHistogram(Config.HISTOGRAM_BINS)
+            for values in iter_batches(self.df[measure]):
+                histogram.update(values.to_numpy(dtype="float64", na_value=np.nan))
 
         return {
             "title": f"Distribution of {measure.replace('_',' ').title()}",
             "chart_type": "histogram",
             "x_label": measure.replace("_", " ").title(),
             "y_label": "Frequency",
-            "data": [{"value": float(v)} for v in sample]
+            "columns": _histogram_payload(histogram)
         }
 
-    def _correlation_chart(self, m1, m2):
-        temp = self.df[[m1, m2]].dropna()
-        temp = temp.sample(min(300, len(temp)))
+    def _correlation_chart(self, m1, m2, sample=None):
+        # sample: (n, 2) array of (m1, m2) pairs; by default a seeded reservoir
+        # sample of complete pairs, streamed over the columns slice by slice
+        if sample is None:
+            sampler = ReservoirSampler(SAMPLE_POINTS)
+            for batch in iter_batches(self.df[[m1, m2]]):
+                pairs = batch.to_numpy(dtype="float64", na_value=np.nan)
+                sampler.update(pairs[~np.isnan(pairs).any(axis=1)])
+            sample = sampler.values()
+        sample = np.asarray(sample, dtype="float64").reshape(-1, 2)
 
         return {
             "title": f"{m1.replace('_',' ').title()} vs {m2.replace('_',' ').title()}",
             "chart_type": "scatter",
             "x_label": m1.replace("_", " ").title(),
             "y_label": m2.replace("_", " ").title(),
-            "data": [
-                {"x": float(r[m1]), "y": float(r[m2])}
-                for _, r in temp.iterrows()
-            ]
+            "columns": {
+                "x": sample[:, 0].tolist(),
+                "y": sample[:, 1].tolist()
+            }
         }
 
-    def _weekday_chart(self, date_col):
-        df = self.df.copy()
-        df[date_col] = pd.to_datetime(df[date_col])
-        df["weekday"] = df[date_col].dt.day_name()
-
-        grp = df.groupby("weekday").size().reset_index(name="count")
-
-        order = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        grp["weekday"] = pd.Categorical(grp["weekday"], categories=order, ordered=True)
-        grp = grp.sort_values("weekday")
+    def _weekday_chart(self, date_col, counts=None):
+        if counts is None:
+            codes = self._weekday_codes(date_col)
+            counts = np.bincount(codes[codes >= 0], minlength=7)
+        counts = np.asarray(counts)
+        present = np.flatnonzero(counts)
 
         return {
             "title": "Records by Day of Week",
             "chart_type": "bar",
             "x_label": "Day of Week",
             "y_label": "Count",
-            "data": [
-                {"label": row["weekday"], "value": int(row["count"])}
-                for _, row in grp.iterrows()
-            ]
+            "columns": {
+                "label": [WEEKDAYS[day] for day in present],
+                "value": counts[present].tolist()
+            }
         }
+
+
+# ---------------- SCHEMA HELPERS ----------------
+def _concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    # Categoricals whose parts have different categories are unioned from
+    # their codes; pd.concat alone would turn them into object columns
+    first = frames[0]
+    unions = [
+        col for col in first.columns
+        if isinstance(first[col].dtype, pd.CategoricalDtype) and all(col in f for f in frames)
+        and any(f[col].dtype != first[col].dtype for f in frames[1:])
+    ]
+    df = pd.concat([f.drop(columns=unions) if unions else f for f in frames], ignore_index=True)
+    for col in unions:
+        try:
+            values = union_categoricals([pd.Categorical(f[col]) for f in frames], sort_categories=True)
+        except TypeError:
+            values = pd.concat([f[col].astype(object) for f in frames], ignore_index=True)
+        df[col] = values
+    if unions:
+        df = df[list(first.columns) + [c for c in df.columns if c not in first.columns]]
+    return df
+
+
+def _parse_dates(series: pd.Series, **kwargs) -> pd.Series:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return to_datetime(series, errors="coerce", **kwargs)
+
+
+def _infer_date_format(sample: pd.Series) -> Optional[str]:
+    """
+    Decide from a sample whether a text column holds dates and how to parse it.
+    At least Config.SCHEMA_DATE_CONFIDENCE of the non-null values must parse to
+    a plausible date (years 1900-2100); plain numbers are never taken as dates.
+    Returns a strftime format, "mixed" if no single format fits, or None.
+    """
+    values = sample.dropna()
+    if values.empty:
+        return None
+    if values.astype(str).str.fullmatch(r"\s*[-+]?\d+(\.\d+)?\s*").mean() > 0.5:
+        return None
+
+    def confidence(parsed):
+        return (parsed.notna() & parsed.dt.year.between(1900, 2100)).mean()
+
+    try:
+        # A small probe first, so free-text columns are rejected cheaply
+        probe = values.iloc[:50]
+        if confidence(_parse_dates(probe, format="mixed")) < Config.SCHEMA_DATE_CONFIDENCE:
+            return None
+
+        candidates = []
+        for value in probe.astype(str).iloc[:5]:
+            for dayfirst in (False, True):
+                with warnings.catch_warnings():
+                    # dayfirst=True on a year-first value such as 2023-01-31 only warns
+                    warnings.simplefilter("ignore", UserWarning)
+                    fmt = guess_datetime_format(value, dayfirst=dayfirst)
+                if fmt and fmt not in candidates:
+                    candidates.append(fmt)
+        for fmt in candidates:
+            if confidence(_parse_dates(values, format=fmt)) >= Config.SCHEMA_DATE_CONFIDENCE:
+                return fmt
+
+        if confidence(_parse_dates(values, format="mixed")) >= Config.SCHEMA_DATE_CONFIDENCE:
+            return "mixed"
+    except (TypeError, ValueError, OverflowError, AttributeError):
+        pass
+    return None
+
+
+def _auto_granularity(dates: pd.Series) -> str:
+    lo, hi = dates.min(), dates.max()
+    if pd.isna(lo) or pd.isna(hi):
+        return "month"
+    for granularity, (freq, _, _) in TIME_GRANULARITIES.items():
+        buckets = (hi.to_period(freq) - lo.to_period(freq)).n + 1
+        if buckets <= Config.MAX_SERIES_POINTS:
+            return granularity
+    return "year"
+
+
+# ---------------- PAYLOAD HELPERS ----------------
+def _label_value(series: pd.Series) -> dict:
+    """
+    Columnar label/value payload from a Series indexed by label (NaN values dropped).
+    """
+    series = series[series.notna()]
+    return {
+        "label": series.index.astype(str).tolist(),
+        "value": series.to_numpy(dtype="float64").tolist()
+    }
+
+
+def _n_points(chart: dict) -> int:
+    return len(next(iter(chart["columns"].values()), []))
+
+
+def _histogram_payload(histogram: BinnedHistogram) -> dict:
+    """
+    Binned payload: one row per bin with its range label, count and edges.
+    """
+    counts, edges = histogram.histogram()
+    starts, ends = edges[:-1], edges[1:]
+    return {
+        "label": [f"{a:.6g} to {b:.6g}" for a, b in zip(starts, ends)],
+        "value": counts.tolist(),
+        "bin_start": starts.tolist(),
+        "bin_end": ends.tolist()
+    }
+
+
+def select_charts(charts: list) -> list:
+    """
+    Drop charts with fewer than two points and cap the dashboard size.
+    A histogram of a constant column is kept with its single bin.
+    """
+    return [c for c in charts if _n_points(c) >= (1 if c.get("chart_type") == "histogram" else 2)][:MAX_CHARTS]
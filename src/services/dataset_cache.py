@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+import pandas as pd
+from src.config import Config
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+HASH_BLOCK_SIZE = 1024 * 1024
+# Parquet schema metadata key for what was recorded alongside a cached frame
+META_KEY = b"kpi_agent_meta"
+
+
+def fingerprint_bytes(file_obj) -> str:
+    """
+    Content hash of an uploaded file object. The stream is rewound afterwards
+    so it can still be parsed.
+    """
+    file_obj.seek(0)
+    digest = hashlib.sha256()
+    while True:
+        block = file_obj.read(HASH_BLOCK_SIZE)
+        if not block:
+            break
+        if isinstance(block, str):
+            block = block.encode("utf-8")
+        digest.update(block)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def fingerprint_frame(df: pd.DataFrame) -> str:
+    """
+    Content hash of an in-memory DataFrame (values, columns and dtypes).
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(list(df.columns)).encode("utf-8"))
+    digest.update(repr([str(t) for t in df.dtypes]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def derive_fingerprint(*parts) -> str:
+    """
+    Fingerprint of a derived dataset version, e.g. (raw fingerprint, cleaning plan hash).
+    """
+    return hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class DatasetCache:
+    """
+    Local columnar cache of parsed datasets, one Parquet file per content
+    fingerprint. Total size is bounded; the least recently used files are
+    evicted first (file mtime is bumped on every hit).
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = Path(cache_dir or Path(Config.CACHE_DIR) / "datasets")
+        self.max_bytes = max_bytes if max_bytes is not None else Config.DATASET_CACHE_MAX_MB * 1024 * 1024
+        self.enabled = HAS_PYARROW and self.max_bytes > 0
+        self.hits = 0
+        self.misses = 0
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, fingerprint: str) -> Path:
+        return self.cache_dir / f"{fingerprint}.parquet"
+
+    def get(self, fingerprint: str) -> Optional[pd.DataFrame]:
+        entry = self.get_entry(fingerprint)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, fingerprint: str) -> Optional[Tuple[pd.DataFrame, dict]]:
+        """
+        (frame, metadata stored with it by put()), or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        path = self._path(fingerprint)
+        if not path.exists():
+            self.misses += 1
+            return None
+        try:
+            df = pd.read_parquet(path)
+            raw = (pq.read_schema(path).metadata or {}).get(META_KEY)
+            meta = json.loads(raw) if raw else {}
+        except Exception as e:
+            print(f"Dataset cache entry {path.name} unreadable, dropping it: {e}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return df, meta
+
+    def put(self, fingerprint: str, df: pd.DataFrame, meta: dict = None):
+        """
+        Store df; meta (JSON-serializable) is kept in the Parquet file's schema metadata.
+        """
+        if not self.enabled:
+            return
+        path = self._path(fingerprint)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        try:
+            table = pyarrow.Table.from_pandas(df, preserve_index=True)
+            if meta:
+                metadata = dict(table.schema.metadata or {})
+                metadata[META_KEY] = json.dumps(meta).encode("utf-8")
+                table = table.replace_schema_metadata(metadata)
+            pq.write_table(table, tmp)
+            os.replace(tmp, path)
+        except Exception as e:
+            # e.g. mixed-type object columns that Arrow cannot represent
+            print(f"Could not cache dataset {fingerprint[:12]}: {e}")
+            tmp.unlink(missing_ok=True)
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for p in self.cache_dir.glob("*.parquet"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for p in self.cache_dir.glob("*.parquet"):
+            p.unlink(missing_ok=True)
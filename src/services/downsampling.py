@@ -0,0 +1,44 @@
+import numpy as np
+
+
+def lttb(x, y, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling of a series.
+
+    Returns the (sorted) indices of at most n_out points to keep. The first
+    and last points are always kept; in between, the series is split into
+    n_out - 2 buckets and from each bucket the point forming the largest
+    triangle with the previously kept point and the next bucket's average is
+    chosen, so peaks, dips and the overall shape survive. With n_out below 3
+    only the endpoints are kept.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    n = len(x)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1], dtype=np.int64)
+
+    every = (n - 2) / (n_out - 2)
+    bounds = (np.floor(np.arange(n_out - 1) * every) + 1).astype(np.int64)
+    bounds[-1] = n - 1
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = bounds[i], bounds[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_end = bounds[i + 2] if i + 2 < len(bounds) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import pandas.api.types as ptypes
+from src.config import Config
+from src.services.data_engine import (
+    DataPointEngine, MAX_DIMENSION_GROUPS, SAMPLE_POINTS, TIME_GRANULARITIES, _parse_dates, select_charts
+)
+from src.services.sampling import ReservoirSampler
+from src.services.sketches import BinnedHistogram
+
+
+class IncrementalChartState:
+    """
+    Mergeable aggregates behind the dashboard charts of one DataPointEngine:
+    per-group sums for each dimension, per-period sums and counts, weekday
+    counts, histogram bins per measure and reservoir samples for the scatter
+    charts.
+
+    The state is built once from the engine's frame; afterwards update()
+    folds in appended rows only, so a refresh costs about as much as the
+    delta. Charts keep the engine's plan (columns are not re-scored).
+    """
+
+    def __init__(self, engine: DataPointEngine, seed: int = None):
+        self.engine = engine
+        plan = engine.chart_plan()
+        self.measures = plan["measures"]
+        self.dimensions = plan["dimensions"]
+        self.time_cols = plan["time"]
+        self.pairs = plan["pairs"]
+
+        self.rows = 0
+        self.dim_totals = {}
+        self.period_totals = {}
+        self.weekday_counts = {t: np.zeros(7, dtype=np.int64) for t in self.time_cols}
+        self.histograms = {m: BinnedHistogram(Config.HISTOGRAM_BINS) for m in self.measures}
+        self.pair_samples = {pair: ReservoirSampler(SAMPLE_POINTS, seed) for pair in self.pairs}
+
+        # The engine may already hold parsed dates for its own frame
+        self.update(engine.df, dates={t: engine._datetime(t) for t in self.time_cols})
+
+    def update(self, df: pd.DataFrame, dates: dict = None) -> "IncrementalChartState":
+        """
+        Fold a batch of new (already cleaned) rows into the state.
+        """
+        if df.empty:
+            return self
+        dates = dates or {}
+        measures = list(self.measures)
+
+        for t in self.time_cols:
+            parsed = dates.get(t)
+            if parsed is None:
+                parsed = self._dates(df, t)
+            # Buckets keep the granularity the engine chose for the base frame
+            periods = parsed.dt.to_period(TIME_GRANULARITIES[self.engine.time_granularity(t)][0])
+            valid = periods.notna()
+            gb = df.loc[valid, measures].groupby(periods[valid])
+            sums, counts = gb.sum(), gb.count()
+            if t in self.period_totals:
+                old_sums, old_counts = self.period_totals[t]
+                sums = old_sums.add(sums, fill_value=0)
+                counts = old_counts.add(counts, fill_value=0)
+            self.period_totals[t] = (sums, counts)
+
+            codes = parsed.dt.dayofweek.to_numpy(dtype="float64", na_value=np.nan)
+            codes = codes[~np.isnan(codes)].astype(np.int64)
+            self.weekday_counts[t] += np.bincount(codes, minlength=7)
+
+        for dim in self.dimensions:
+            if dim in self.dim_totals and self.dim_totals[dim] is None:
+                continue  # already over the group limit, it can only grow
+            totals = df.groupby(dim, observed=True)[measures].sum()
+            totals.index = _plain_index(totals.index)
+            if dim in self.dim_totals:
+                totals = self.dim_totals[dim].add(totals, fill_value=0)
+            self.dim_totals[dim] = totals if len(totals) <= MAX_DIMENSION_GROUPS else None
+
+        for m, histogram in self.histograms.items():
+            histogram.update(df[m].to_numpy(dtype="float64", na_value=np.nan))
+
+        for (m1, m2), sampler in self.pair_samples.items():
+            pairs = np.column_stack([
+                df[m1].to_numpy(dtype="float64", na_value=np.nan),
+                df[m2].to_numpy(dtype="float64", na_value=np.nan),
+            ])
+            sampler.update(pairs[~np.isnan(pairs).any(axis=1)])
+
+        self.rows += len(df)
+        return self
+
+    def charts(self) -> list:
+        """
+        Dashboard charts from the current state, in the engine's chart order.
+        """
+        engine = self.engine
+        charts = []
+
+        for t in self.time_cols:
+            totals = self.period_totals[t]
+            charts.extend(engine._time_vs_measure(t, m, totals) for m in self.measures)
+            charts.append(engine._weekday_chart(t, counts=self.weekday_counts[t]))
+
+        for dim in self.dimensions:
+            totals = self.dim_totals.get(dim)
+            if totals is None:
+                continue
+            charts.extend(engine._dimension_vs_measure(dim, m, totals) for m in self.measures)
+
+        for m in self.measures:
+            charts.append(engine._distribution_chart(m, histogram=self.histograms[m]))
+
+        for m1, m2 in self.pairs:
+            charts.append(engine._correlation_chart(m1, m2, sample=self.pair_samples[(m1, m2)].values()))
+
+        return select_charts(charts)
+
+    def _dates(self, df: pd.DataFrame, col) -> pd.Series:
+        series = df[col]
+        if ptypes.is_datetime64_any_dtype(series):
+            return series
+        return _parse_dates(series, format=self.engine.date_formats.get(col))
+
+
+def _plain_index(index: pd.Index) -> pd.Index:
+    # Batches may carry different categories; merge on the plain labels
+    if isinstance(index, pd.CategoricalIndex):
+        return pd.Index(np.asarray(index, dtype=object), name=index.name)
+    return index
@@ -0,0 +1,244 @@
+from typing import Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pandas.api.types as ptypes
+from src.config import Config
+
+INT32_MIN, INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+
+
+def map_categories(series: pd.Series, func) -> pd.Series:
+    """
+    Apply a vectorized conversion to a Series. For categoricals the conversion
+    runs once per distinct value and is expanded through the codes, which is
+    both faster and avoids pandas handing back another categorical.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return func(series)
+    if len(series.cat.categories) > len(series):
+        # A slice of a high-cardinality column: convert only the values it uses
+        series = series.cat.remove_unused_categories()
+    converted = func(pd.Series(series.cat.categories)).reset_index(drop=True)
+    codes = series.cat.codes.to_numpy()
+    if (codes == -1).any():
+        # Code -1 (missing) picks up a trailing null row
+        converted = converted.reindex(range(len(converted) + 1))
+    values = converted.iloc[codes].to_numpy()
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def to_datetime(series: pd.Series, **kwargs) -> pd.Series:
+    return map_categories(series, lambda s: pd.to_datetime(s, **kwargs))
+
+
+def widen(series: pd.Series) -> pd.Series:
+    """
+    The series as int64/float64, for arithmetic that must not wrap or lose
+    precision in a compacted dtype (e.g. int32 Price * Qty).
+    """
+    if ptypes.is_bool_dtype(series):
+        return series
+    if ptypes.is_signed_integer_dtype(series) and series.dtype != np.int64:
+        return series.astype(np.int64)
+    if ptypes.is_unsigned_integer_dtype(series) and series.dtype != np.uint64:
+        return series.astype(np.int64)
+    if ptypes.is_float_dtype(series) and series.dtype != np.float64:
+        return series.astype(np.float64)
+    return series
+
+
+def conform_dtypes(df: pd.DataFrame, dtypes: pd.Series) -> pd.DataFrame:
+    """
+    Cast a batch of new rows to the dtypes of an already optimized frame, so
+    appending it keeps the frame compact: categoricals take the frame's
+    categories (new values are added after them) and integers the frame's
+    dtype when their values fit. Other columns are left as they are.
+    """
+    columns = {}
+    for col in df.columns:
+        target = dtypes.get(col)
+        series = df[col]
+        if target is None or series.dtype == target:
+            continue
+        if isinstance(target, pd.CategoricalDtype):
+            if isinstance(series.dtype, pd.CategoricalDtype) and \
+                    series.cat.categories[:len(target.categories)].equals(target.categories):
+                continue  # already conformed
+            values = series.astype(object) if isinstance(series.dtype, pd.CategoricalDtype) else series
+            try:
+                new = pd.Index(values.dropna().unique()).difference(target.categories)
+                categories = target.categories.append(new) if len(new) else target.categories
+                columns[col] = pd.Series(pd.Categorical(values, categories=categories), index=series.index, name=col)
+            except TypeError:
+                pass  # mixed value types: keep the batch's column
+        elif ptypes.is_integer_dtype(target) and ptypes.is_integer_dtype(series):
+            info = np.iinfo(target)
+            if len(series) == 0 or (info.min <= series.min() and series.max() <= info.max):
+                columns[col] = series.astype(target)
+    if not columns:
+        return df
+    df = df.copy(deep=False)
+    for col, values in columns.items():
+        df[col] = values
+    return df
+
+
+class DataFrameOptimizer:
+    """
+    Shrinks a freshly ingested DataFrame: int64 columns become int32 when
+    their values fit (never narrower, so arithmetic on measures keeps its
+    headroom), floats are stored as float32 when that is lossless (or always,
+    if allowed), and low-cardinality string columns such as Region or Product_Category become
+    categoricals, which also makes groupbys on them faster.
+    """
+
+    def __init__(self, category_max_ratio: float = None, allow_float32: bool = None, category_max_unique: int = None):
+        self.category_max_ratio = category_max_ratio if category_max_ratio is not None else Config.CATEGORY_MAX_RATIO
+        self.category_max_unique = category_max_unique if category_max_unique is not None else Config.CATEGORY_MAX_UNIQUE
+        self.allow_float32 = allow_float32 if allow_float32 is not None else Config.ALLOW_FLOAT32
+        self.report = {}
+
+    def settings_key(self) -> str:
+        """
+        The settings that decide the output dtypes, for keying cached results.
+        """
+        return (f"ratio={self.category_max_ratio};unique={self.category_max_unique};"
+                f"float32={self.allow_float32};int=32")
+
+    def optimize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Return a memory-compact version of df and describe the savings in self.report.
+        """
+        before = df.memory_usage(deep=True).sum()
+        converted = {}
+        columns = {}
+
+        for col in df.columns:
+            series = df[col]
+            new = self._optimize_column(series)
+            if new is not series:
+                converted[col] = f"{series.dtype} -> {new.dtype}"
+                columns[col] = new
+
+        if columns:
+            # Shallow copy: untouched columns keep sharing memory with the input
+            df = df.copy(deep=False)
+            for col, values in columns.items():
+                df[col] = values
+
+        after = df.memory_usage(deep=True).sum()
+        self.report = {
+            "before_mb": round(before / 1024 ** 2, 2),
+            "after_mb": round(after / 1024 ** 2, 2),
+            "converted": converted,
+        }
+        print(f"Optimized dtypes: {self.report['before_mb']} MB -> {self.report['after_mb']} MB ({len(converted)} columns)")
+        return df
+
+    def optimize_chunks(self, chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Optimize a stream of chunks (e.g. read_csv with chunksize) into one frame.
+        Each chunk is compacted before the next one is read: string columns are
+        held as integer codes into categories shared across chunks, so the raw
+        strings of only one chunk are alive at a time. A column whose categories
+        outgrow the limits is stored as plain strings, as optimize() would.
+        """
+        before = 0
+        parts = []
+        dtypes = {}
+        categories = {}  # column -> categories seen so far (append-only)
+        plain = set()  # string columns that cannot be categoricals
+
+        for chunk in chunks:
+            before += chunk.memory_usage(deep=True).sum()
+            part = {}
+            for col in chunk.columns:
+                series = chunk[col]
+                dtypes.setdefault(col, series.dtype)
+                # An all-null chunk says nothing about the column's type
+                if col not in plain and series.first_valid_index() is not None:
+                    encoded = self._encode_strings(series, categories.get(col))
+                    if encoded is not None:
+                        part[col], categories[col] = encoded
+                        continue
+                    plain.add(col)
+                # A copy, so the chunk's block (and the strings in it) can be freed
+                part[col] = series.copy()
+            parts.append(part)
+
+        if not parts:
+            return self.optimize(pd.DataFrame())
+
+        rows = sum(len(next(iter(part.values()), ())) for part in parts)
+        for col, known in categories.items():
+            if col not in plain and len(known) > self.category_max_ratio * rows:
+                plain.add(col)
+
+        columns = {}
+        for col in dtypes:
+            known = categories.get(col)
+            pieces = [part[col] for part in parts]
+            if known is None:
+                columns[col] = self._optimize_column(pd.concat(pieces, ignore_index=True))
+            elif col in plain:
+                # Decode the chunks that were already held as codes
+                columns[col] = pd.concat([
+                    pd.Series(pd.Categorical.from_codes(p, known).astype(object)) if isinstance(p, np.ndarray) else p
+                    for p in pieces
+                ], ignore_index=True)
+            else:
+                codes = np.concatenate([
+                    p if isinstance(p, np.ndarray) else np.full(len(p), -1, dtype=np.int32) for p in pieces
+                ])
+                # Sorted categories, as astype("category") would give
+                order = known.argsort()
+                rank = np.empty(len(order), dtype=np.int32)
+                rank[order] = np.arange(len(order), dtype=np.int32)
+                codes = np.where(codes >= 0, rank[codes], -1)
+                columns[col] = pd.Series(pd.Categorical.from_codes(codes, known[order]))
+        df = pd.DataFrame(columns)
+
+        after = df.memory_usage(deep=True).sum()
+        converted = {col: f"{dtype} -> {df[col].dtype}" for col, dtype in dtypes.items() if df[col].dtype != dtype}
+        self.report = {
+            "before_mb": round(before / 1024 ** 2, 2),
+            "after_mb": round(after / 1024 ** 2, 2),
+            "converted": converted,
+        }
+        print(f"Optimized dtypes: {self.report['before_mb']} MB -> {self.report['after_mb']} MB ({len(converted)} columns)")
+        return df
+
+    def _encode_strings(self, series: pd.Series, known: Optional[pd.Index]) -> Optional[Tuple[np.ndarray, pd.Index]]:
+        # (codes, categories extended with this chunk's new values), or None if not a category candidate
+        if series.dtype != object or ptypes.infer_dtype(series, skipna=True) != "string":
+            return None
+        values = pd.Index(series.dropna().unique())
+        if known is not None:
+            values = known.append(values[~values.isin(known)])
+        if len(values) > self.category_max_unique:
+            return None
+        return values.get_indexer(series).astype(np.int32), values
+
+    def _optimize_column(self, series: pd.Series) -> pd.Series:
+        if ptypes.is_bool_dtype(series):
+            return series
+
+        if series.dtype == np.int64:
+            if len(series) and INT32_MIN <= series.min() and series.max() <= INT32_MAX:
+                return series.astype(np.int32)
+            return series
+
+        if ptypes.is_float_dtype(series) and series.dtype == np.float64:
+            new = series.astype(np.float32)
+            if self.allow_float32 or np.array_equal(new.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True):
+                return new
+            return series
+
+        if series.dtype == object and len(series) > 0:
+            if ptypes.infer_dtype(series, skipna=True) != "string":
+                return series
+            limit = min(self.category_max_ratio * len(series), self.category_max_unique)
+            if series.nunique(dropna=True) <= limit:
+                return series.astype("category")
+
+        return series
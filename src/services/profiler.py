@@ -0,0 +1,343 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+import pandas.api.types as ptypes
+from src.config import Config
+from src.services.sampling import iter_batches
+from src.services.sketches import DistinctSketch, QuantileSketch
+
+# Profiles computed per dataset fingerprint (most recent last)
+_PROFILE_CACHE = OrderedDict()
+_PROFILE_LOCK = threading.Lock()
+PROFILE_CACHE_SIZE = 32
+
+DESCRIBE_QUANTILES = (0.25, 0.5, 0.75)
+
+
+class ColumnProfile:
+    """
+    Statistics of one column, built chunk by chunk in a single pass.
+
+    kind is "numeric", "datetime", "bool" or "categorical" (strings and
+    categories). Numeric columns get exact count/mean/std/min/max and
+    sketched quartiles. Categoricals get exact per-category counts; other
+    columns get exact value counts while there are at most max_tracked
+    distinct values, then only the most frequent ones (approximately), and
+    a distinct-count sketch for the estimate.
+    """
+
+    def __init__(self, name, dtype, max_tracked: int = None):
+        self.name = name
+        self.dtype = dtype
+        if ptypes.is_bool_dtype(dtype):
+            self.kind = "bool"
+        elif ptypes.is_numeric_dtype(dtype):
+            self.kind = "numeric"
+        elif ptypes.is_datetime64_any_dtype(dtype):
+            self.kind = "datetime"
+        else:
+            self.kind = "categorical"
+        self.max_tracked = max_tracked if max_tracked is not None else Config.PROFILE_MAX_TRACKED_VALUES
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.mean = np.nan
+        self._m2 = 0.0
+        self.distinct_sketch = DistinctSketch()
+        self.quantile_sketch = QuantileSketch() if self.kind == "numeric" else None
+        self.counts_exact = True
+        # Categoricals: one running count per category code (category order
+        # breaks ties between modes, as in pandas); other columns: value -> count
+        self.categories = dtype.categories if isinstance(dtype, pd.CategoricalDtype) else None
+        self._code_counts = np.zeros(len(self.categories), dtype=np.int64) if self.categories is not None else None
+        self._value_counts = None
+
+    def update(self, series: pd.Series):
+        if self.kind == "numeric":
+            self._update_numeric(series)
+        elif self.kind == "datetime":
+            self._update_datetime(series)
+        else:
+            self._update_counts(series)
+
+    def _update_numeric(self, series: pd.Series):
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        values = values[~np.isnan(values)]
+        self.nulls += len(series) - len(values)
+        if len(values) == 0:
+            return
+        # Running mean and sum of squared deviations, merged per chunk (Chan et al.)
+        n, mean = len(values), float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + n
+        delta = mean - self.mean if self.count else 0.0
+        self.mean = mean if not self.count else self.mean + delta * n / total
+        self._m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.quantile_sketch.update(values)
+        self.min, self.max = self.quantile_sketch.min, self.quantile_sketch.max
+        self.distinct_sketch.update(values)
+
+    def _update_datetime(self, series: pd.Series):
+        index = pd.DatetimeIndex(series)
+        valid = ~index.isna()
+        self.nulls += len(index) - int(valid.sum())
+        index = index[valid]
+        if len(index) == 0:
+            return
+        self.count += len(index)
+        low, high = index.min(), index.max()
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.distinct_sketch.update(index.asi8)
+
+    def _update_counts(self, series: pd.Series):
+        if self._code_counts is not None:
+            self._update_codes(series)
+            return
+        codes, uniques = pd.factorize(series)
+        counts = np.bincount(codes.astype(np.intp) + 1, minlength=len(uniques) + 1)
+        self.nulls += int(counts[0])
+        self.count += len(codes) - int(counts[0])
+        if len(uniques) == 0:
+            return
+        self.distinct_sketch.update(uniques.to_numpy())
+
+        counts = pd.Series(counts[1:], index=uniques)
+        if len(counts) > self.max_tracked:
+            counts = _most_frequent(counts, self.max_tracked)
+            self.counts_exact = False
+        if self._value_counts is None:
+            self._value_counts = counts
+        else:
+            self._value_counts = self._value_counts.add(counts, fill_value=0).astype("int64")
+        if len(self._value_counts) > self.max_tracked:
+            # Keep the most frequent values; counts of the rest are lost
+            self._value_counts = _most_frequent(self._value_counts, self.max_tracked)
+            self.counts_exact = False
+
+    def _update_codes(self, series: pd.Series):
+        categories = series.cat.categories
+        codes = series.cat.codes.to_numpy().astype(np.intp)
+        if categories is not self.categories and not categories.equals(self.categories):
+            # A chunk with other categories: map its codes onto ours, adding new ones
+            new = categories[~categories.isin(self.categories)]
+            if len(new):
+                self.categories = self.categories.append(new)
+                self._code_counts = np.concatenate([self._code_counts, np.zeros(len(new), dtype=np.int64)])
+            codes = np.where(codes >= 0, self.categories.get_indexer(categories)[codes], -1)
+        counts = np.bincount(codes + 1, minlength=len(self.categories) + 1)
+        self.nulls += int(counts[0])
+        self.count += len(codes) - int(counts[0])
+        self._code_counts += counts[1:]
+
+    @property
+    def rows(self) -> int:
+        return self.count + self.nulls
+
+    @property
+    def counts(self) -> Optional[pd.Series]:
+        """
+        Value -> count for non-numeric columns (None for numeric and datetime).
+        """
+        if self._code_counts is not None:
+            present = np.flatnonzero(self._code_counts)
+            return pd.Series(self._code_counts[present], index=self.categories[present])
+        return self._value_counts
+
+    @property
+    def distinct(self) -> int:
+        if self._code_counts is not None:
+            return int(np.count_nonzero(self._code_counts))
+        if self._value_counts is not None and self.counts_exact:
+            return len(self._value_counts)
+        return self.distinct_sketch.estimate()
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self._m2 / (self.count - 1))) if self.count > 1 else np.nan
+
+    def quantiles(self, qs=DESCRIBE_QUANTILES) -> np.ndarray:
+        if self.quantile_sketch is None:
+            return np.full(len(qs), np.nan)
+        return self.quantile_sketch.quantiles(qs)
+
+    def top_values(self, n: int = None) -> List[tuple]:
+        """
+        Most frequent values with their counts, most frequent first.
+        """
+        if self._code_counts is not None:
+            counts, labels = self._code_counts, self.categories
+        elif self._value_counts is not None:
+            counts, labels = self._value_counts.to_numpy(), self._value_counts.index
+        else:
+            return []
+        return [(labels[i], int(counts[i])) for i in _top_positions(counts, n or Config.PROFILE_TOP_VALUES)]
+
+    def mode(self):
+        """
+        Most frequent value, ties broken like pandas' mode() (category order,
+        else smallest value). None when unknown or when counts were trimmed.
+        """
+        if not self.counts_exact:
+            return None
+        if self._code_counts is not None:
+            return self.categories[int(np.argmax(self._code_counts))] if self._code_counts.any() else None
+        if self._value_counts is None or self._value_counts.empty:
+            return None
+        counts = self._value_counts
+        ties = counts.index[counts.to_numpy() == counts.max()]
+        try:
+            return sorted(ties)[0]
+        except TypeError:
+            return ties[0]
+
+
+class DatasetProfile:
+    """
+    Column statistics of one dataset version (see profile_dataset).
+    """
+
+    def __init__(self, columns: Dict[str, ColumnProfile], rows: int, fingerprint: str = None):
+        self.columns = columns
+        self.rows = rows
+        self.fingerprint = fingerprint
+
+    def __getitem__(self, col) -> ColumnProfile:
+        return self.columns[col]
+
+    def __contains__(self, col) -> bool:
+        return col in self.columns
+
+    @property
+    def dtypes(self) -> pd.Series:
+        return pd.Series({c: p.dtype for c, p in self.columns.items()}, dtype=object)
+
+    def null_counts(self, cols: Iterable = None) -> pd.Series:
+        cols = list(self.columns) if cols is None else list(cols)
+        return pd.Series([self.columns[c].nulls for c in cols], index=cols, dtype="int64")
+
+    def describe(self) -> pd.DataFrame:
+        """
+        Like df.describe().transpose() for the numeric columns, with sketched quartiles.
+        """
+        rows = {}
+        for col, p in self.columns.items():
+            if p.kind != "numeric":
+                continue
+            q1, q2, q3 = p.quantiles() if p.count else (np.nan,) * 3
+            rows[col] = {
+                "count": float(p.count), "mean": p.mean, "std": p.std,
+                "min": p.min if p.count else np.nan,
+                "25%": q1, "50%": q2, "75%": q3,
+                "max": p.max if p.count else np.nan,
+            }
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    def column_info(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "Column": list(self.columns),
+            "Type": [str(p.dtype) for p in self.columns.values()],
+            "Missing": [p.nulls for p in self.columns.values()],
+            "Distinct": [p.distinct for p in self.columns.values()],
+        })
+
+    def to_markdown(self, top: int = 3) -> str:
+        """
+        One row per column (type, missing share, distinct values, range or
+        most frequent values), compact enough for an LLM prompt.
+        """
+        lines = []
+        for col, p in self.columns.items():
+            if p.kind in ("numeric", "datetime") and p.count:
+                values = f"{_short(p.min)} .. {_short(p.max)}"
+            else:
+                values = ", ".join(_short(v) for v, _ in p.top_values(top))
+            missing = f"{p.nulls / p.rows:.0%}" if p.rows else "0%"
+            lines.append({"column": col, "type": str(p.dtype), "missing": missing,
+                          "distinct": p.distinct, "values": values})
+        return pd.DataFrame(lines).to_markdown(index=False)
+
+
+class DatasetProfiler:
+    """
+    Builds a DatasetProfile from a stream of DataFrame chunks; the first
+    chunk fixes the columns and dtypes.
+    """
+
+    def __init__(self, max_tracked: int = None):
+        self.max_tracked = max_tracked
+        self.columns = None
+        self.rows = 0
+
+    def update(self, chunk: pd.DataFrame) -> "DatasetProfiler":
+        if self.columns is None:
+            self.columns = {c: ColumnProfile(c, chunk[c].dtype, self.max_tracked) for c in chunk.columns}
+        for col, profile in self.columns.items():
+            profile.update(chunk[col])
+        self.rows += len(chunk)
+        return self
+
+    def result(self, fingerprint: str = None) -> DatasetProfile:
+        return DatasetProfile(self.columns or {}, self.rows, fingerprint)
+
+
+def profile_chunks(chunks: Iterable[pd.DataFrame], fingerprint: str = None) -> DatasetProfile:
+    """
+    Profile a dataset streamed as chunks (e.g. DataIngestionService.iter_chunks).
+    """
+    profiler = DatasetProfiler()
+    for chunk in chunks:
+        profiler.update(chunk)
+    return profiler.result(fingerprint)
+
+
+def profile_dataset(df: pd.DataFrame, fingerprint: str = None) -> DatasetProfile:
+    """
+    Profile of a DataFrame, computed in one chunked pass and cached per
+    fingerprint, so every consumer of the same dataset version shares it.
+    """
+    if fingerprint:
+        with _PROFILE_LOCK:
+            if fingerprint in _PROFILE_CACHE:
+                _PROFILE_CACHE.move_to_end(fingerprint)
+                return _PROFILE_CACHE[fingerprint]
+
+    profiler = DatasetProfiler()
+    if len(df) == 0:
+        profiler.update(df)
+    for chunk in iter_batches(df, Config.PROFILE_CHUNK_ROWS):
+        profiler.update(chunk)
+    profile = profiler.result(fingerprint)
+
+    if fingerprint:
+        with _PROFILE_LOCK:
+            _PROFILE_CACHE[fingerprint] = profile
+            while len(_PROFILE_CACHE) > PROFILE_CACHE_SIZE:
+                _PROFILE_CACHE.popitem(last=False)
+    return profile
+
+
+def _most_frequent(counts: pd.Series, n: int) -> pd.Series:
+    # Like counts.nlargest(n), without nlargest's uniqueness check on a large object index
+    return counts.iloc[_top_positions(counts.to_numpy(), n)]
+
+
+def _top_positions(counts: np.ndarray, n: int) -> np.ndarray:
+    # Positions of the n largest non-zero counts, largest first, ties in position order
+    present = np.flatnonzero(counts)
+    if len(present) > n:
+        threshold = np.partition(counts[present], len(present) - n)[len(present) - n]
+        present = present[counts[present] >= threshold]
+    order = np.lexsort((present, -counts[present]))
+    return present[order][:n]
+
+
+def _short(value, width: int = 24) -> str:
+    text = str(value.date() if isinstance(value, pd.Timestamp) and value == value.normalize() else value)
+    if isinstance(value, float):
+        text = f"{value:.4g}"
+    return text if len(text) <= width else text[:width - 1] + "…"
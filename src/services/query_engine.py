@@ -0,0 +1,309 @@
+from typing import Optional
+import numpy as np
+import pandas as pd
+import pandas.api.types as ptypes
+from src.config import Config
+from src.models.domain import QueryFilter, QuerySpec
+from src.services.data_engine import DataPointEngine
+from src.services.sampling import prompt_sample
+
+MAX_GROUP_BY = 2
+MAX_AGGREGATES = 5
+NUMERIC_FUNCS = {"sum", "mean", "median"}
+
+
+class QueryEngine:
+    """
+    Runs a validated QuerySpec against the full frame of a DataPointEngine.
+    Rows are grouped by the engine's per-column integer codes (built once and
+    reused across questions), sums, means and counts are bincounts, and
+    results are cached in its chart cache under the dataset fingerprint.
+    """
+
+    def __init__(self, engine: DataPointEngine):
+        self.engine = engine
+        self.df = engine.df
+
+    def describe_columns(self, examples: int = 6) -> str:
+        """
+        One line per column for the query prompt: its kind and a few example
+        values taken from a seeded sample.
+        """
+        sample = prompt_sample(self.df, 200)
+        lines = []
+        for col in self.df.columns:
+            if col in self.engine.schema["time"]:
+                kind = "date"
+            elif ptypes.is_numeric_dtype(self.df[col]) and not ptypes.is_bool_dtype(self.df[col]):
+                kind = "number"
+            else:
+                kind = "category"
+            values = sample[col].dropna().astype(str).unique()[:examples]
+            lines.append(f"- {col}: {kind}, e.g. {', '.join(values)}")
+        return "\n".join(lines)
+
+    def validate(self, spec: QuerySpec) -> QuerySpec:
+        """
+        Check the spec against the frame; raises ValueError describing the
+        first problem. Returns the spec with its limit clamped.
+        """
+        columns = set(self.df.columns)
+        time_cols = set(self.engine.schema["time"])
+
+        if not spec.aggregates:
+            raise ValueError("Query needs at least one aggregate")
+        if len(spec.aggregates) > MAX_AGGREGATES:
+            raise ValueError(f"At most {MAX_AGGREGATES} aggregates are supported")
+        if len(spec.group_by) > MAX_GROUP_BY:
+            raise ValueError(f"At most {MAX_GROUP_BY} group-by columns are supported")
+
+        if len(set(spec.group_by)) != len(spec.group_by):
+            raise ValueError("Group-by columns must be distinct")
+        for col in spec.group_by:
+            if col not in columns:
+                raise ValueError(f"Unknown group-by column: {col}")
+        for agg in spec.aggregates:
+            if agg.column is None:
+                if agg.func != "count":
+                    raise ValueError(f"{agg.func} needs a column")
+                continue
+            if agg.column not in columns:
+                raise ValueError(f"Unknown aggregate column: {agg.column}")
+            series = self.df[agg.column]
+            numeric = ptypes.is_numeric_dtype(series) and not ptypes.is_bool_dtype(series)
+            if agg.func in NUMERIC_FUNCS and not numeric:
+                raise ValueError(f"{agg.func} needs a numeric column, {agg.column} is not")
+            if agg.func in ("min", "max") and not (numeric or agg.column in time_cols):
+                raise ValueError(f"{agg.func} needs a numeric or date column, {agg.column} is not")
+        for f in spec.filters:
+            if f.column not in columns:
+                raise ValueError(f"Unknown filter column: {f.column}")
+            if f.op in ("in", "not in") and not isinstance(f.value, list):
+                raise ValueError(f"{f.op} filter on {f.column} needs a list of values")
+            if f.op == "between" and not (isinstance(f.value, list) and len(f.value) == 2):
+                raise ValueError(f"between filter on {f.column} needs [low, high]")
+
+        limit = Config.MAX_QUERY_ROWS if spec.limit is None else spec.limit
+        return spec.model_copy(update={"limit": max(1, min(limit, Config.MAX_QUERY_ROWS))})
+
+    def execute(self, spec: QuerySpec) -> dict:
+        """
+        Validate and run the spec. Returns {"columns": {name: values},
+        "groups": groups before the limit, "matched": rows after filtering}.
+        """
+        spec = self.validate(spec)
+        cache_spec = {"kind": "query", **spec.model_dump(mode="json")}
+        return self.engine._cached(cache_spec, lambda: self._compute(spec))
+
+    def _compute(self, spec: QuerySpec) -> dict:
+        mask = None
+        for f in spec.filters:
+            m = self._filter_mask(f)
+            mask = m if mask is None else mask & m
+        matched = len(self.df) if mask is None else int(mask.sum())
+
+        values = {}
+        for agg in spec.aggregates:
+            if agg.column is not None and agg.column not in values:
+                values[agg.column] = self._values(agg.column)
+        if mask is not None:
+            values = {col: pd.Series(v.array[mask], name=col) for col, v in values.items()}
+
+        if not spec.group_by:
+            result = {agg.alias: [_scalar(self._aggregate(values.get(agg.column), agg.func, matched))]
+                      for agg in spec.aggregates}
+            return {"columns": result, "groups": 1, "matched": matched}
+
+        codes, labels = self._combined_codes(spec, mask)
+        n_codes = int(np.prod([len(l) for l in labels], dtype=np.float64))
+        if n_codes > max(len(codes), 1 << 20):
+            # Dense group ids, so bincount stays small even for high-cardinality keys
+            dense, combined = pd.factorize(np.where(codes < 0, -1, codes), use_na_sentinel=False)
+            missing = np.flatnonzero(combined == -1)
+            codes = dense
+            if len(missing):
+                codes = np.where(dense == missing[0], -1, dense)
+        else:
+            combined = np.arange(n_codes)
+        n_groups = len(combined)
+        # Rows with a missing key go to an extra bin that is dropped afterwards
+        trash = n_groups
+        if codes.min(initial=0) < 0:
+            codes = np.where(codes < 0, trash, codes)
+        sizes = np.bincount(codes, minlength=n_groups + 1)[:n_groups]
+        observed = np.flatnonzero(sizes)
+
+        table = {}
+        for agg in spec.aggregates:
+            if agg.column is None:
+                table[agg.alias] = sizes[observed]
+                continue
+            v = values[agg.column]
+            if agg.func in ("sum", "mean", "count"):
+                if ptypes.is_numeric_dtype(v) and not ptypes.is_bool_dtype(v):
+                    weights = v.to_numpy(dtype="float64", na_value=np.nan)
+                    missing = np.isnan(weights)
+                else:
+                    weights, missing = None, v.isna().to_numpy()
+                if missing.any():
+                    present_codes = np.where(missing, trash, codes)
+                    counts = np.bincount(present_codes, minlength=n_groups + 1)[:n_groups]
+                else:
+                    present_codes, counts = codes, sizes
+                if agg.func == "count":
+                    table[agg.alias] = counts[observed]
+                    continue
+                if missing.any():
+                    weights = np.where(missing, 0.0, weights)
+                sums = np.bincount(present_codes, weights=weights, minlength=n_groups + 1)[:n_groups]
+                if agg.func == "mean":
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        sums = sums / counts
+                elif ptypes.is_integer_dtype(v):
+                    sums = sums.round().astype(np.int64)
+                table[agg.alias] = sums[observed]
+            else:
+                grouped = pd.Series(v.to_numpy()).groupby(codes).agg(agg.func)
+                table[agg.alias] = grouped.reindex(observed).to_numpy()
+        table = pd.DataFrame(table, index=combined[observed])
+
+        first = spec.aggregates[0].alias
+        if spec.sort == "auto" and spec.group_by[0] in self.engine.schema["time"]:
+            # Codes of a leading time key are chronological
+            table = table.sort_index()
+        else:
+            table = table.sort_values(first, ascending=spec.sort == "asc", kind="stable")
+        groups = len(table)
+        table = table.head(spec.limit)
+
+        columns = {}
+        stride = n_codes
+        for col, col_labels in zip(spec.group_by, labels):
+            stride //= len(col_labels)
+            positions = (table.index.to_numpy() // stride) % len(col_labels)
+            columns[col] = [_label(v) for v in col_labels[positions]]
+        for agg in spec.aggregates:
+            columns[agg.alias] = [_scalar(v) for v in table[agg.alias]]
+        return {"columns": columns, "groups": groups, "matched": matched}
+
+    def _combined_codes(self, spec: QuerySpec, mask):
+        """
+        One int64 code per (filtered) row for the group-by key tuple, -1 where
+        any key is missing, plus each key's labels (codes are mixed-radix).
+        """
+        combined, labels = None, []
+        for col in spec.group_by:
+            codes, col_labels = self.engine._group_codes(col, spec.time_granularity)
+            if mask is not None:
+                codes = codes[mask]
+            if combined is None:
+                combined = codes
+            else:
+                missing = (combined < 0) | (codes < 0)
+                combined = combined * len(col_labels) + codes
+                combined[missing] = -1
+            labels.append(col_labels)
+        return combined, labels
+
+    def _values(self, col) -> pd.Series:
+        if col in self.engine.schema["time"]:
+            return self.engine._datetime(col)
+        return self.df[col]
+
+    def _filter_mask(self, f: QueryFilter) -> np.ndarray:
+        series = self._values(f.column)
+        value = f.value
+        if ptypes.is_datetime64_any_dtype(series):
+            value = pd.to_datetime(value) if not isinstance(value, list) else [pd.to_datetime(v) for v in value]
+
+        if isinstance(series.dtype, pd.CategoricalDtype) and f.op in ("==", "!=", "in", "not in", "contains"):
+            # Decide per category, then look rows up by code; nulls (-1) never match
+            categories = series.cat.categories
+            if f.op == "contains":
+                hits = categories.astype(str).str.contains(str(value), case=False, regex=False)
+            else:
+                hits = categories.isin(value if isinstance(value, list) else [value])
+            if f.op in ("!=", "not in"):
+                hits = ~hits
+            lookup = np.append(np.asarray(hits, dtype=bool), False)
+            return lookup[series.cat.codes.to_numpy()]
+
+        if f.op == "contains":
+            mask = series.astype("string").str.contains(str(value), case=False, regex=False)
+        elif f.op == "in":
+            mask = series.isin(value)
+        elif f.op == "not in":
+            mask = ~series.isin(value) & series.notna()
+        elif f.op == "between":
+            mask = series.between(value[0], value[1])
+        else:
+            ops = {"==": "eq", "!=": "ne", ">": "gt", ">=": "ge", "<": "lt", "<=": "le"}
+            try:
+                mask = getattr(series, ops[f.op])(value)
+            except TypeError as e:
+                raise ValueError(f"Cannot compare {f.column} with {value!r}") from e
+        return mask.fillna(False).to_numpy(dtype=bool)
+
+    @staticmethod
+    def _aggregate(values: Optional[pd.Series], func: str, matched: int):
+        if values is None:
+            return matched
+        return values.agg(func)
+
+
+def format_answer(spec: QuerySpec, result: dict, total_rows: int) -> str:
+    """
+    Markdown answer for an executed query: the scalar(s), or a table of groups.
+    """
+    columns = result["columns"]
+    scope = f"{result['matched']:,} of {total_rows:,} rows" if spec.filters else f"all {total_rows:,} rows"
+    if not spec.group_by:
+        parts = [f"**{_heading(name)}**: {_fmt(values[0])}" for name, values in columns.items()]
+        return "\n".join(parts) + f"\n\n_Computed on {scope}._"
+
+    names = list(columns)
+    n = len(columns[names[0]])
+    if n == 0:
+        return f"No rows match this question (computed on {scope})."
+    lines = [
+        "| " + " | ".join(_heading(c) for c in names) + " |",
+        "|" + "---|" * len(names),
+    ]
+    for i in range(n):
+        # Group labels (ids, codes, years) are shown as is; aggregates get thousands separators
+        lines.append("| " + " | ".join(
+            str(columns[c][i]) if c in spec.group_by else _fmt(columns[c][i]) for c in names
+        ) + " |")
+    shown = f"top {n} of {result['groups']:,} groups" if result["groups"] > n else f"{n} groups"
+    return "\n".join(lines) + f"\n\n_{shown}, computed on {scope}._"
+
+
+def _heading(name: str) -> str:
+    return name.replace("_", " ").title()
+
+
+def _fmt(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    return str(value)
+
+
+def _label(value):
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        return _scalar(value)
+    return str(value)
+
+
+def _scalar(value):
+    # JSON-friendly Python value (NaN / NaT / NA -> None)
+    if pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+from src.config import Config
+
+# Rows per slice when a large in-memory column or frame is streamed through a sampler
+CHUNK_ROWS = 1_000_000
+
+
+def iter_batches(data, rows: int = CHUNK_ROWS):
+    """
+    Yield consecutive slices of a DataFrame, Series or array (views, no copies).
+    """
+    for start in range(0, len(data), rows):
+        yield data.iloc[start:start + rows] if hasattr(data, "iloc") else data[start:start + rows]
+
+
+class ReservoirSampler:
+    """
+    Seeded single-pass reservoir sample (Algorithm R) of fixed size over a
+    stream of row batches. Every row seen so far has the same probability of
+    being in the sample, memory is O(size) regardless of stream length, and
+    feeding the same rows with the same seed gives the same sample however
+    the stream is split into batches.
+
+    Batches are either arrays (1-D values or 2-D rows of fields) or DataFrames.
+    """
+
+    def __init__(self, size: int, seed: int = None):
+        self.size = size
+        self.seen = 0
+        self.sample = None
+        self._order = np.empty(0, dtype=np.int64)  # stream position of each sampled row
+        self._rng = np.random.default_rng(Config.SAMPLE_SEED if seed is None else seed)
+
+    def __len__(self):
+        return 0 if self.sample is None else len(self.sample)
+
+    def update(self, batch) -> "ReservoirSampler":
+        """
+        Add a batch of rows.
+        """
+        is_frame = isinstance(batch, pd.DataFrame)
+        if not is_frame:
+            batch = np.asarray(batch, dtype="float64")
+            if batch.ndim == 1:
+                batch = batch.reshape(-1, 1)
+        if self.sample is None:
+            self.sample = batch.iloc[:0] if is_frame else np.empty((0, batch.shape[1]))
+        n = len(batch)
+        if n == 0:
+            return self
+
+        # Fill phase: the first `size` rows are all kept
+        take = max(0, min(self.size - len(self.sample), n))
+        if take > 0:
+            head = batch.iloc[:take] if is_frame else batch[:take]
+            self.sample = pd.concat([self.sample, head]) if is_frame else np.concatenate([self.sample, head])
+            self._order = np.concatenate([self._order, self.seen + np.arange(take)])
+
+        # Row number t (1-based) replaces slot j ~ U[0, t) when j < size; one draw per row
+        rest = n - take
+        if rest > 0:
+            t = self.seen + take + np.arange(1, rest + 1)
+            slots = np.floor(self._rng.random(rest) * t).astype(np.int64)
+            picked = np.flatnonzero(slots < self.size)
+            if len(picked):
+                # Several rows may hit one slot; the latest one wins, as in the sequential algorithm
+                slots, picked = slots[picked][::-1], picked[::-1]
+                slots, last = np.unique(slots, return_index=True)
+                positions = take + picked[last]
+                self._replace(batch, slots, positions, is_frame)
+
+        self.seen += n
+        return self
+
+    def _replace(self, batch, slots, positions, is_frame):
+        if not is_frame:
+            self.sample[slots] = batch[positions]
+            self._order[slots] = self.seen + positions
+            return
+        # Frames: append the new rows, then take them in place of the replaced slots
+        take = np.arange(len(self.sample))
+        take[slots] = len(self.sample) + np.arange(len(slots))
+        self.sample = pd.concat([self.sample, batch.iloc[positions]]).iloc[take]
+        self._order[slots] = self.seen + positions
+
+    def values(self) -> np.ndarray:
+        """
+        The current sample of an array stream; 1-D if rows were single values.
+        """
+        if self.sample is None:
+            return np.empty(0)
+        return self.sample[:, 0] if self.sample.shape[1] == 1 else self.sample
+
+    def frame(self) -> pd.DataFrame:
+        """
+        The current sample of a DataFrame stream, in stream order.
+        """
+        if self.sample is None:
+            return pd.DataFrame()
+        return self.sample.iloc[np.argsort(self._order, kind="stable")]
+
+
+def reservoir_sample(data, size: int, seed: int = None) -> pd.DataFrame:
+    """
+    Uniform sample of up to `size` rows from a DataFrame or an iterable of
+    DataFrame chunks, in one pass and in original row order.
+    """
+    if isinstance(data, pd.DataFrame):
+        if len(data) <= size:
+            return data
+        data = iter_batches(data)
+    sampler = ReservoirSampler(size, seed)
+    for chunk in data:
+        sampler.update(chunk)
+    return sampler.frame()
+
+
+def stratified_sample(df: pd.DataFrame, by, size: int, seed: int = None, min_per_group: int = 1) -> pd.DataFrame:
+    """
+    Sample up to `size` rows so every group of `by` (a column or list of
+    columns; missing values form their own group) is represented: each group
+    gets at least min_per_group rows and the rest is allocated in proportion
+    to group size. Rows come back in original order.
+    """
+    if len(df) <= size:
+        return df
+    rng = np.random.default_rng(Config.SAMPLE_SEED if seed is None else seed)
+    codes = df.groupby(by, observed=True, dropna=False, sort=False).ngroup().to_numpy()
+    sizes = np.bincount(codes)
+
+    alloc = _allocate(sizes, size, min_per_group)
+    # Rank rows within their group by a random key; keep the first alloc[group]
+    keys = rng.random(len(df))
+    order = np.lexsort((keys, codes))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.arange(len(df)) - starts[codes[order]]
+    chosen = np.sort(order[rank < alloc[codes[order]]])
+    return df.iloc[chosen]
+
+
+def _allocate(sizes: np.ndarray, size: int, min_per_group: int) -> np.ndarray:
+    # Guaranteed minimum first (by group size if there are more groups than room)
+    alloc = np.minimum(sizes, min_per_group)
+    if alloc.sum() > size:
+        alloc = np.zeros_like(sizes)
+        alloc[np.argsort(-sizes, kind="stable")[:size]] = 1
+        return alloc
+    # Remaining rows in proportion to what each group has left, largest remainder first
+    left = sizes - alloc
+    room = size - alloc.sum()
+    if room > 0 and left.sum() > 0:
+        share = left / left.sum() * room
+        extra = np.minimum(np.floor(share).astype(np.int64), left)
+        remainder = int(room - extra.sum())
+        for g in np.argsort(-(share - np.floor(share)), kind="stable"):
+            if remainder <= 0:
+                break
+            if extra[g] < left[g]:
+                extra[g] += 1
+                remainder -= 1
+        alloc = alloc + extra
+    return alloc
+
+
+def prompt_sample(df: pd.DataFrame, size: int, seed: int = None) -> pd.DataFrame:
+    """
+    A few representative rows for an LLM prompt: stratified by the
+    lowest-cardinality categorical column (so every segment shows up when
+    there is room), otherwise a uniform sample.
+    """
+    strata = None
+    for col in df.select_dtypes(include="category").columns:
+        groups = len(df[col].cat.categories)
+        if 1 < groups <= size and (strata is None or groups < strata[1]):
+            strata = (col, groups)
+    if strata is not None:
+        return stratified_sample(df, strata[0], size, seed)
+    return reservoir_sample(df, size, seed)
@@ -0,0 +1,315 @@
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    """
+    Mergeable streaming quantile sketch (a compact KLL variant).
+
+    Values are kept in levels of sorted compactors; an item on level h stands
+    for 2**h original values. When a level overflows it is sorted and every
+    other item (random offset) is promoted to the next level, so memory stays
+    O(k log(n / k)) no matter how many values are streamed in. Sketches built
+    on different chunks or workers can be merged with merge().
+
+    Error bound: a quantile query returns a value whose rank is within
+    eps * n of the requested rank, with eps shrinking roughly as 2 / k.
+    With the default k=200 the rank error measured on skewed data is about
+    0.3% of n on average and stays under ~1% of n with 99% probability;
+    raise k for tighter bounds. Min and max are tracked exactly.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    def _capacity(self, level: int) -> int:
+        # Top level holds k items, each level below holds 2/3 of the one above
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values) -> "QuantileSketch":
+        """
+        Add an array of values (NaNs are ignored).
+        """
+        values = np.asarray(values, dtype="float64").ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def update_repeated(self, value: float, count: int) -> "QuantileSketch":
+        """
+        Add `count` copies of one value exactly (e.g. imputed fill values),
+        by placing it on the levels that match the binary digits of count.
+        """
+        count = int(count)
+        if count <= 0 or np.isnan(value):
+            return self
+
+        self.n += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        level = 0
+        while count:
+            if count & 1:
+                while level >= len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level] = np.append(self.levels[level], value)
+            count >>= 1
+            level += 1
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Fold another sketch into this one.
+        """
+        if other.n == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays on this level so total weight is preserved
+                keep = items[:len(items) % 2]
+                pairs = items[len(items) % 2:]
+                offset = self._rng.integers(2)
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], pairs[offset::2]])
+            h += 1
+
+    def quantiles(self, qs) -> np.ndarray:
+        """
+        Approximate quantiles for an array of probabilities in [0, 1].
+        """
+        qs = np.asarray(qs, dtype="float64")
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** h, dtype="float64") for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        cum = np.cumsum(weights[order])
+
+        idx = np.searchsorted(cum, qs * cum[-1], side="left")
+        result = values[np.clip(idx, 0, len(values) - 1)]
+        result = np.where(qs <= 0, self.min, result)
+        result = np.where(qs >= 1, self.max, result)
+        return result
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+
+class DistinctSketch:
+    """
+    Mergeable distinct-count sketch (K minimum values).
+
+    Values are hashed to 64 bits and only the k smallest distinct hashes are
+    kept; if n values are distinct, the k-th smallest hash is expected near
+    k / n of the hash range, which gives the estimate. The count is exact
+    while fewer than k distinct values have been seen; beyond that the
+    relative standard error is about 1 / sqrt(k - 2) (~3% with k=1024).
+    Object values (strings) are hashed with Python's hash(), which is only
+    stable within one process, so sketches are not meant to be persisted.
+    """
+
+    def __init__(self, k: int = 1024):
+        self.k = k
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def update(self, values) -> "DistinctSketch":
+        """
+        Add an array of values (missing values should be removed first).
+        """
+        values = np.asarray(values)
+        if values.dtype == object:
+            # Python caches string hashes; mix them so small ints spread over the range too
+            hashes = _mix64(np.fromiter(map(hash, values), dtype=np.int64, count=len(values)).view(np.uint64))
+        else:
+            hashes = pd.util.hash_array(values)
+        if len(self.hashes) >= self.k:
+            # Only hashes below the current k-th smallest can enter the sketch
+            hashes = hashes[hashes < self.hashes[-1]]
+        if len(hashes) > 4 * self.k:
+            # With enough distinct values the k smallest are among the 4k smallest hashes
+            head = np.unique(np.partition(hashes, 4 * self.k - 1)[:4 * self.k])
+            if len(head) >= self.k:
+                return self._add(head[:self.k])
+        hashes = pd.unique(hashes)
+        if len(hashes) > self.k:
+            hashes = np.partition(hashes, self.k - 1)[:self.k]
+        return self._add(hashes)
+
+    def merge(self, other: "DistinctSketch") -> "DistinctSketch":
+        """
+        Fold another sketch into this one.
+        """
+        return self._add(other.hashes)
+
+    def _add(self, hashes: np.ndarray) -> "DistinctSketch":
+        if len(hashes):
+            self.hashes = np.unique(np.concatenate([self.hashes, hashes]))[:self.k]
+        return self
+
+    def estimate(self) -> int:
+        if len(self.hashes) < self.k:
+            return len(self.hashes)
+        fraction = (float(self.hashes[-1]) + 1.0) / 2.0 ** 64
+        return int(round((self.k - 1) / fraction))
+
+
+def _mix64(z: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer (wrapping uint64 arithmetic)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class BinnedHistogram:
+    """
+    Streaming fixed-width histogram with exact counts.
+
+    Bins are [i * width, (i + 1) * width) on a grid anchored at zero. The width
+    is a "nice" number (1, 2 or 5 times a power of ten, whole numbers for
+    integer data) chosen from the first batch so it spans about `bins` bins.
+    When later batches widen the range past 2 * bins, the width doubles and
+    neighbouring bins are summed pairwise, so counts stay exact while the
+    number of bins stays bounded.
+    """
+
+    def __init__(self, bins: int = 30):
+        self.bins = bins
+        self.width = None
+        self.start = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def __len__(self):
+        return self.n
+
+    def update(self, values) -> "BinnedHistogram":
+        """
+        Add an array of values (NaN and infinite values are ignored).
+        """
+        values = np.asarray(values, dtype="float64").ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+
+        lo, hi = values.min(), values.max()
+        if self.width is None:
+            integer = bool(np.all(values == np.floor(values)))
+            self.width = _nice_width((hi - lo) / self.bins, integer)
+
+        self.n += len(values)
+        self.min = min(self.min, lo)
+        self.max = max(self.max, hi)
+
+        first = int(np.floor(self.min / self.width))
+        last = int(np.floor(self.max / self.width))
+        while last - first + 1 > 2 * self.bins:
+            self._double()
+            first = int(np.floor(self.min / self.width))
+            last = int(np.floor(self.max / self.width))
+        self._extend(first, last)
+
+        idx = np.floor(values / self.width).astype(np.int64) - self.start
+        # Guard against float rounding right at the grid edges
+        idx = np.clip(idx, 0, len(self.counts) - 1)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+        return self
+
+    def _extend(self, first: int, last: int):
+        if len(self.counts) == 0:
+            self.start = first
+            self.counts = np.zeros(last - first + 1, dtype=np.int64)
+            return
+        end = self.start + len(self.counts)
+        if first < self.start:
+            self.counts = np.concatenate([np.zeros(self.start - first, dtype=np.int64), self.counts])
+            self.start = first
+            end = self.start + len(self.counts)
+        if last >= end:
+            self.counts = np.concatenate([self.counts, np.zeros(last - end + 1, dtype=np.int64)])
+
+    def _double(self):
+        # Bins 2i and 2i + 1 become bin i at twice the width
+        counts = self.counts
+        if self.start % 2:
+            counts = np.concatenate([np.zeros(1, dtype=np.int64), counts])
+            self.start -= 1
+        if len(counts) % 2:
+            counts = np.concatenate([counts, np.zeros(1, dtype=np.int64)])
+        self.counts = counts.reshape(-1, 2).sum(axis=1)
+        self.start //= 2
+        self.width *= 2
+
+    def edges(self) -> np.ndarray:
+        """
+        Bin edges (len(counts) + 1 values), trimmed to the occupied range.
+        Constant data gives one bin of the grid width centred on the value.
+        """
+        if self.n and self.min == self.max:
+            return np.array([self.min - self.width / 2, self.min + self.width / 2])
+        counts, start = self._trimmed()
+        return (start + np.arange(len(counts) + 1)) * self.width
+
+    def histogram(self):
+        """
+        (counts, edges) over the occupied range, like np.histogram.
+        """
+        counts, _ = self._trimmed()
+        return counts, self.edges()
+
+    def _trimmed(self):
+        occupied = np.flatnonzero(self.counts)
+        if len(occupied) == 0:
+            return np.zeros(0, dtype=np.int64), self.start
+        return self.counts[occupied[0]:occupied[-1] + 1], self.start + occupied[0]
+
+
+def _nice_width(raw: float, integer: bool = False) -> float:
+    """
+    Smallest 1/2/5 x 10^k step >= raw (at least 1 for integer data).
+    """
+    if integer and raw <= 1:
+        return 1.0
+    if not np.isfinite(raw) or raw <= 0:
+        return 1.0
+    magnitude = 10 ** np.floor(np.log10(raw))
+    for step in (1, 2, 5, 10):
+        if step * magnitude >= raw:
+            return float(step * magnitude)
+    return float(10 * magnitude)
@@ -6,14 +6,30 @@ import os, sys, uuid
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from src.main import KPIAgent
+from src.llm.client import LLMClient
+from src.services.answer_cache import AnswerCache
 from src.services.data_engine import DataPointEngine
+from src.services.dataset_cache import derive_fingerprint
 from src.models.domain import KPI, DataPoint
+from src.config import Config
 
 st.set_page_config(page_title="KPI Agent", layout="wide")
 
 # ---------------- STATE ----------------
+@st.cache_resource
+def shared_llm() -> LLMClient:
+    # One client per server process: sessions share its connection pool, rate limits and response cache
+    return LLMClient(provider=Config.LLM_PROVIDER)
+
+
+@st.cache_resource
+def shared_answer_cache() -> AnswerCache:
+    # Chat answers are keyed by dataset fingerprint, so analysts on the same upload share them
+    return AnswerCache()
+
+
 if "agent" not in st.session_state:
-    st.session_state.agent = KPIAgent()
+    st.session_state.agent = KPIAgent(llm=shared_llm(), answer_cache=shared_answer_cache())
 
 if "page" not in st.session_state:
     st.session_state.page = "Upload"
@@ -21,6 +37,7 @@ if "page" not in st.session_state:
 if "data_state" not in st.session_state:
     st.session_state.data_state = {
         "df": None,
+        "fingerprint": None,
         "domain": None,
         "kpis": [],
         "data_points": [],
@@ -45,14 +62,22 @@ if st.session_state.page == "Upload":
         uploaded_file.seek(0)
         df = st.session_state.agent.ingestion.ingest_from_url(None, file_obj=uploaded_file)
 
+        fingerprint = st.session_state.agent.ingestion.last_fingerprint
         st.session_state.data_state["df"] = df
-        st.session_state.agent.data_engine = DataPointEngine(df)
+        st.session_state.data_state["fingerprint"] = fingerprint
+        st.session_state.agent.data_engine = DataPointEngine(
+            df, fingerprint=fingerprint, cache=st.session_state.agent.chart_cache
+        )
         st.session_state.data_state["kpis"] = []
         st.session_state.data_state["data_points"] = []
         st.session_state.data_state["insights"] = []
 
         st.success("Dataset loaded successfully")
 
+        mem = st.session_state.agent.ingestion.optimizer.report
+        if mem:
+            st.caption(f"Memory: {mem['before_mb']} MB → {mem['after_mb']} MB after dtype optimization")
+
 # ---------------- PREVIEW ----------------
 elif st.session_state.page == "Preview":
     st.header("🔍 Dataset Preview")
@@ -61,18 +86,17 @@ elif st.session_state.page == "Preview":
     if df is None:
         st.warning("Upload dataset first")
     else:
+        # Computed once per dataset version, shared with cleaning, classification and charts
+        profile = st.session_state.agent.data_engine.profile
+
         st.subheader("📊 Numeric Dataset Statistics")
-        numeric_df = df.select_dtypes(include="number")
-        if not numeric_df.empty:
-            st.dataframe(numeric_df.describe().transpose(), use_container_width=True)
+        stats = profile.describe()
+        if not stats.empty:
+            st.dataframe(stats, use_container_width=True)
+            st.caption("Quartiles are estimated in a single pass over the data.")
 
         st.subheader("🧩 Column Info")
-        info_df = pd.DataFrame({
-            "Column": df.columns,
-            "Type": df.dtypes.astype(str),
-            "Missing": df.isnull().sum().values
-        })
-        st.dataframe(info_df, use_container_width=True)
+        st.dataframe(profile.column_info(), use_container_width=True)
 
         st.subheader("🔎 Sample Data")
         st.dataframe(df.head(20), use_container_width=True)
@@ -124,6 +148,9 @@ elif st.session_state.page == "Cleaning":
                     for col in categorical_cols:
                         df_clean[col] = df_clean[col].fillna(df_clean[col].mode()[0])
                 elif cat_strategy == "Unknown":
+                    for col in categorical_cols:
+                        if isinstance(df_clean[col].dtype, pd.CategoricalDtype) and "Unknown" not in df_clean[col].cat.categories:
+                            df_clean[col] = df_clean[col].cat.add_categories("Unknown")
                     df_clean[categorical_cols] = df_clean[categorical_cols].fillna("Unknown")
                 elif cat_strategy == "Drop rows":
                     df_clean = df_clean.dropna(subset=categorical_cols)
@@ -131,8 +158,16 @@ elif st.session_state.page == "Cleaning":
             if other_cols and other_strategy == "Drop rows":
                 df_clean = df_clean.dropna(subset=other_cols)
 
+            # Answers computed on the uncleaned frame no longer apply
+            st.session_state.agent.answer_cache.invalidate(st.session_state.agent.data_engine.fingerprint)
+            fingerprint = derive_fingerprint(
+                st.session_state.data_state["fingerprint"], num_strategy, cat_strategy, other_strategy
+            )
             st.session_state.data_state["df"] = df_clean
-            st.session_state.agent.data_engine = DataPointEngine(df_clean)
+            st.session_state.data_state["fingerprint"] = fingerprint
+            st.session_state.agent.data_engine = DataPointEngine(
+                df_clean, fingerprint=fingerprint, cache=st.session_state.agent.chart_cache
+            )
             st.success("Cleaning applied")
 
 # ---------------- DASHBOARD ----------------
@@ -145,7 +180,9 @@ elif st.session_state.page == "Dashboard":
     else:
         # KPIs
         if not st.session_state.data_state["kpis"]:
-            domain = st.session_state.agent.classifier.classify(df)
+            domain = st.session_state.agent.classifier.classify(
+                df, profile=st.session_state.agent.data_engine.profile
+            )
             kpis = st.session_state.agent.composer.generate_kpis(domain.domain, list(df.columns))
             st.session_state.data_state["kpis"] = kpis
 
@@ -162,7 +199,7 @@ elif st.session_state.page == "Dashboard":
         to_delete = []
 
         for i, dp in enumerate(dps):
-            chart_df = pd.DataFrame(dp.data)
+            chart_df = dp.to_frame()
 
             with cols[i % 2]:
                 # ✅ use metadata from DataPointEngine
@@ -207,6 +244,18 @@ elif st.session_state.page == "Dashboard":
                         title=title
                     )
 
+                elif chart_type == "histogram" and "bin_start" in chart_df.columns:
+                    # Pre-binned by the engine: one bar per bin, spanning its edges
+                    chart_df["bin_mid"] = (chart_df["bin_start"] + chart_df["bin_end"]) / 2
+                    fig = px.bar(
+                        chart_df, x="bin_mid", y="value",
+                        labels={"bin_mid": x_label, "value": y_label},
+                        hover_data={"label": True, "bin_mid": False},
+                        title=title
+                    )
+                    fig.update_traces(width=(chart_df["bin_end"] - chart_df["bin_start"]).tolist())
+                    fig.update_layout(bargap=0)
+
                 elif chart_type == "histogram" and "value" in chart_df.columns:
                     fig = px.histogram(
                         chart_df, x="value",
@@ -243,14 +292,9 @@ elif st.session_state.page == "Dashboard":
             new_type = st.selectbox("Chart Type", ["bar", "line", "pie"])
 
         if st.button("Add Graph"):
-            grp = df.groupby(new_x)[new_y].sum().reset_index().head(12)
-            data = [{"label": str(r[new_x]), "value": float(r[new_y])} for _, r in grp.iterrows()]
-
-            new_dp = DataPoint(kpi_id=f"custom_{uuid.uuid4().hex[:6]}", data=data)
-            new_dp.title = f"{new_y.replace('_',' ').title()} by {new_x.replace('_',' ').title()}"
-            new_dp.chart_type = new_type
-            new_dp.x_label = new_x.replace("_"," ").title()
-            new_dp.y_label = new_y.replace("_"," ").title()
+            # Served from the chart cache if this graph was built before
+            chart = st.session_state.agent.data_engine.aggregate_chart(new_x, new_y, top_n=12, chart_type=new_type)
+            new_dp = DataPoint(kpi_id=f"custom_{uuid.uuid4().hex[:6]}", **chart)
 
             st.session_state.data_state["data_points"].append(new_dp)
             st.success("Custom graph added")
@@ -260,12 +304,19 @@ elif st.session_state.page == "Dashboard":
 elif st.session_state.page == "Insights":
     st.header("💡 Key Business Insights")
 
-    if not st.session_state.data_state["insights"]:
-        insights = []
-        for dp in st.session_state.data_state["data_points"]:
-            an = st.session_state.agent.analytics.analyze(None, dp)
-            insights.append(an)
-        st.session_state.data_state["insights"] = insights
+    dps = st.session_state.data_state["data_points"]
+    if dps and not st.session_state.data_state["insights"]:
+        progress = st.progress(0.0, text="Generating insights...")
+        done = []
+
+        def show_progress(i, analysis):
+            done.append(i)
+            progress.progress(len(done) / len(dps), text=f"Generated {len(done)} of {len(dps)} insights")
+
+        st.session_state.data_state["insights"] = st.session_state.agent.analytics.analyze_many(
+            dps, on_result=show_progress
+        )
+        progress.empty()
 
     for i, ins in enumerate(st.session_state.data_state["insights"]):
         with st.container(border=True):
@@ -289,15 +340,20 @@ elif st.session_state.page == "Chat with Data":
 
         question = st.text_input("Ask a question about your dataset")
 
+        history = list(reversed(st.session_state.chat_history))
         if st.button("Ask"):
-            with st.spinner("Thinking..."):
-                answer = st.session_state.agent.analytics.chat_with_data(
-                    question=question,
-                    df=df
+            # Render the answer as it is generated instead of after the last token
+            st.markdown(f"🧑 **You:** {question}")
+            st.markdown("🤖 **DataBot:**")
+            answer = st.write_stream(
+                st.session_state.agent.analytics.chat_with_data_stream(
+                    question=question, df=df, engine=st.session_state.agent.data_engine
                 )
-                st.session_state.chat_history.append((question, answer))
+            )
+            st.divider()
+            st.session_state.chat_history.append((question, answer))
 
-        for q, a in reversed(st.session_state.chat_history):
+        for q, a in history:
             st.markdown(f"🧑 **You:** {q}")
             st.markdown(f"🤖 **DataBot:** {a}")
             st.divider()